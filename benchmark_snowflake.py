@@ -0,0 +1,235 @@
+"""
+:mod: `benchmark_snowflake` module
+:date: October 2026
+
+Measures the time taken by each phase of the simulation of `snowflake_growth` on plates of several sizes,
+saves the results in a JSON file and compares them with the results of an older version
+"""
+
+from snowflake_growth import (SimulationConfig, Simulation, create_plate, build_neighbour_table, diffusion,
+                              boundary_phase, interference, savestates, hex_distance, APPROXIMATION)
+import tempfile
+import platform
+import datetime
+import statistics
+import time
+import json
+import sys
+import os
+import argparse
+import numpy as np
+
+SIZES = [101, 301, 1001, 2001] # The sizes (rows and columns) of the plates measured
+APPROXIMATIONS = [0, APPROXIMATION] # The approximations measured, for the phases which depend on it
+REPEAT = 3 # The number of times each phase is measured
+STEPS = 10 # The number of iterations of a whole simulation measured
+PICTURE_LIMIT = 501 # The largest size of plate whose pictures are measured, as the picture of hexagons grows fast
+THRESHOLD = 0.1 # The slow down beyond which a phase is considered to have regressed (0.1 for 10 %)
+
+# The phases measured, and whether their time depends on the approximation
+PHASES = [("create_plate", False), ("neighbour_table", False), ("diffusion", True), ("boundary_phase", False),
+          ("interference", False), ("savestates", False), ("simulation_step", True)]
+
+def benchmark_plate(size):
+    """
+    Returns a plate whose crystal is a hexagon of radius size // 8 around the middle cell, with the distance to it as iteration.
+    The phases are measured on it so they have a crystal and a border of a realistic size.
+    
+    :param size: (int) the number of rows and columns of the plate
+    :return: (tuple) the plate, the coordinates of the first crystal cell and the `max_point` of the crystal
+    
+    Exemple:
+    
+    >>> plate, init_pos, max_point = benchmark_plate(17)
+    >>> init_pos, max_point, int(plate.crystal.sum())
+    ((8, 8), 2, 19)
+    """
+    plate = create_plate(dim=(size, size))
+    init_pos = (size // 2, size // 2)
+    y, x = np.indices(plate.shape)
+    distance = hex_distance(y, x, init_pos)
+    crystal = distance <= size // 8
+    plate.crystal[crystal] = True
+    plate.i[crystal] = distance[crystal]
+    plate.b[crystal], plate.c[crystal], plate.d[crystal] = 0, 1, 0
+    max_point = int(np.maximum(np.abs(y - init_pos[0]), np.abs(x - init_pos[1]))[crystal].max())
+    return plate, init_pos, max_point
+
+def measure(function, prepare, repeat=REPEAT):
+    """
+    Returns the times taken by a function
+    
+    :param function: (function) the function measured, called with the value returned by `prepare`
+    :param prepare: (function) function without parameters called before each measure, whose time is not counted
+    :param repeat: (int) [DEFAULT: REPEAT] the number of measures
+    :return: (list of float) the times, in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        argument = prepare()
+        start = time.perf_counter()
+        function(argument)
+        times.append(time.perf_counter() - start)
+    return times
+
+def benchmark_phase(phase, size, approximation, repeat=REPEAT, steps=STEPS):
+    """
+    Returns the times taken by a phase on a plate of a size
+    
+    :param phase: (str) the name of the phase (see `PHASES`)
+    :param size: (int) the number of rows and columns of the plate
+    :param approximation: (int) the approximation of the diffusion
+    :param repeat: (int) [DEFAULT: REPEAT] the number of measures
+    :param steps: (int) [DEFAULT: STEPS] the number of iterations of the simulation measured by "simulation_step"
+    :return: (list of float) the times, in seconds. For "simulation_step", the time of one iteration
+    """
+    dim = (size, size)
+    plate, init_pos, max_point = benchmark_plate(size)
+    
+    if phase == "create_plate":
+        return measure(lambda _: create_plate(dim=dim), lambda: None, repeat)
+    if phase == "neighbour_table":
+        # The table is built again each time, without the caches
+        return measure(lambda _: build_neighbour_table(dim), lambda: None, repeat)
+    if phase == "diffusion":
+        return measure(lambda copy: diffusion(copy, init_pos, max_point, approximation), plate.copy, repeat)
+    if phase == "boundary_phase":
+        return measure(lambda copy: boundary_phase(copy, init_pos, max_point, max_point + 1), plate.copy, repeat)
+    if phase == "interference":
+        return measure(lambda copy: interference(copy, 0.01), plate.copy, repeat)
+    if phase == "savestates":
+        with tempfile.TemporaryDirectory() as directory:
+            os.makedirs(os.path.join(directory, "Pixels"))
+            os.makedirs(os.path.join(directory, "Hexagons"))
+            return measure(lambda copy: savestates(copy, "snowflake", 0, directory + "/"), plate.copy, repeat)
+    if phase == "simulation_step":
+        config = SimulationConfig(dimension=dim, number=steps, approximation=approximation, sigma=0.01)
+        return [duration / steps for duration in measure(lambda simulation: simulation.run(), lambda: Simulation(config), repeat)]
+    raise ValueError("Unknown phase: {}".format(phase))
+
+def run_benchmarks(sizes=SIZES, approximations=APPROXIMATIONS, phases=None, repeat=REPEAT, steps=STEPS,
+                   picture_limit=PICTURE_LIMIT, verbose=True):
+    """
+    Measures the phases on all the sizes and approximations
+    
+    :param sizes: (list of int) [DEFAULT: SIZES] the sizes of the plates
+    :param approximations: (list of int) [DEFAULT: APPROXIMATIONS] the approximations, for the phases which depend on it
+    :param phases: (list of str) [DEFAULT: all the phases of `PHASES`] the phases measured
+    :param repeat: (int) [DEFAULT: REPEAT] the number of measures of each phase
+    :param steps: (int) [DEFAULT: STEPS] the number of iterations of the simulation measured by "simulation_step"
+    :param picture_limit: (int) [DEFAULT: PICTURE_LIMIT] the largest size whose pictures are measured
+    :param verbose: (bool) [DEFAULT: True] True to print each result
+    :return: (dict) the results, with the description of the machine in "machine" and one dictionnary per measure in "results"
+    """
+    results = []
+    for size in sizes:
+        for phase, with_approximation in PHASES:
+            if phases is not None and phase not in phases:
+                continue
+            if phase == "savestates" and size > picture_limit:
+                continue
+            for approximation in (approximations if with_approximation else [None]):
+                times = benchmark_phase(phase, size, approximation or 0, repeat=repeat, steps=steps)
+                result = {"phase": phase, "size": size, "approximation": approximation,
+                          "best": min(times), "median": statistics.median(times), "times": times}
+                results.append(result)
+                if verbose:
+                    print("{phase:>16} {size:>6} {approximation:>6} {best:>12.6f} {median:>12.6f}".format(
+                          **dict(result, approximation="-" if approximation is None else approximation)))
+    machine = {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+               "processor": platform.processor(), "date": datetime.datetime.now().isoformat(timespec="seconds")}
+    return {"machine": machine, "results": results}
+
+def compare_results(results, baseline, threshold=THRESHOLD):
+    """
+    Returns the measures of `results` which are slower than the same measures of `baseline` by more than `threshold`.
+    The best times are compared, as they are the least disturbed by the other programs of the machine.
+    
+    :param results: (dict) the new results (see `run_benchmarks`)
+    :param baseline: (dict) the old results
+    :param threshold: (float) [DEFAULT: THRESHOLD] the slow down allowed (0.1 for 10 %)
+    :return: (list of tuple) the (phase, size, approximation, old time, new time) of the regressions
+    
+    Exemple:
+    
+    >>> old = {"results": [{"phase": "diffusion", "size": 101, "approximation": 0, "best": 1.0},
+    ...                    {"phase": "create_plate", "size": 101, "approximation": None, "best": 1.0}]}
+    >>> new = {"results": [{"phase": "diffusion", "size": 101, "approximation": 0, "best": 1.5},
+    ...                    {"phase": "create_plate", "size": 101, "approximation": None, "best": 1.05}]}
+    >>> compare_results(new, old)
+    [('diffusion', 101, 0, 1.0, 1.5)]
+    """
+    old = {(result["phase"], result["size"], result["approximation"]): result["best"] for result in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        key = (result["phase"], result["size"], result["approximation"])
+        if key in old and result["best"] > old[key] * (1 + threshold):
+            regressions.append(key + (old[key], result["best"]))
+    return regressions
+
+def build_parser():
+    """
+    Returns the parser of the command line arguments of the script
+    
+    :return: (argparse.ArgumentParser) the parser
+    """
+    parser = argparse.ArgumentParser(description='Measures the time taken by the phases of the simulation.',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    
+    parser.add_argument('-sizes', type=int, nargs='+',
+                        help='The sizes (rows and columns) of the plates measured.', default=SIZES)
+    
+    parser.add_argument('-app', '-approximations', type=int, nargs='+',
+                        help='The approximations measured, for the diffusion and the whole iterations.', default=APPROXIMATIONS)
+    
+    parser.add_argument('-phases', nargs='+', choices=[phase for phase, _ in PHASES],
+                        help='The phases measured (all of them by default).', default=None)
+    
+    parser.add_argument('-repeat', type=int,
+                        help='The number of times each phase is measured.', default=REPEAT)
+    
+    parser.add_argument('-steps', type=int,
+                        help='The number of iterations of the whole simulation measured.', default=STEPS)
+    
+    parser.add_argument('-pictures', type=int,
+                        help='The largest size of plate whose pictures are measured.', default=PICTURE_LIMIT)
+    
+    parser.add_argument('-o', '-output', type=str,
+                        help='The JSON file where the results are saved.', default="benchmark.json")
+    
+    parser.add_argument('-compare', type=str,
+                        help='A JSON file of older results, to which the new results are compared.', default=None)
+    
+    parser.add_argument('-threshold', type=float,
+                        help='The slow down beyond which a phase is considered to have regressed (0.1 for 10 %%).', default=THRESHOLD)
+    return parser
+
+def main(argv=None):
+    """
+    Runs the benchmarks with the parameters given on the command line.
+    The script exits with the status 1 if a phase regressed compared to the older results.
+    
+    :param argv: (list of str) [DEFAULT: sys.argv[1:]] the arguments
+    :return: None
+    """
+    parameter = vars(build_parser().parse_args(argv))
+    print("           Phase   Size Approx    Best (s)   Median (s)")
+    results = run_benchmarks(sizes=parameter['sizes'], approximations=parameter['app'], phases=parameter['phases'],
+                             repeat=parameter['repeat'], steps=parameter['steps'], picture_limit=parameter['pictures'])
+    with open(parameter['o'], "w") as file:
+        json.dump(results, file, indent=1)
+    print("Results saved in {}".format(parameter['o']))
+    
+    if parameter['compare'] is not None:
+        with open(parameter['compare']) as file:
+            baseline = json.load(file)
+        regressions = compare_results(results, baseline, parameter['threshold'])
+        for phase, size, approximation, old, new in regressions:
+            print("Regression: {} on {}x{} (approximation {}): {:.6f}s -> {:.6f}s (+{:.0%})".format(
+                  phase, size, size, approximation, old, new, new / old - 1))
+        if regressions:
+            sys.exit(1)
+        print("No regression beyond {:.0%}".format(parameter['threshold']))
+
+if __name__ == '__main__':
+    main()
@@ -6,12 +6,38 @@
 Simulates the growth of a snowflake and displays it in real-time
 """
 
-from PIL import Image, ImageDraw
-from copy import copy, deepcopy
-import random
+from PIL import Image, ImageDraw, GifImagePlugin
+from collections.abc import MutableMapping
+from dataclasses import dataclass, replace, asdict
+from functools import lru_cache
+from contextlib import contextmanager
+from collections import namedtuple, deque
+from itertools import product
+from multiprocessing import shared_memory
+import multiprocessing
+import threading
 import os
+import mmap
+import tempfile
+import shutil
+import json
+import hashlib
+import struct
+import zlib
+import time
+import csv
+import sys
 import argparse
-import imageio
+import numpy as np
+
+try:
+    import resource # Only on Unix, to read the memory used by the process
+except ImportError:
+    resource = None
+try:
+    import fcntl # Only on Unix, to lock the result cache between processes
+except ImportError:
+    fcntl = None
 
 NUMBER = 500 
 
@@ -32,6 +58,27 @@ APPROXIMATION = 40
 SIGMA = 0.000 # Coefficient for the interference
 DIMENSION = [300,300] # The dimension of the plate (number of rows and columns) (Odd numbers are prefered, because then, there is only one middle cell)
 FREQUENCY = 20 # The frequency at which the program saves the state
+TILE_TOLERANCE = 1e-9 # The change of steam below which a tile of the plate is considered to have converged
+DIFFUSION_BLOCK = 256 # The number of rows of the plate calculated at once by the diffusion
+BATCH_SIZE = 16 # The number of simulations of a sweep advanced together in one array
+CHECKPOINT_KEEP = 2 # The number of checkpoints of a simulation kept on the disk
+FRAME_WORKERS = 2 # The number of processes which save the pictures while the simulation goes on
+FRAME_QUEUE = 8 # The number of pictures which can wait to be saved before the simulation waits for them
+ANIMATION_FPS = 25 # The number of pictures per second of the animation
+KEYFRAME_FREQUENCY = 100 # The frequency at which the steam is saved in the history of a simulation
+METRICS_INTERVAL = 10 # The frequency at which the measures of a simulation are written
+GROWTH_MARGIN = 16 # The number of cells added beyond what is needed on each side of a growing plate when it grows
+FAR_BAND = 16 # The number of cells between the window of the approximation and the coarse grid of a far field simulation
+TIP_NEIGHBOURS = 3 # The largest number of neighbours in the crystal of a cell counted as a tip of the crystal by `MorphologyTracker`
+NEIGHBOUR_TABLE_LIMIT = 1 << 21 # The largest number of cells of a plate whose neighbours are read from a table rather than calculated
+NEIGHBOUR_TABLE_KEEP = 4 # The number of tables of neighbours kept in memory by `neighbour_table`
+HEXAGON_BLOCK = 256 # The number of rows of cells drawn or coloured at once in the pictures made of hexagons
+NOISE_TILE = 128 # The size of the square tiles of the plate which each draw the noise of the interference from their own stream
+# The folder where the tables which only depend on the dimension of the plate are saved between runs (None to disable it)
+CACHE_DIRECTORY = os.environ.get("SNOWFLAKE_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "snowflake_growth"))
+RESULT_DIRECTORY = os.path.join(CACHE_DIRECTORY, "results") # The folder of the states of the simulations kept by `ResultCache`
+RESULT_CACHE_SIZE = 2048 # The largest size of the states of the simulations kept by `ResultCache`, in megabytes
+ENGINE_VERSION = 2 # Increased when a change of the code changes the states of the simulations, so the older results are not used
 
 DEFAULT_CELL = {"is_in_crystal":False, "b":0, "c":0, "d":RHO}
 # b == proportion of quasi-liquid water
@@ -40,76 +87,425 @@ DEFAULT_CELL = {"is_in_crystal":False, "b":0, "c":0, "d":RHO}
 
 # NOTE : The dimension is in the form (rows, columns) And so are the coordinates
 
-# Setup functions
-
-parser = argparse.ArgumentParser(description='Allow the user to generate a snowflake.',formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-
-parser.add_argument('-a', '-alpha', type=float,
-                    help='The Alpha value, 1st value of the attachment phase.', default=ALPHA)
-
-parser.add_argument('-b', '-beta', type=float,
-                    help='The Beta value, 2nd value of the attachment phase.', default=BETA)
-
-parser.add_argument('-t','-theta', type=float,
-                    help='The Theta value, 3rd value of the attachment phase.', default=THETA)
-
-parser.add_argument('-g','-gamma', type=float,
-                    help='The Gamma value, 1st coefficient of the melting phase, corresponds to the ice transformed into steam.', default=GAMMA)
+@dataclass
+class SimulationConfig(object):
+    """
+    The parameters of a simulation. The defaults are the constants of the module.
+    
+    :Attributes:
+        - number: (int) the number of iterations
+        - dimension: (tuple) couple of positives integers (row, column), the dimension of the plate
+        - init_pos: (tuple) the coordinates of the first crystal, None for the middle of the plate
+        - alpha, beta, theta: (float) the coefficients of the attachment phase
+        - gamma, mu: (float) the coefficients of the melting phase
+        - kappa: (float) the coefficient of the freezing phase
+        - rho: (float) the density of steam in each cell at the beginning of the simulation
+        - sigma: (float) the coefficient for the interference
+        - seed: (int) the seed of the noise of the interference, None to draw one when the simulation is created (see `seeded`)
+        - approximation: (int) the distance from the furthest point of the snowflake beyond which the diffusion is not calculated, 0 for the whole plate
+        - frequency: (int) the frequency at which the states of the snowflake are saved
+        - symmetric: (bool) True to only simulate one twelfth of the largest hexagon which fits in the plate (see `SymmetricSimulation`),
+          which needs an approximation of 0
+        - tile_size: (int) the size of the tiles whose activity is tracked (see `ActiveTiles`), 0 to use the approximation window instead.
+          Only used by `Simulation`
+        - tile_tolerance: (float) the change of steam below which a tile is considered to have converged
+        - workers: (int) the number of processes which share the plate (see `ParallelSimulation`)
+        - checkpoint_frequency: (int) the frequency at which the state of the simulation is saved to be resumed later, 0 to never save it
+        - resume: (bool) True to resume the simulation from its last checkpoint
+        - frame_workers: (int) the number of processes which save the pictures (see `FrameWriter`), 0 to save them in the simulation loop
+        - history: (bool) True to record the history of the simulation (see `HistoryWriter`)
+        - keyframe_frequency: (int) the frequency at which the steam is saved in the history, 0 to never save it
+        - metrics: (str) the CSV or JSON lines file where the measures of the simulation are written (see `MetricsWriter`), None to not measure it
+        - metrics_interval: (int) the frequency at which the measures are written
+        - precision: (str) the type of the quasi-liquid water, ice and steam, "float64" or "float32" which uses half the memory
+        - growing: (bool) True to start with a small plate around `init_pos` which grows with the crystal (see `GrowingSimulation`)
+        - far_field: (int) the size of the blocks of the coarse grid on which the steam is calculated far from the crystal
+          (see `FarFieldSimulation`), 0 to only calculate it in the window of the approximation
+        - far_band: (int) the number of cells between the window of the approximation and the coarse grid
+        - cache: (str) the folder of a `ResultCache` the simulation starts from and saves its states in, None to not use it
+        - cache_size: (float) the largest size of the cache, in megabytes
+        - morphology: (int) the frequency at which the shape of the crystal is measured (see `MorphologyTracker`), 0 to not measure it
+        - pictures: (bool) False to not save the pictures nor the animation, when only the measures are needed
+        - storage: (str) the folder where the plate is kept in memory-mapped files (see `create_plate`) for the plates which
+          do not fit in memory, None to keep it in memory. Only used by `Simulation`, the other kinds of simulation refuse it
+        - target_radius: (int) the `max_point` at which the simulation stops, 0 to not stop it
+        - stall: (int) the number of iterations without any cell joining the crystal after which the simulation stops, 0 to not stop it
+        - synchronous: (bool) True to freeze all the cells at the border before the attachment phase instead of updating them
+          one after the other like the first versions (see `boundary_rules`), which gives other snowflakes. Needed by the symmetric simulation
+        - cache_directory: (str) the folder where the tables which only depend on the dimension of the plate (see `neighbour_table`
+          and `hexagon_map`) are saved between runs, None to build them again in each run
+    
+    Exemple:
+    
+    >>> config = SimulationConfig(dimension=(11, 11), number=5)
+    >>> config.initial_position, config.alpha
+    ((5, 5), 0.6)
+    """
+    number: int = NUMBER
+    dimension: tuple = tuple(DIMENSION)
+    init_pos: tuple = None
+    alpha: float = ALPHA
+    beta: float = BETA
+    theta: float = THETA
+    gamma: float = GAMMA
+    mu: float = MU
+    kappa: float = KAPPA
+    rho: float = RHO
+    sigma: float = SIGMA
+    seed: int = None
+    approximation: int = APPROXIMATION
+    frequency: int = FREQUENCY
+    symmetric: bool = False
+    tile_size: int = 0
+    tile_tolerance: float = TILE_TOLERANCE
+    workers: int = 1
+    checkpoint_frequency: int = 0
+    resume: bool = False
+    frame_workers: int = FRAME_WORKERS
+    history: bool = False
+    keyframe_frequency: int = KEYFRAME_FREQUENCY
+    metrics: str = None
+    metrics_interval: int = METRICS_INTERVAL
+    precision: str = "float64"
+    growing: bool = False
+    far_field: int = 0
+    far_band: int = FAR_BAND
+    cache: str = None
+    cache_size: float = RESULT_CACHE_SIZE
+    morphology: int = 0
+    pictures: bool = True
+    storage: str = None
+    target_radius: int = 0
+    stall: int = 0
+    synchronous: bool = False
+    cache_directory: str = CACHE_DIRECTORY
+    
+    def __post_init__(self):
+        self.dimension = (int(self.dimension[0]), int(self.dimension[1]))
+        if self.init_pos is not None:
+            self.init_pos = (int(self.init_pos[0]), int(self.init_pos[1]))
+    
+    @property
+    def initial_position(self):
+        """
+        (tuple) the coordinates of the first crystal cell
+        """
+        if self.init_pos is None:
+            return (self.dimension[0]//2, self.dimension[1]//2)
+        return self.init_pos
 
-parser.add_argument('-m','-mu', type=float,
-                    help='The Mu value, 2nd coefficient of the melting phase, corresponds to the water transformed into steam.', default=MU)
 
-parser.add_argument('-k','-kappa', type=float,
-                    help='The Kappa value, coefficient of the freezing phase, corresponds to steam which is transformed into ice for a border cell.', default=KAPPA)
+# Setup functions
 
-parser.add_argument('-r', '-rho', type=float,
-                    help='The Rho value, corresponds to the density of steam in each cell at the beginning of the simulation.', default=RHO)
+def build_parser():
+    """
+    Returns the parser of the command line arguments of the script
+    
+    :return: (argparse.ArgumentParser) the parser
+    """
+    parser = argparse.ArgumentParser(description='Allow the user to generate a snowflake.',formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    
+    parser.add_argument('-a', '-alpha', type=float,
+                        help='The Alpha value, 1st value of the attachment phase.', default=ALPHA)
+    
+    parser.add_argument('-b', '-beta', type=float,
+                        help='The Beta value, 2nd value of the attachment phase.', default=BETA)
+    
+    parser.add_argument('-t','-theta', type=float,
+                        help='The Theta value, 3rd value of the attachment phase.', default=THETA)
+    
+    parser.add_argument('-g','-gamma', type=float,
+                        help='The Gamma value, 1st coefficient of the melting phase, corresponds to the ice transformed into steam.', default=GAMMA)
+    
+    parser.add_argument('-m','-mu', type=float,
+                        help='The Mu value, 2nd coefficient of the melting phase, corresponds to the water transformed into steam.', default=MU)
+    
+    parser.add_argument('-k','-kappa', type=float,
+                        help='The Kappa value, coefficient of the freezing phase, corresponds to steam which is transformed into ice for a border cell.', default=KAPPA)
+    
+    parser.add_argument('-r', '-rho', type=float,
+                        help='The Rho value, corresponds to the density of steam in each cell at the beginning of the simulation.', default=RHO)
+    
+    parser.add_argument('-s', '-sigma', type=float,
+                        help='The Sigma value, corresponds to the interference.', default=SIGMA)
+    
+    parser.add_argument('-seed', type=int,
+                        help='The seed of the interference, the same seed gives the same snowflake. Drawn at random if it is not given.', default=None)
+    
+    parser.add_argument('-app', '-approximation', type=int,
+                        help='The Approximation value, the range which represents the distance from the initial cell where the calculous are made. (Below 20 is deprecated)', default=APPROXIMATION)
+    
+    parser.add_argument('-n','-number', type=int,
+                        help='The Number of iterations.', default=NUMBER)
+    
+    parser.add_argument('-d', '-dimension', type=int,
+                        help='The Dimension value, corresponds to the size of your screen for the creation of the snowflake.', default=DIMENSION[0])
+    
+    parser.add_argument('-f', '-frequency', type=int,
+                        help='The Frequency value, every time we pass the number of frames corresponding to the frequency, a picture is created.', default=FREQUENCY)
+    
+    parser.add_argument('-sym', '-symmetric', action='store_true',
+                        help='Only simulates one twelfth of the largest hexagon around the first crystal which fits in the plate and deduces the rest by symmetry (needs -sync, a Sigma and an Approximation of 0). '
+                             'The steam beyond the hexagon stays at Rho and the crystal stops at its edge, so the snowflake differs from the one of the whole plate once the steam near the edge changes.')
+    
+    parser.add_argument('-tile', type=int,
+                        help='The size of the tiles of the plate, the calculous are only made on the tiles where the steam changes or near the crystal. 0 to use the Approximation instead.', default=0)
+    
+    parser.add_argument('-tol', '-tolerance', type=float,
+                        help='The change of steam below which a tile stops being calculated.', default=TILE_TOLERANCE)
+    
+    parser.add_argument('-w', '-workers', type=int,
+                        help='The number of processes which calculate the plate, each one on a strip of rows.', default=1)
+    
+    parser.add_argument('-c', '-checkpoint', type=int,
+                        help='The Checkpoint frequency, every time we pass this number of frames, the state of the simulation is saved so it can be resumed. 0 to never save it.', default=0)
+    
+    parser.add_argument('-resume', '--resume', action='store_true',
+                        help='Resumes the simulation from its last checkpoint instead of starting it over. The options of the run (-n, -w, -hist, -metrics...) are the ones given, the ones which change the snowflake (-p, -sync...) can not change.')
+    
+    parser.add_argument('-fw', '-frame-workers', type=int,
+                        help='The number of processes which save the pictures while the simulation goes on. 0 to save them in the simulation loop.', default=FRAME_WORKERS)
+    
+    parser.add_argument('-hist', '-history', action='store_true',
+                        help='Records the iteration at which each cell joins the crystal and the steam every Keyframe frames, from which any frame can be drawn again.')
+    
+    parser.add_argument('-key', '-keyframe', type=int,
+                        help='The Keyframe frequency, every time we pass this number of frames, the steam is saved in the history. 0 to never save it.', default=KEYFRAME_FREQUENCY)
+    
+    parser.add_argument('-metrics', type=str,
+                        help='The file where the time taken by each phase, the size of the crystal and the memory used are written (CSV if it ends with .csv, JSON lines otherwise).', default=None)
+    
+    parser.add_argument('-mi', '-metrics-interval', type=int,
+                        help='The Metrics interval, every time we pass this number of frames, the measures are written.', default=METRICS_INTERVAL)
+    
+    parser.add_argument('-p', '-precision', choices=["float64", "float32"],
+                        help='The type of the quantities of water, ice and steam. float32 uses half the memory and is faster on large plates.', default="float64")
+    
+    parser.add_argument('-grow', '-growing', action='store_true',
+                        help='Starts with a small plate around the first crystal which grows with the crystal up to the Dimension (needs an Approximation, beyond which the steam of the plate stays at Rho).')
+    
+    parser.add_argument('-far', '-far-field', type=int,
+                        help='The size of the blocks of a coarse grid on which the steam is calculated beyond the Approximation, so the whole plate is a reservoir of steam. 0 to keep the steam at Rho beyond the Approximation.', default=0)
+    
+    parser.add_argument('-band', type=int,
+                        help='The number of cells between the Approximation and the coarse grid of the far field.', default=FAR_BAND)
+    
+    parser.add_argument('-cache', nargs='?', const=RESULT_DIRECTORY,
+                        help='Starts from the states of the simulations with the same parameters saved in this folder, and saves the new ones in it.', default=None)
+    
+    parser.add_argument('-cache-size', type=float,
+                        help='The largest size of the cache in megabytes, the simulations used the longest time ago are removed beyond it.', default=RESULT_CACHE_SIZE)
+    
+    parser.add_argument('-morph', '-morphology', type=int,
+                        help='The frequency at which the area, the perimeter, the tips, the symmetry and the fractal dimension of the crystal are written in morphology.csv. 0 to not measure them.', default=0)
+    
+    parser.add_argument('-no-pictures', dest='pictures', action='store_false',
+                        help='Does not save the pictures nor the animation of the snowflake.')
+    
+    parser.add_argument('-storage', nargs='?', const=tempfile.gettempdir(),
+                        help='Keeps the plate in files of this folder instead of the memory, for the plates larger than the memory. Can not be used with -w, -sym, -far or -grow.', default=None)
+    
+    parser.add_argument('-radius', type=int,
+                        help='Stops the simulation when the crystal reaches this distance from the first cell. 0 to never stop it.', default=0)
+    
+    parser.add_argument('-stall', type=int,
+                        help='Stops the simulation when the crystal did not grow during this number of frames. 0 to never stop it.', default=0)
+    
+    parser.add_argument('-sync', '-synchronous', action='store_true',
+                        help='Freezes all the cells at the border of the crystal before any of them is attached. '
+                             'This changes the snowflake: by default the cells are frozen, attached and melted one after the other like in the first versions.')
+    return parser
 
-parser.add_argument('-s', '-sigma', type=float,
-                    help='The Sigma value, corresponds to the interference.', default=SIGMA)
+def parse_arguments(argv=None):
+    """
+    Returns the configuration of the simulation given by the command line arguments
+    
+    :param argv: (list of str) [DEFAULT: sys.argv[1:]] the arguments
+    :return: (SimulationConfig) the configuration
+    
+    Exemple:
+    
+    >>> config = parse_arguments(["-a", "0.5", "-d", "101"])
+    >>> config.alpha, config.dimension, config.beta
+    (0.5, (101, 101), 0.6)
+    """
+    parser = build_parser()
+    parameter = vars(parser.parse_args(argv))
+    config = SimulationConfig(number=parameter['n'], dimension=(parameter['d'], parameter['d']),
+                            alpha=parameter['a'], beta=parameter['b'], theta=parameter['t'],
+                            gamma=parameter['g'], mu=parameter['m'], kappa=parameter['k'],
+                            rho=parameter['r'], sigma=parameter['s'], seed=parameter['seed'],
+                            approximation=parameter['app'], frequency=parameter['f'],
+                            symmetric=parameter['sym'], tile_size=parameter['tile'],
+                            tile_tolerance=parameter['tol'], workers=parameter['w'],
+                            checkpoint_frequency=parameter['c'], resume=parameter['resume'],
+                            frame_workers=parameter['fw'], history=parameter['hist'],
+                            keyframe_frequency=parameter['key'], metrics=parameter['metrics'],
+                            metrics_interval=parameter['mi'], precision=parameter['p'], growing=parameter['grow'],
+                            far_field=parameter['far'], far_band=parameter['band'],
+                            cache=parameter['cache'], cache_size=parameter['cache_size'],
+                            morphology=parameter['morph'], pictures=parameter['pictures'],
+                            storage=parameter['storage'], target_radius=parameter['radius'], stall=parameter['stall'],
+                            synchronous=parameter['sync'])
+    try:
+        check_options(config)
+    except ValueError as error:
+        parser.error(str(error))
+    return config
 
-parser.add_argument('-app', '-approximation', type=int,
-                    help='The Approximation value, the range which represents the distance from the initial cell where the calculous are made. (Below 20 is deprecated)', default=APPROXIMATION)
+class Cell(MutableMapping):
+    """
+    A view on one cell of a `Plate` which behaves like the dictionnary the cells used to be.
+    Reading or writing a key reads or writes the arrays of the plate, so the phases working on
+    a single cell (`freezing`, `attachment`, `melting`...) keep working on an array backed plate.
+    
+    :Keys of the cell:
+        - "is_in_crystal" : (bool) True if the cell belongs to the crystal, False otherwise
+        - "b": (float) the proportion of quasi-liquid water
+        - "c" : (float) the proportion of ice
+        - "d" : (float) the proportion of steam
+        - "i" : (int) the iteration at which the cell joined the crystal (only for crystal cells)
+    """
+    __slots__ = ("plate", "y", "x")
+    
+    def __init__(self, plate, y, x):
+        self.plate = plate
+        self.y = y
+        self.x = x
+    
+    def _keys(self):
+        if self.plate.crystal[self.y, self.x]:
+            return ("is_in_crystal", "b", "c", "d", "i")
+        return ("is_in_crystal", "b", "c", "d")
+    
+    def __getitem__(self, key):
+        if key == "is_in_crystal":
+            return bool(self.plate.crystal[self.y, self.x])
+        if key in ("b", "c", "d"):
+            return float(getattr(self.plate, key)[self.y, self.x])
+        if key == "i" and self.plate.crystal[self.y, self.x]:
+            return int(self.plate.i[self.y, self.x])
+        raise KeyError(key)
+    
+    def __setitem__(self, key, value):
+        if key == "is_in_crystal":
+            self.plate.crystal[self.y, self.x] = value
+            if not value:
+                self.plate.i[self.y, self.x] = -1
+        elif key in ("b", "c", "d", "i"):
+            getattr(self.plate, key)[self.y, self.x] = value
+        else:
+            raise KeyError(key)
+    
+    def __delitem__(self, key):
+        raise TypeError("The properties of a cell can not be deleted")
+    
+    def __iter__(self):
+        return iter(self._keys())
+    
+    def __len__(self):
+        return len(self._keys())
+    
+    def __repr__(self):
+        return repr(dict(self))
 
-parser.add_argument('-n','-number', type=int,
-                    help='The Number of iterations.', default=NUMBER)
 
-parser.add_argument('-d', '-dimension', type=int,
-                    help='The Dimension value, corresponds to the size of your screen for the creation of the snowflake.', default=DIMENSION[0])
+class PlateRow(object):
+    """
+    A row of a `Plate`, so that the cells can still be accessed with `plate[y][x]`
+    """
+    __slots__ = ("plate", "y")
+    
+    def __init__(self, plate, y):
+        self.plate = plate
+        self.y = y
+    
+    def __getitem__(self, x):
+        return Cell(self.plate, self.y, x)
+    
+    def __setitem__(self, x, di):
+        """
+        Replaces the cell at the column `x` by the cell `di` (a dictionnary or a `Cell`)
+        """
+        cell = Cell(self.plate, self.y, x)
+        for key in ("b", "c", "d"):
+            cell[key] = di[key]
+        cell["is_in_crystal"] = di["is_in_crystal"]
+        if di["is_in_crystal"]:
+            cell["i"] = di["i"]
+    
+    def __len__(self):
+        return self.plate.shape[1]
+    
+    def __iter__(self):
+        for x in range(self.plate.shape[1]):
+            yield Cell(self.plate, self.y, x)
 
-parser.add_argument('-f', '-frequency', type=int,
-                    help='The Frequency value, every time we pass the number of frames corresponding to the frequency, a picture is created.', default=FREQUENCY)
 
-parameter = vars(parser.parse_args())
-print(parameter)
+class Plate(object):
+    """
+    The support of the simulation, stored as a structure of arrays (one contiguous array per property of the cells)
+    
+    :Attributes:
+        - b: (numpy.ndarray of float) the proportion of quasi-liquid water of each cell
+        - c: (numpy.ndarray of float) the proportion of ice of each cell
+        - d: (numpy.ndarray of float) the quantity of steam of each cell
+        - crystal: (numpy.ndarray of bool) True for the cells which belong to the crystal
+        - i: (numpy.ndarray of int32) the iteration at which each cell joined the crystal, -1 if it did not
+    
+    The cells can still be accessed like in a list of list of dictionnaries with `plate[y][x]`
+    """
+    
+    def __init__(self, b, c, d, crystal, i):
+        self.b = b
+        self.c = c
+        self.d = d
+        self.crystal = crystal
+        self.i = i
+    
+    @property
+    def shape(self):
+        """
+        (tuple) the dimension of the plate (rows, columns)
+        """
+        return self.d.shape
+    
+    @property
+    def nbytes(self):
+        """
+        (int) the number of bytes used by the arrays of the plate
+        """
+        return sum(a.nbytes for a in (self.b, self.c, self.d, self.crystal, self.i))
+    
+    def copy(self):
+        """
+        Returns a copy of the plate which does not share its arrays with the original one
+        """
+        return Plate(self.b.copy(), self.c.copy(), self.d.copy(), self.crystal.copy(), self.i.copy())
+    
+    def __getitem__(self, y):
+        return PlateRow(self, y)
+    
+    def __len__(self):
+        return self.shape[0]
+    
+    def __iter__(self):
+        for y in range(self.shape[0]):
+            yield PlateRow(self, y)
 
-ALPHA = parameter['a']
-APPROXIMATION = parameter['app']
-BETA = parameter['b']
-DIMENSION = (parameter['d'],parameter['d'])
-FREQUENCY = parameter['f']
-GAMMA = parameter['g']
-KAPPA = parameter['k']
-MU = parameter['m']
-NUMBER = parameter['n']
-RHO = parameter['r']
-SIGMA = parameter['s']
-THETA = parameter['t']
 
-def create_plate(dim=DIMENSION, initial_position=-1):
+def create_plate(dim=DIMENSION, initial_position=-1, rho=None, dtype=np.float64, directory=None):
     """
-    Returns a newly created plate which is a matrix of dictionnaries (a matrix of cells) and places the first crystal cell in it at the inital_pos
-    The keys in a dictionnary represent the properties of the cell
-    
-    :Keys of the dictionnary:
-        - "is_in_crystal" : (bool) True if the cell belongs to the crystal, False otherwise
-        - "b": (float) the proportion of quasi-liquid water
-        - "c" : (float) the proportion of ice
-        - "d" : (float) the proportion of steam
+    Returns a newly created plate (see `Plate`) and places the first crystal cell in it at the inital_pos
+    Each cell is initialised with the values of `DEFAULT_CELL`
     
     :param dim: (tuple) [DEFAULT: DIMENSION] couple of positives integers (row, column), the dimension of the plate
     :param initial_position: (tuple) [DEFAULT: The middle of the plate] the coordinates of the first crystal
-    :return: (list of list of dictionnaries) the plate
+    :param rho: (float) [DEFAULT: DEFAULT_CELL["d"]] the quantity of steam in each cell
+    :param dtype: (numpy.dtype) [DEFAULT: numpy.float64] the type of the quasi-liquid water, ice and steam
+    :param directory: (str) [DEFAULT: None] a folder where the arrays are kept in memory-mapped `.npy` files,
+        which the system reads and writes when they are used, None to keep them in memory
+    :return: (Plate) the plate
     
     Exemples:
     
@@ -123,17 +519,36 @@ def create_plate(dim=DIMENSION, initial_position=-1):
     ...             print(k, ":", d[k], ", ", end="")
     ...         print("}, ", end="")
     ...     print("]")
-    [{b : 0 , c : 0 , d : 1 , is_in_crystal : False , }, {b : 0 , c : 0 , d : 1 , is_in_crystal : False , }, {b : 0 , c : 0 , d : 1 , is_in_crystal : False , }, ]
-    [{b : 0 , c : 0 , d : 1 , is_in_crystal : False , }, {b : 0 , c : 1 , d : 0 , i : 0 , is_in_crystal : True , }, {b : 0 , c : 0 , d : 1 , is_in_crystal : False , }, ]
-    [{b : 0 , c : 0 , d : 1 , is_in_crystal : False , }, {b : 0 , c : 0 , d : 1 , is_in_crystal : False , }, {b : 0 , c : 0 , d : 1 , is_in_crystal : False , }, ]
+    [{b : 0.0 , c : 0.0 , d : 1.0 , is_in_crystal : False , }, {b : 0.0 , c : 0.0 , d : 1.0 , is_in_crystal : False , }, {b : 0.0 , c : 0.0 , d : 1.0 , is_in_crystal : False , }, ]
+    [{b : 0.0 , c : 0.0 , d : 1.0 , is_in_crystal : False , }, {b : 0.0 , c : 1.0 , d : 0.0 , i : 0 , is_in_crystal : True , }, {b : 0.0 , c : 0.0 , d : 1.0 , is_in_crystal : False , }, ]
+    [{b : 0.0 , c : 0.0 , d : 1.0 , is_in_crystal : False , }, {b : 0.0 , c : 0.0 , d : 1.0 , is_in_crystal : False , }, {b : 0.0 , c : 0.0 , d : 1.0 , is_in_crystal : False , }, ]
+    >>> int(plate.crystal.sum()), plate.d.dtype, plate.i.dtype
+    (1, dtype('float64'), dtype('int32'))
     >>> DEFAULT_CELL["d"] = RHO # Reverts to original state
     """
-    plate = [[copy(DEFAULT_CELL) for j in range(dim[1])] for i in range(dim[0])]
-    if initial_position == -1:
+    dim = (dim[0], dim[1])
+    values = {"b": (DEFAULT_CELL["b"], dtype), "c": (DEFAULT_CELL["c"], dtype), "d": (DEFAULT_CELL["d"] if rho is None else rho, dtype),
+              "crystal": (False, bool), "i": (-1, np.int32)}
+    if directory is None:
+        plate = Plate(**{name: np.full(dim, value, dtype=kind) for name, (value, kind) in values.items()})
+    else:
+        arrays = {}
+        for name, (value, kind) in values.items():
+            arrays[name] = np.lib.format.open_memmap(os.path.join(directory, name + ".npy"), mode="w+", dtype=kind, shape=dim)
+            if value:
+                arrays[name][...] = value
+        plate = Plate(**arrays)
+    if initial_position is None or initial_position == -1:
         initial_position = (dim[0]//2, dim[1]//2)
     plate[initial_position[0]][initial_position[1]] = {"is_in_crystal":True, "b":0, "c":1, "d":0, "i":0}
     return plate
 
+# The offsets (row, column) of the six neighbours of a cell, for the cells on an even line and on an odd line
+# (the odd lines are shifted by half a cell to the right)
+NEIGHBOUR_OFFSETS = (((0, -1), (-1, -1), (-1, 0), (0, 1), (1, 0), (1, -1)),
+                     ((0, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0)))
+EARLIER_NEIGHBOURS = 3 # The first neighbours of NEIGHBOUR_OFFSETS, the left one and the two of the row above, come before the cell row by row
+
 def generate_neighbours(coordinates):
     """
     Returns the coordinates of potential neighbours of a given cell
@@ -150,12 +565,7 @@ def generate_neighbours(coordinates):
     """
     x = coordinates[1]
     y = coordinates[0]
-    
-    if y % 2 == 0: # If the number of the line is even
-        return [(y, x-1), (y-1, x-1), (y-1, x), (y, x+1), (y+1, x), (y+1, x-1)]
-
-    else:
-        return [(y, x-1), (y-1, x), (y-1, x+1), (y, x+1), (y+1, x+1), (y+1, x)]
+    return [(y + dy, x + dx) for dy, dx in NEIGHBOUR_OFFSETS[y % 2]]
 
 def get_neighbours(coordinates, dim=DIMENSION):
     """
@@ -176,77 +586,353 @@ def get_neighbours(coordinates, dim=DIMENSION):
     [(2, 1), (1, 1), (1, 2), (2, 3), (3, 2), (3, 1)]
     """
     # Test if the coordinates are correct, if they are not correct, it removes them from the list
-    list_neighbours = [x for x in generate_neighbours(coordinates) if all(i >= 0 for i in x) and all(i < dim[j] for i in x for j in range(2))]
+    list_neighbours = [(y, x) for (y, x) in generate_neighbours(coordinates) if 0 <= y < dim[0] and 0 <= x < dim[1]]
     return list_neighbours
 
 
-# Dynamics functions
-def diffusion_cell(y, x, cell, changes_to_make, plate_in):
+def cell_neighbours(cells, dim):
+    """
+    Returns the numbers of the neighbours of some cells of a plate. The cells are numbered row by row (y * dim[1] + x)
+    
+    :param cells: (numpy.ndarray of int) the numbers of the cells
+    :param dim: (tuple) couple of positives integers (row, column), the dimension of the plate
+    :return: (numpy.ndarray of int64) array of shape (len(cells), 6), the numbers of the neighbours of each cell in the order
+        of `NEIGHBOUR_OFFSETS`, -1 for the neighbours outside of the plate
+    
+    Exemple:
+    
+    >>> cell_neighbours(np.array([0, 12]), (5, 5)).tolist()
+    [[-1, -1, -1, 1, 5, -1], [11, 6, 7, 13, 17, 16]]
+    """
+    y, x = np.divmod(np.asarray(cells, dtype=np.int64), dim[1])
+    offsets = np.array(NEIGHBOUR_OFFSETS) # Shape (2, 6, 2)
+    dy = offsets[y % 2, :, 0] + y[:, None]
+    dx = offsets[y % 2, :, 1] + x[:, None]
+    inside = (dy >= 0) & (dy < dim[0]) & (dx >= 0) & (dx < dim[1])
+    return np.where(inside, dy * dim[1] + dx, -1)
+
+NEIGHBOUR_TABLES = {} # The tables of neighbours kept in memory by `neighbour_table`, the last used at the end
+
+def load_or_build(path, shape, dtype, build):
+    """
+    Returns an array saved in a file, mapped in memory so that the processes which read it share the same pages,
+    or builds it and saves it in the file when the file does not hold it, so it is only built once
+    
+    :param path: (str) the path of the .npy file, None to only build the array
+    :param shape: (tuple) the shape of the array
+    :param dtype: (numpy.dtype) the type of the array
+    :param build: (callable) function without parameter which builds the array
+    :return: (numpy.ndarray) the array, read only
+    
+    Exemple:
+    
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as folder:
+    ...     array = load_or_build(folder + "/ones.npy", (2, 3), np.int8, lambda: np.ones((2, 3), dtype=np.int8))
+    ...     again = load_or_build(folder + "/ones.npy", (2, 3), np.int8, None)
+    ...     type(again).__name__, again.tolist() == array.tolist(), again.flags.writeable
+    ('memmap', True, False)
+    """
+    if path is not None:
+        try:
+            array = np.load(path, mmap_mode="r")
+            if array.shape == tuple(shape) and array.dtype == dtype:
+                return array
+        except (OSError, ValueError):
+            pass
+    
+    array = build()
+    if path is not None:
+        # Written under another name then renamed, so that another process never reads half an array
+        temporary = "{}.{}.tmp".format(path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temporary, "wb") as file:
+                np.save(file, array)
+            os.replace(temporary, path)
+        except OSError:
+            pass
+    array.flags.writeable = False
+    return array
+
+def build_neighbour_table(dim):
+    """
+    Builds the table of the neighbours of every cell of a plate, without the caches of `neighbour_table`
+    
+    :param dim: (tuple) couple of positives integers (row, column), the dimension of the plate
+    :return: (numpy.ndarray of int32) read only array of shape (dim[0] * dim[1], 6)
+    
+    Exemple:
+    
+    >>> build_neighbour_table((5, 5))[12].tolist()
+    [11, 6, 7, 13, 17, 16]
+    """
+    table = cell_neighbours(np.arange(dim[0] * dim[1], dtype=np.int64), dim).astype(np.int32)
+    table.flags.writeable = False
+    return table
+
+def neighbour_table(dim, cache_directory=None):
     """
-    Adds to the `changes_to_make` dictionnary the changes that will have to be applied to the `cell` at coordinates `y` `x` during the diffusion phase.
-    :param y: (int) the y coordinate of the cell
-    :param x: (int) the x coordinate of the cell
-    :param cell: (dict) A cell
-    :param changes_to_make: (dict) A dictionnary which records all changes that have to be made at the end of the phase
-    :param plate_in: (list(list(dict))) The support of the simulation 
-    :return: (dict) changes_to_make
+    Returns the table of the neighbours of every cell of a plate. The cells are numbered row by row (y * dim[1] + x)
+    and the row n of the table holds the numbers of the six neighbours of the cell n in the order of `NEIGHBOUR_OFFSETS`,
+    -1 for the neighbours outside of the plate.
+    The tables of the last `NEIGHBOUR_TABLE_KEEP` dimensions are kept in memory, whatever the folder given, and a table
+    which is not in memory is read from `cache_directory` or built and saved there, so it is only built once.
+    
+    :param dim: (tuple) couple of positives integers (row, column), the dimension of the plate
+    :param cache_directory: (str) [DEFAULT: None] the folder where the table is saved (usually CACHE_DIRECTORY),
+        None to not save it
+    :return: (numpy.ndarray of int32) read only array of shape (dim[0] * dim[1], 6)
     
-    UC : x and y positives and in the dimension
     Exemple:
     
-    >>> diffusion_cell(0, 0, little_plate[0][0], {}, little_plate)
-    {(0, 0): 1.1}
-    >>> little_plate[0][0]["d"] = 0.5
-    >>> cell = diffusion_cell(0, 0, little_plate[0][0], {(0, 2): 1.0}, little_plate)
-    >>> cell == {(0, 0): 0.9, (0, 2): 1.0}
+    >>> table = neighbour_table((5, 5))
+    >>> table.shape, table.dtype
+    ((25, 6), dtype('int32'))
+    >>> [(int(n) // 5, int(n) % 5) for n in table[2 * 5 + 4] if n >= 0] == get_neighbours((2, 4), (5, 5))
     True
+    >>> neighbour_table((5, 5)) is table
+    True
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as folder:
+    ...     table = neighbour_table((4, 7), cache_directory=folder)
+    ...     os.listdir(folder)
+    ['neighbours-4x7.npy']
     """
-    if cell["is_in_crystal"] == False:
-        neighbours = NEIGHBOURS[(y, x)]
-        steam = cell["d"]
-        for (y2,x2) in neighbours:
-            dic = plate_in[y2][x2]
-            # If the neighbour is in the crystal, there's no need to add its steam to the mean, therefore, we add the cell's steam
-            if dic["is_in_crystal"] == True:
-                steam += cell["d"]
-            else:
-                steam += dic["d"] # We add the steam of the neighbour to the list of the steams
-        changes_to_make[(y, x)] = steam / (1+len(neighbours))
-        return changes_to_make
+    dim = (int(dim[0]), int(dim[1]))
+    table = NEIGHBOUR_TABLES.pop(dim, None)
+    if table is None:
+        path = None if cache_directory is None else os.path.join(cache_directory, "neighbours-{}x{}.npy".format(*dim))
+        table = load_or_build(path, (dim[0] * dim[1], 6), np.int32, lambda: build_neighbour_table(dim))
+    
+    NEIGHBOUR_TABLES[dim] = table # The last used is put at the end
+    while len(NEIGHBOUR_TABLES) > NEIGHBOUR_TABLE_KEEP:
+        del NEIGHBOUR_TABLES[next(iter(NEIGHBOUR_TABLES))]
+    return table
+
+def plate_neighbours(cells, dim, cache_directory=None):
+    """
+    Returns the numbers of the neighbours of some cells of a plate, like `cell_neighbours`, but read from the table of
+    `neighbour_table` when the plate has at most NEIGHBOUR_TABLE_LIMIT cells. The neighbours of the cells of larger plates
+    are calculated, their table would take too much memory.
+    
+    :param cells: (numpy.ndarray of int) the numbers of the cells
+    :param dim: (tuple) couple of positives integers (row, column), the dimension of the plate
+    :param cache_directory: (str) [DEFAULT: None] the folder where the table is saved, see `neighbour_table`
+    :return: (numpy.ndarray of int) array of shape (len(cells), 6), the numbers of the neighbours of each cell in the order
+        of `NEIGHBOUR_OFFSETS`, -1 for the neighbours outside of the plate
+    
+    Exemple:
+    
+    >>> plate_neighbours(np.array([0, 12]), (5, 5)).tolist() == cell_neighbours(np.array([0, 12]), (5, 5)).tolist()
+    True
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as folder:
+    ...     make_simulation(SimulationConfig(dimension=(21, 21), number=3, tile_size=8, cache_directory=folder)).run()
+    ...     os.listdir(folder)
+    ['neighbours-21x21.npy']
+    """
+    if dim[0] * dim[1] > NEIGHBOUR_TABLE_LIMIT:
+        return cell_neighbours(cells, dim)
+    return neighbour_table(dim, cache_directory)[np.asarray(cells, dtype=np.int64)]
+
+# Dynamics functions
+def padded_window(array, y0, y1, x0, x1, fill):
+    """
+    Returns a copy of the window [y0, y1[ x [x0, x1[ of the last two axes of `array` with a margin of one cell
+    on each side. The cells of the margin which are outside of the array are set to `fill`
+    
+    :param array: (numpy.ndarray) an array whose last two axes are the rows and the columns of a plate
+    :param y0, y1, x0, x1: (int) the bounds of the window
+    :param fill: the value of the cells outside of the array
+    :return: (numpy.ndarray) the padded window, of shape (..., y1 - y0 + 2, x1 - x0 + 2)
+    
+    Exemple:
+    
+    >>> padded_window(np.arange(9).reshape(3, 3), 0, 2, 1, 3, -1)
+    array([[-1, -1, -1, -1],
+           [ 0,  1,  2, -1],
+           [ 3,  4,  5, -1],
+           [ 6,  7,  8, -1]])
+    """
+    rows, columns = array.shape[-2:]
+    out = np.full(array.shape[:-2] + (y1 - y0 + 2, x1 - x0 + 2), fill, dtype=array.dtype)
+    sy0, sy1 = max(y0 - 1, 0), min(y1 + 1, rows)
+    sx0, sx1 = max(x0 - 1, 0), min(x1 + 1, columns)
+    out[..., sy0 - y0 + 1:sy1 - y0 + 1, sx0 - x0 + 1:sx1 - x0 + 1] = array[..., sy0:sy1, sx0:sx1]
+    return out
+
+def hex_diffusion(d, crystal, y0, y1, x0, x1, block=DIFFUSION_BLOCK):
+    """
+    Returns the steam of the cells of the window [y0, y1[ x [x0, x1[ after one diffusion step.
+    Each cell which is not in the crystal takes the mean of its steam and the steam of its neighbours,
+    a neighbour in the crystal contributes the steam of the cell itself. The cells of the crystal keep their steam.
+    The sums are made in the order of `NEIGHBOUR_OFFSETS`, so the result is exactly the one of the cell by cell version.
+    
+    :param d: (numpy.ndarray of float) the steam of the plate (the last two axes are the rows and the columns)
+    :param crystal: (numpy.ndarray of bool) the crystal mask of the plate, of the same shape as `d`
+    :param y0, y1, x0, x1: (int) the bounds of the window
+    :param block: (int) [DEFAULT: DIFFUSION_BLOCK] the number of rows calculated at once, which bounds the size of the temporary arrays
+    :return: (numpy.ndarray) the new steam of the window, of shape (..., y1 - y0, x1 - x0)
+    
+    Exemple:
+    
+    >>> d = np.full((3, 3), 1.0)
+    >>> d[0, 0] = 8.0
+    >>> crystal = np.zeros((3, 3), dtype=bool)
+    >>> crystal[1, 1] = True
+    >>> hex_diffusion(d, crystal, 0, 2, 0, 2)
+    array([[3.33333333, 2.4       ],
+           [2.16666667, 1.        ]])
+    """
+    out = np.empty(d.shape[:-2] + (y1 - y0, x1 - x0), dtype=d.dtype)
+    for by0 in range(y0, y1, block):
+        by1 = min(by0 + block, y1)
+        counts = neighbour_counts(d.shape[-2:], by0, by1, x0, x1, d.dtype)
+        steam = padded_window(d, by0, by1, x0, x1, 0)
+        in_crystal = padded_window(crystal, by0, by1, x0, x1, False)
+        for parity in (0, 1):
+            first = (parity - by0) % 2 # The first row of the block whose line has this parity
+            if first >= by1 - by0:
+                continue
+            rows = slice(first + 1, by1 - by0 + 1, 2)
+            centre = steam[..., rows, 1:-1]
+            total = centre.copy()
+            contribution = np.empty_like(centre)
+            for dy, dx in NEIGHBOUR_OFFSETS[parity]:
+                neighbour_rows = slice(first + 1 + dy, by1 - by0 + 1 + dy, 2)
+                neighbour_columns = slice(1 + dx, x1 - x0 + 1 + dx)
+                # If the neighbour is in the crystal, its steam is replaced by the cell's steam
+                np.copyto(contribution, steam[..., neighbour_rows, neighbour_columns])
+                np.copyto(contribution, centre, where=in_crystal[..., neighbour_rows, neighbour_columns])
+                total += contribution
+            total /= counts[first::2]
+            np.copyto(total, centre, where=in_crystal[..., rows, 1:-1])
+            out[..., by0 - y0 + first:by1 - y0:2, :] = total
+    return out
+
+def neighbour_counts(dim, y0, y1, x0, x1, dtype=np.float64):
+    """
+    Returns the number of cells taken into account in the mean of the diffusion phase for each cell of the window
+    [y0, y1[ x [x0, x1[ of a plate: the cell itself and its neighbours which are inside of the plate.
+    Only the cells on the edges of the plate have less than 7, so only these ones are counted and the memory used
+    is the one of the window.
+    
+    :param dim: (tuple) couple of positives integers (row, column), the dimension of the plate
+    :param y0, y1, x0, x1: (int) the bounds of the window
+    :param dtype: (numpy.dtype) [DEFAULT: numpy.float64] the type of the counts, the one of the steam
+    :return: (numpy.ndarray of float) array of shape (y1 - y0, x1 - x0)
+    
+    Exemple:
+    
+    >>> neighbour_counts((3, 4), 0, 3, 0, 4)
+    array([[3., 5., 5., 4.],
+           [6., 7., 7., 4.],
+           [3., 5., 5., 4.]])
+    >>> neighbour_counts((100, 100), 0, 2, 49, 51)
+    array([[5., 5.],
+           [7., 7.]])
+    """
+    counts = np.full((y1 - y0, x1 - x0), 7, dtype=dtype)
+    offsets = np.array(NEIGHBOUR_OFFSETS) # Shape (2, 6, 2)
+    
+    def count(y, x):
+        total = np.ones(np.broadcast(y, x).shape, dtype=dtype)
+        for k in range(6):
+            dy, dx = offsets[y % 2, k, 0] + y, offsets[y % 2, k, 1] + x
+            total += (dy >= 0) & (dy < dim[0]) & (dx >= 0) & (dx < dim[1])
+        return total
+    
+    columns = np.arange(x0, x1)
+    for y in {0, dim[0] - 1} & set(range(y0, y1)):
+        counts[y - y0] = count(np.array([y]), columns)
+    rows = np.arange(y0, y1)[:, None]
+    for x in {0, dim[1] - 1} & set(range(x0, x1)):
+        counts[:, x - x0] = count(rows, np.array([x]))[:, 0]
+    return counts
+
+def diffusion_window(init_pos, max_point, approximation, dim):
+    """
+    Returns the bounds of the window of the plate on which the diffusion is calculated
+    
+    :param init_pos: (tuple) the coordinates of the first crystal cell
+    :param max_point: (int) the distance between the furthest point from the initial_position and the first cell
+    :param approximation: (int) the distance from the furthest point of the snowflake beyond which, the diffusion is not calculated.
+        0 to calculate the diffusion on the whole plate
+    :param dim: (tuple) couple of positives integers (row, column), the dimension of the plate
+    :return: (tuple) (y0, y1, x0, x1) the window is made of the rows y0 <= y < y1 and the columns x0 <= x < x1
+    
+    Exemple:
     
+    >>> diffusion_window((50, 50), 5, 20, (100, 100))
+    (25, 75, 25, 75)
+    >>> diffusion_window((50, 50), 5, 0, (100, 100))
+    (0, 100, 0, 100)
+    """
+    if not approximation:
+        return (0, dim[0], 0, dim[1])
+    return (max(0, init_pos[0] - approximation - max_point), min(dim[0], init_pos[0] + approximation + max_point),
+            max(0, init_pos[1] - approximation - max_point), min(dim[1], init_pos[1] + approximation + max_point))
 
-def diffusion(plate_in, init_pos, max_point, approximation=0):
+def diffusion(plate_in, init_pos, max_point, approximation=0, block=DIFFUSION_BLOCK):
     """
     Returns the plate passed as a parameter updated by the diffusion phase
     
-    :param plate: (list(list(dict))) the support of the crystal
+    :param plate: (Plate) the support of the crystal
     :param init_pos: (tuple) the coordinates of the first crystal cell
     :param max_point: (int) the distance between the furthest point from the initial_position and the first cell
     :param approximation: (int) [DEFAULT:0] the distance from the furthest point of the snowflake beyond which, the diffusion is not calculated
-    :return: (list(list(dict))) the updated crystal
+    :param block: (int) [DEFAULT: DIFFUSION_BLOCK] the number of rows calculated and written back at once
+    :return: (Plate) the updated crystal
 
     Exemple:
     
     >>> test_plate = create_plate(dim=(5,5))
     >>> test_plate[0][0]["d"] = 10
     >>> test_plate = diffusion(test_plate, (1,1), 0)
-    >>> test_plate == [[{'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 4.066666666666666}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 2.88}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}], [{'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 2.583333333333333}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}], [{'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}, {'is_in_crystal': True, 'b': 0, 'c': 1, 'd': 0, 'i': 0}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}], [{'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}], [{'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}]]
+    >>> [[dict(cell) for cell in row] for row in test_plate] == [[{'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 4.066666666666666}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 2.88}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}], [{'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 2.583333333333333}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}], [{'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}, {'is_in_crystal': True, 'b': 0, 'c': 1, 'd': 0, 'i': 0}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}], [{'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.0999999999999999}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}], [{'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}, {'is_in_crystal': False, 'b': 0, 'c': 0, 'd': 1.1}]]
     True
     """
-    changes_to_make = {} # The changes are recorded and applied only when there's no more changes to record
-    if not approximation:
-        for (y,x) in NEIGHBOURS:
-            cell = plate_in[y][x]
-            diffusion_cell(y, x, cell, changes_to_make, plate_in)
-    else:
-        for y in range(max(0, init_pos[0] - approximation - max_point), min(DIMENSION[0], init_pos[0]+approximation + max_point)):
-            for x in range(max(0, init_pos[1] - approximation - max_point), min(DIMENSION[1], init_pos[1] + approximation + max_point)):
-                cell = plate_in[y][x]
-                diffusion_cell(y, x, cell, changes_to_make, plate_in)
-    for coord, value in changes_to_make.items(): 
-        plate_in[coord[0]][coord[1]]["d"] = value
+    # The new steam is calculated from the old one by blocks of rows. A block is only written back once the next block,
+    # which reads its last row, is calculated, so only two blocks of new steam are kept in memory
+    y0, y1, x0, x1 = diffusion_window(init_pos, max_point, approximation, plate_in.shape)
+    waiting = None
+    for by0 in range(y0, y1, block):
+        by1 = min(by0 + block, y1)
+        prefetch(plate_in.d, by1, by1 + block + 1)
+        prefetch(plate_in.crystal, by1, by1 + block + 1)
+        steam = hex_diffusion(plate_in.d, plate_in.crystal, by0, by1, x0, x1, block)
+        if waiting is not None:
+            plate_in.d[waiting[0]:waiting[1], x0:x1] = waiting[2]
+        waiting = (by0, by1, steam)
+    if waiting is not None:
+        plate_in.d[waiting[0]:waiting[1], x0:x1] = waiting[2]
     return plate_in
 
+def prefetch(array, y0, y1):
+    """
+    Asks the system to read the rows y0 <= y < y1 of an array kept in a memory-mapped file (see `create_plate`) in advance,
+    so they are read from the disk while the rows before them are calculated. Does nothing for the other arrays.
+    
+    :param array: (numpy.ndarray) the array, as returned by `create_plate`
+    :param y0, y1: (int) the rows
+    :return: None
+    """
+    mapping = getattr(array, "_mmap", None)
+    if mapping is None or not hasattr(mmap, "MADV_WILLNEED"):
+        return
+    y0, y1 = max(0, y0), min(array.shape[0], y1)
+    if y0 >= y1:
+        return
+    # The array starts after the header of the file, in the first page of the mapping
+    start = array.offset % mmap.ALLOCATIONGRANULARITY + y0 * array.strides[0]
+    end = min(len(mapping), start + (y1 - y0) * array.strides[0])
+    start -= start % mmap.PAGESIZE
+    try:
+        mapping.madvise(mmap.MADV_WILLNEED, start, end - start)
+    except (OSError, ValueError):
+        pass
+
 def freezing(di, k=KAPPA):
     """
     Returns the cell passed as a parameter updated by the freezing phase.
@@ -261,6 +947,7 @@ def freezing(di, k=KAPPA):
     UC: A valid plate, 0 <= k <= 1
     Exemple:
     
+    >>> little_plate = create_plate(dim=(5,5))
     >>> test = freezing(little_plate[1][1])
     >>> test == {'b': 0.44000000000000006, 'is_in_crystal': False, 'd': 0, 'c': 0.66}
     True
@@ -301,7 +988,7 @@ def attachment(di, cell_at_border, neighbours, ind, alpha=ALPHA, beta=BETA, thet
     if (((cristal_neighbours in (1, 2)) and (di["b"] > beta))
         or ((cristal_neighbours == 3) and ((di["b"] >= 1) or ((test_with_theta < theta) and (di["b"] >= alpha))))
         or cristal_neighbours > 3): # We attach the cell to the crystal
-        di_out = deepcopy(di)
+        di_out = dict(di)
         di_out["c"] = di["c"] + di["b"]
         di_out["b"] = 0
         di_out["d"] = 0
@@ -322,6 +1009,8 @@ def melting(di, mu=MU, gamma=GAMMA):
     
     Exemple:
     
+    >>> little_plate = create_plate(dim=(5,5))
+    >>> little_plate[1][1].update({'b': 0.44000000000000006, 'd': 0, 'c': 0.66})
     >>> test = melting(little_plate[1][1])
     >>> test == {'is_in_crystal': False, 'd': 0.55, 'b': 0.22000000000000003, 'c': 0.33}
     True
@@ -331,142 +1020,3327 @@ def melting(di, mu=MU, gamma=GAMMA):
     di["c"] = (1-gamma) * di["c"]
     return di
 
-def interference(plate, sigma=SIGMA):
+def hex_neighbour_sum(values, y0, y1, x0, x1, start=0, stop=6, out=None):
     """
-    Introduces randomness into the simulation by altering by a little the quantity of steam into each cell of the plate. Has a board effect on plate
+    Returns, for each cell of the window [y0, y1[ x [x0, x1[, the sum of `values` over its neighbours inside of the plate.
+    The sums are made in the order of `NEIGHBOUR_OFFSETS`
     
-    :param plate: (list(list(dict))) the support of the crystal
-    :param sigma: (float) [DEFAULT:SIGMA] the coefficient which determines the amplitude of the randomness
-    :return: None
+    :param values: (numpy.ndarray) the values of the cells of the plate (the last two axes are the rows and the columns)
+    :param y0, y1, x0, x1: (int) the bounds of the window
+    :param start, stop: (int) [DEFAULT: 0, 6] only the neighbours start <= k < stop of `NEIGHBOUR_OFFSETS` are added
+    :param out: (numpy.ndarray) [DEFAULT: None] the sums the values are added to, None to start from 0
+    :return: (numpy.ndarray) the sums, of shape (..., y1 - y0, x1 - x0)
     
-    UC: 0 <= sigma << 1
+    Exemple:
+    
+    >>> crystal = np.zeros((4, 4), dtype=np.uint8)
+    >>> crystal[1, 1] = 1
+    >>> hex_neighbour_sum(crystal, 0, 4, 0, 4)
+    array([[0, 1, 1, 0],
+           [1, 0, 1, 0],
+           [0, 1, 1, 0],
+           [0, 0, 0, 0]], dtype=uint8)
     """
-    for (y,x) in NEIGHBOURS:
-        cell = plate[y][x]
-        if cell["is_in_crystal"] == False:
-            cell["d"] = cell["d"] * (1 + (random.random()- 0.5) * sigma)
-    return None
+    padded = padded_window(values, y0, y1, x0, x1, 0)
+    if out is None:
+        out = np.zeros(values.shape[:-2] + (y1 - y0, x1 - x0), dtype=values.dtype)
+    for parity in (0, 1):
+        first = (parity - y0) % 2 # The first row of the window whose line has this parity
+        for dy, dx in NEIGHBOUR_OFFSETS[parity][start:stop]:
+            out[..., first::2, :] += padded[..., first + 1 + dy:y1 - y0 + 1 + dy:2, 1 + dx:x1 - x0 + 1 + dx]
+    return out
 
-def is_border_correct(plate, cells_at_border):
+def boundary_window(init_pos, max_point, dim):
     """
-    Checks if border is correct
+    Returns the bounds of the smallest window around the `init_pos` which contains all the cells at the border of the crystal
     
-    :param plate: (dict) the support of the simulation
-    :param cells_at_border: (set) the coordinates of the cells at the border
-    :return: (bool) True if it is correct, False otherwise
+    :param init_pos: (tuple) the coordinates of the first crystal cell
+    :param max_point: (int) the distance between the furthest point from the initial_position and the first cell
+    :param dim: (tuple) couple of positives integers (row, column), the dimension of the plate
+    :return: (tuple) (y0, y1, x0, x1) the window is made of the rows y0 <= y < y1 and the columns x0 <= x < x1
     
-    Exemple: 
+    Exemple:
     
-    >>> is_border_correct(little_plate, {(0,0)})
-    False
-    >>> is_border_correct(little_plate, {(2, 1), (1, 1), (1, 2), (2, 3), (3, 2), (3, 1)})
-    True
-    """
-    for (y,x) in NEIGHBOURS:
-        cell_di = plate[y][x]
-        neighbours = {} # A dictionnary of all neighbours key: coordinates value: dictionnary
-        for y2, x2 in NEIGHBOURS[(y, x)]:
-            neighbours[(y2,x2)] = plate[y2][x2]
-            
-        if (y, x) in cells_at_border:
-            has_neighbour = False
-            for neigh_coord, neigh_di in neighbours.items():
-                if neigh_di["is_in_crystal"] == True:
-                    has_neighbour = True
-                    break
-            if not has_neighbour:
-                return False
-        
-        elif cell_di["is_in_crystal"] == True:
-            if (y,x) in cells_at_border:
-                return False
-        
-        else:
-            has_neighbour = False
-            for neigh_coord, neigh_di in neighbours.items():
-                if neigh_di["is_in_crystal"] == True:
-                    has_neighbour = True
-                    break
-            if has_neighbour:
-                return False
-    return True
-  
-def savestates(plate, filename, n, newpath, number=NUMBER):
+    >>> boundary_window((50, 50), 5, (100, 100))
+    (44, 57, 44, 57)
     """
-    Create a JPEG and a PNG of the snowflake.
-    
-    :param plate: (list of list of dict) The plate which contain the cristal.
-    :param filename: (str) Name of the file.
-    :param n: (int) The n-th iteration of the snowflake.
-        0 by default, if the param doesn't change you will only get the last image.
-    :param newpath: (str) the path of the folder where the pictures are saved
-    :param number: (int) [DEFAULT:NUMBER] the total number of iterations
+    return (max(0, init_pos[0] - max_point - 1), min(dim[0], init_pos[0] + max_point + 2),
+            max(0, init_pos[1] - max_point - 1), min(dim[1], init_pos[1] + max_point + 2))
+
+def boundary_kernel(b, c, d, crystal, i, y0, y1, x0, x1, ind,
+                    kappa=KAPPA, alpha=ALPHA, beta=BETA, theta=THETA, mu=MU, gamma=GAMMA, synchronous=False):
     """
-    pixels_snowflake = []
-    index_number = str(n).zfill(len(str(number))) # Adds leading zeros in front of the index (instead of 50 we would get 050)
+    Applies the freezing, attachment and melting phases to all the cells at the border of the crystal
+    inside of the window [y0, y1[ x [x0, x1[. The arrays are updated in place.
+    The cells at the border are the cells which are not in the crystal and have at least one neighbour in it.
+    Each one of them is frozen, then attached to the crystal or melted, one after the other row by row, so the steam
+    of the neighbours used to test `theta` is the steam after the melting for the neighbours before the cell, and
+    the steam before the freezing for the ones after it (see `boundary_rules`).
     
-    # Creating the pixel image
-    for y in range(DIMENSION[0]):
-        for x in range(DIMENSION[1]):
-            d = plate[y][x]
-            if d["is_in_crystal"] == False:
-                pixels_snowflake.append((0,0,255 - int((d["d"] / RHO)*255)))
-            else:
-                pixels_snowflake.append((0,255,(int(d["i"]/NUMBER*255))))
-    snowflake = Image.new("RGB", DIMENSION, color=0)
-    snowflake.putdata(pixels_snowflake)
-    snowflake.save(newpath + "Pixels/" + filename + index_number + ".png", format="PNG")
+    :param b, c, d: (numpy.ndarray of float) the quasi-liquid water, ice and steam of the plate
+    :param crystal: (numpy.ndarray of bool) the crystal mask of the plate
+    :param i: (numpy.ndarray of int) the iteration at which each cell joined the crystal
+    :param y0, y1, x0, x1: (int) the bounds of the window, which must contain all the cells at the border
+    :param ind: (int) the number of updated we've done to the plate so far
+    :param kappa, alpha, beta, theta, mu, gamma: (float) the coefficients of the phases (see `freezing`, `attachment` and `melting`)
+    :param synchronous: (bool) [DEFAULT: False] True to freeze all the cells at the border before the attachment phase
+    :return: (numpy.ndarray of bool) the mask of the cells of the window which joined the crystal
     
+    Exemple:
     
-    # Creating the Hexagon Image
-    # Half the height of the hexagon
-    x = 12*DIMENSION[1]+6
-    y = DIMENSION[0]*11+3
-    snowflake = Image.new("RGB", (x, y), color=0)
-    for y in range(DIMENSION[0]):
-        for x in range(DIMENSION[1]):
-            
-            # Add the horizontal offset on every other row
-            x_ = 0 if (y % 2 == 0) else 6
-            
-            shape = [
-                (12*x +6  +x_, y*10    ),
-                (12*x +12 +x_, y*10 +3 ),
-                (12*x +12 +x_, y*10 +11),
-                (12*x +6  +x_, y*10 +14),
-                (12*x     +x_, y*10 +11),
-                (12*x     +x_, y*10 +3 )
-            ]
-            
-            d = plate[y][x]
-            if d["is_in_crystal"] == False:
-                ImageDraw.Draw(snowflake).polygon(xy=shape, fill=(0,0,255 - int((d["d"] / RHO)*255)), outline=(0,0,255 - int((d["d"] / RHO)*255)), )
-            else:
-                ImageDraw.Draw(snowflake).polygon(xy=shape, fill=(0,255,(int(d["i"]/NUMBER*255))), outline=(0,255,(int(d["i"]/NUMBER*255))))
-    snowflake.save(newpath + "Hexagons/" + filename + index_number + ".jpeg", format="JPEG")
-    return
-  
-def create_gif(path):
+    >>> plate = create_plate(dim=(5, 5))
+    >>> attached = boundary_kernel(plate.b, plate.c, plate.d, plate.crystal, plate.i, 0, 5, 0, 5, 1, beta=0.3)
+    >>> int(attached.sum()), int(plate.crystal.sum()), sorted(set(plate.i.ravel().tolist()))
+    (6, 7, [-1, 0, 1])
     """
-    Creates a gif of all the images from the simulation. It will be saved in the same folder as the pictures
-    
-    :param path: (str) the path of the folder in which the pictures are saved
-    :return: None
+    window = (Ellipsis, slice(y0, y1), slice(x0, x1))
+    crystal_neighbours = hex_neighbour_sum(crystal.view(np.uint8), y0, y1, x0, x1)
+    return boundary_rules(b[window], c[window], d[window], crystal[window], i[window], crystal_neighbours,
+                          lambda start, stop, total=None: hex_neighbour_sum(d, y0, y1, x0, x1, start, stop, total), ind,
+                          kappa=kappa, alpha=alpha, beta=beta, theta=theta, mu=mu, gamma=gamma, synchronous=synchronous)
+
+def boundary_rules(b_w, c_w, d_w, crystal_w, i_w, crystal_neighbours, neighbour_steam, ind,
+                   kappa=KAPPA, alpha=ALPHA, beta=BETA, theta=THETA, mu=MU, gamma=GAMMA, synchronous=False):
+    """
+    Applies the freezing, attachment and melting rules (see `boundary_kernel`) to a set of cells whose
+    number of crystal neighbours is already known. The arrays are views on the cells and are updated in place.
+    
+    The cells are updated one after the other in the order of the rows, like the first versions of the script did
+    (which went through them in the order of a set): when a cell is tested, the neighbours before it
+    (the first EARLIER_NEIGHBOURS of `NEIGHBOUR_OFFSETS`) have already melted and the ones after it are not frozen yet.
+    With `synchronous`, all the cells are frozen before any of them is tested, so the cells at the border see no steam
+    around them: the snowflakes are different, usually larger.
+    
+    :param b_w, c_w, d_w: (numpy.ndarray of float) the quasi-liquid water, ice and steam of the cells
+    :param crystal_w: (numpy.ndarray of bool) True for the cells in the crystal
+    :param i_w: (numpy.ndarray of int) the iteration at which each cell joined the crystal
+    :param crystal_neighbours: (numpy.ndarray of int) the number of neighbours of each cell in the crystal
+    :param neighbour_steam: (function) function (start, stop, total=None) which adds to `total` (an array of zeros if None)
+        and returns the sum of the steam of the neighbours start <= k < stop of `NEIGHBOUR_OFFSETS` of each cell,
+        in the order of `NEIGHBOUR_OFFSETS`. It reads the steam in `d_w` as it is when it is called
+    :param ind: (int) the number of updated we've done to the plate so far
+    :param kappa, alpha, beta, theta, mu, gamma: (float) the coefficients of the phases (see `freezing`, `attachment` and `melting`)
+    :param synchronous: (bool) [DEFAULT: False] True to freeze all the cells before the attachment phase
+    :return: (numpy.ndarray of bool) the mask of the cells which joined the crystal
+    
+    Exemple:
+    
+    Two cells at the border on the same row: the first one sees the steam of the second before it froze,
+    the second one sees the steam of the first after it melted
+    
+    >>> def steam(start, stop, total=None):
+    ...     total = np.zeros(2) if total is None else total
+    ...     if start <= 0 < stop:
+    ...         total[1] += d[0] # The left neighbour of the second cell
+    ...     if start <= 3 < stop:
+    ...         total[0] += d[1] # The right neighbour of the first cell
+    ...     return total
+    >>> b, c, d = np.zeros(2), np.zeros(2), np.array([0.5, 0.5])
+    >>> crystal, i = np.zeros(2, dtype=bool), np.zeros(2, dtype=int)
+    >>> boundary_rules(b, c, d, crystal, i, np.array([3, 3]), steam, 7, kappa=0.5, alpha=0.2, theta=0.3).tolist()
+    [False, True]
+    >>> c.tolist(), d.tolist(), i.tolist()
+    ([0.125, 0.5], [0.25, 0.0], [0, 7])
+    
+    Frozen at the same time, both see no steam and join the crystal
+    
+    >>> b, c, d = np.zeros(2), np.zeros(2), np.array([0.5, 0.5])
+    >>> crystal, i = np.zeros(2, dtype=bool), np.zeros(2, dtype=int)
+    >>> boundary_rules(b, c, d, crystal, i, np.array([3, 3]), steam, 7, kappa=0.5, alpha=0.2, theta=0.3, synchronous=True).tolist()
+    [True, True]
+    """
+    border = ~crystal_w & (crystal_neighbours > 0)
+    
+    # FREEZING
+    steam = np.where(border, d_w, 0)
+    b_w[...] = np.where(border, b_w + (1 - kappa) * steam, b_w)
+    c_w[...] = np.where(border, c_w + kappa * steam, c_w)
+    d_w[border] = 0
+    
+    # ATTACHMENT
+    if synchronous:
+        neighbour_steam = neighbour_steam(0, 6)
+    else:
+        # The neighbours before the cell have melted, whether they joined the crystal or not
+        d_w[...] = np.where(border, d_w + mu * b_w + gamma * c_w, d_w)
+        total = neighbour_steam(0, EARLIER_NEIGHBOURS)
+        # The neighbours after the cell are not frozen yet
+        d_w[...] = np.where(border, steam, d_w)
+        neighbour_steam = neighbour_steam(EARLIER_NEIGHBOURS, 6, total)
+        d_w[border] = 0
+    attached = border & ((((crystal_neighbours == 1) | (crystal_neighbours == 2)) & (b_w > beta))
+                         | ((crystal_neighbours == 3) & ((b_w >= 1) | ((neighbour_steam < theta) & (b_w >= alpha))))
+                         | (crystal_neighbours > 3))
+    
+    # MELTING
+    melted = border & ~attached
+    d_w[...] = np.where(melted, d_w + mu * b_w + gamma * c_w, d_w)
+    b_w[...] = np.where(melted, (1 - mu) * b_w, b_w)
+    c_w[...] = np.where(melted, (1 - gamma) * c_w, c_w)
+    
+    # The cells which attached themselves to the crystal
+    c_w[...] = np.where(attached, c_w + b_w, c_w)
+    b_w[attached] = 0
+    d_w[attached] = 0
+    crystal_w |= attached
+    i_w[...] = np.where(attached, ind, i_w)
+    return attached
+
+def boundary_phase(plate, init_pos, max_point, ind,
+                   kappa=KAPPA, alpha=ALPHA, beta=BETA, theta=THETA, mu=MU, gamma=GAMMA, synchronous=False):
+    """
+    Applies the freezing, attachment and melting phases to the cells at the border of the crystal (see `boundary_kernel`)
+    
+    :param plate: (Plate) the support of the crystal
+    :param init_pos: (tuple) the coordinates of the first crystal cell
+    :param max_point: (int) the distance between the furthest point from the initial_position and the first cell
+    :param ind: (int) the number of updated we've done to the plate so far
+    :param kappa, alpha, beta, theta, mu, gamma: (float) the coefficients of the phases (see `freezing`, `attachment` and `melting`)
+    :param synchronous: (bool) [DEFAULT: False] True to freeze all the cells at the border before the attachment phase
+    :return: (tuple) the new `max_point` and an array of shape (n, 2) of the coordinates of the n cells which joined the crystal
+    
+    Exemple:
+    
+    >>> plate = create_plate(dim=(5, 5))
+    >>> max_point, attached = boundary_phase(plate, (2, 2), 0, 1, beta=0.3)
+    >>> max_point, attached.tolist()
+    (1, [[1, 1], [1, 2], [2, 1], [2, 3], [3, 1], [3, 2]])
+    
+    The number of cells of a whole run is the one of the first versions of the script, the synchronous phases give another snowflake
+    
+    >>> config = SimulationConfig(number=100, dimension=(81, 81), alpha=0.4, beta=0.5, theta=0.9)
+    >>> for synchronous in (False, True):
+    ...     simulation = make_simulation(replace(config, synchronous=synchronous))
+    ...     _ = simulation.run()
+    ...     print(int(simulation.plate.crystal.sum()), simulation.max_point)
+    2041 34
+    3001 34
+    """
+    y0, y1, x0, x1 = boundary_window(init_pos, max_point, plate.shape)
+    attached = boundary_kernel(plate.b, plate.c, plate.d, plate.crystal, plate.i, y0, y1, x0, x1, ind,
+                               kappa=kappa, alpha=alpha, beta=beta, theta=theta, mu=mu, gamma=gamma, synchronous=synchronous)
+    attached = np.argwhere(attached) + (y0, x0)
+    if len(attached):
+        max_point = max(max_point, int(np.abs(attached - init_pos).max()))
+    return max_point, attached
+
+def sparse_boundary_phase(plate, cells, ind,
+                          kappa=KAPPA, alpha=ALPHA, beta=BETA, theta=THETA, mu=MU, gamma=GAMMA, synchronous=False, cache_directory=None):
+    """
+    Applies the freezing, attachment and melting phases (see `boundary_kernel`) to the cells at the border of the crystal
+    given by their numbers (y * columns + x), so the work only depends on the number of these cells.
+    The cells of `cells` which are not at the border are left unchanged.
+    
+    :param plate: (Plate) the support of the crystal
+    :param cells: (numpy.ndarray of int) the numbers of the cells, which must contain all the cells at the border
+    :param ind: (int) the number of updated we've done to the plate so far
+    :param kappa, alpha, beta, theta, mu, gamma: (float) the coefficients of the phases (see `freezing`, `attachment` and `melting`)
+    :param synchronous: (bool) [DEFAULT: False] True to freeze all the cells at the border before the attachment phase
+    :param cache_directory: (str) [DEFAULT: None] the folder of the table of the neighbours, see `neighbour_table`
+    :return: (numpy.ndarray of int64) the numbers of the cells which joined the crystal
+    
+    Exemple:
+    
+    >>> plate = create_plate(dim=(5, 5))
+    >>> sparse_boundary_phase(plate, np.arange(25), 1, beta=0.3).tolist()
+    [6, 7, 11, 13, 16, 17]
+    """
+    cells = np.asarray(cells, dtype=np.int64)
+    neighbours = plate_neighbours(cells, plate.shape, cache_directory)
+    outside = neighbours < 0
+    neighbours[outside] = 0
+    b, c, d, crystal, i = (array.reshape(-1) for array in (plate.b, plate.c, plate.d, plate.crystal, plate.i))
+    b_s, c_s, d_s, crystal_s, i_s = b[cells], c[cells], d[cells], crystal[cells], i[cells]
+    crystal_neighbours = (crystal[neighbours] & ~outside).sum(axis=1)
+    
+    def neighbour_steam(start, stop, total=None):
+        d[cells] = d_s # The steam of the cells at the border as the phases left it
+        if total is None:
+            total = np.zeros(len(cells), dtype=d.dtype)
+        for k in range(start, stop):
+            total += np.where(outside[:, k], 0, d[neighbours[:, k]])
+        return total
+    
+    attached = boundary_rules(b_s, c_s, d_s, crystal_s, i_s, crystal_neighbours, neighbour_steam, ind,
+                              kappa=kappa, alpha=alpha, beta=beta, theta=theta, mu=mu, gamma=gamma, synchronous=synchronous)
+    b[cells], c[cells], d[cells], crystal[cells], i[cells] = b_s, c_s, d_s, crystal_s, i_s
+    return cells[attached]
+
+def streaming_boundary_phase(plate, init_pos, max_point, ind, block=DIFFUSION_BLOCK,
+                             kappa=KAPPA, alpha=ALPHA, beta=BETA, theta=THETA, mu=MU, gamma=GAMMA, synchronous=False,
+                             cache_directory=None):
+    """
+    Applies the freezing, attachment and melting phases like `boundary_phase`, for the plates kept in files (see `create_plate`).
+    The cells at the border are found by reading the crystal mask by blocks of rows, and only these cells are then
+    read and written (see `sparse_boundary_phase`), so the memory used does not depend on the size of the window.
+    
+    :param plate: (Plate) the support of the crystal
+    :param init_pos: (tuple) the coordinates of the first crystal cell
+    :param max_point: (int) the distance between the furthest point from the initial_position and the first cell
+    :param ind: (int) the number of updated we've done to the plate so far
+    :param block: (int) [DEFAULT: DIFFUSION_BLOCK] the number of rows of the crystal mask read at once
+    :param kappa, alpha, beta, theta, mu, gamma: (float) the coefficients of the phases (see `freezing`, `attachment` and `melting`)
+    :param synchronous: (bool) [DEFAULT: False] True to freeze all the cells at the border before the attachment phase
+    :param cache_directory: (str) [DEFAULT: None] the folder of the table of the neighbours, see `neighbour_table`
+    :return: (tuple) the new `max_point` and an array of shape (n, 2) of the coordinates of the n cells which joined the crystal
+    
+    Exemple:
+    
+    >>> plate = create_plate(dim=(5, 5))
+    >>> max_point, attached = streaming_boundary_phase(plate, (2, 2), 0, 1, block=2, beta=0.3)
+    >>> max_point, attached.tolist()
+    (1, [[1, 1], [1, 2], [2, 1], [2, 3], [3, 1], [3, 2]])
+    """
+    y0, y1, x0, x1 = boundary_window(init_pos, max_point, plate.shape)
+    crystal = plate.crystal.view(np.uint8)
+    cells = [np.empty(0, dtype=np.int64)]
+    for by0 in range(y0, y1, block):
+        by1 = min(by0 + block, y1)
+        prefetch(plate.crystal, by1, by1 + block + 1)
+        border = ~plate.crystal[by0:by1, x0:x1] & (hex_neighbour_sum(crystal, by0, by1, x0, x1) > 0)
+        y, x = np.nonzero(border)
+        cells.append((y + by0).astype(np.int64) * plate.shape[1] + x + x0)
+    attached = sparse_boundary_phase(plate, np.concatenate(cells), ind,
+                                     kappa=kappa, alpha=alpha, beta=beta, theta=theta, mu=mu, gamma=gamma, synchronous=synchronous,
+                                     cache_directory=cache_directory)
+    attached = np.stack(np.divmod(attached, plate.shape[1]), axis=1)
+    if len(attached):
+        max_point = max(max_point, int(np.abs(attached - init_pos).max()))
+    return max_point, attached
+
+class ActiveTiles(object):
+    """
+    Splits the plate in square tiles and keeps track of the tiles on which the phases have to be calculated.
+    A tile is on the frontier if it contains cells at the border of the crystal. A tile is active if it is on the frontier
+    or next to it, or if its steam or the steam of one of the tiles around it changed by more than `tolerance` at the last
+    diffusion. The other tiles are dormant: their steam has converged and nothing happens near them.
+    
+    :Attributes:
+        - dim: (tuple) the dimension of the plate
+        - size: (int) the number of rows and columns of a tile
+        - tolerance: (float) the change of steam below which a tile is considered to have converged
+        - frontier: (numpy.ndarray of bool) the tiles which contain cells at the border of the crystal
+        - changed: (numpy.ndarray of bool) the tiles whose steam changed by more than `tolerance` at the last diffusion
+        - active: (numpy.ndarray of bool) the tiles on which the diffusion is calculated
+        - cache_directory: (str) the folder of the table of the neighbours, see `neighbour_table`
+    
+    Exemple:
+    
+    >>> plate = create_plate(dim=(100, 100))
+    >>> tiles = ActiveTiles(plate.shape, 16, init_pos=(50, 50))
+    >>> tiles.frontier.shape, int(tiles.frontier.sum()), int(tiles.active.sum())
+    ((7, 7), 1, 9)
+    """
+    
+    def __init__(self, dim, size, tolerance=TILE_TOLERANCE, init_pos=None, cache_directory=None):
+        """
+        :param dim: (tuple) the dimension of the plate
+        :param size: (int) the number of rows and columns of a tile
+        :param tolerance: (float) [DEFAULT: TILE_TOLERANCE] the change of steam below which a tile is considered to have converged
+        :param init_pos: (tuple) [DEFAULT: None] the coordinates of the first crystal cell, whose neighbours are on the frontier
+        :param cache_directory: (str) [DEFAULT: None] the folder of the table of the neighbours, see `neighbour_table`
+        """
+        self.dim = dim
+        self.size = size
+        self.tolerance = tolerance
+        self.cache_directory = cache_directory
+        shape = (-(-dim[0] // size), -(-dim[1] // size))
+        self.frontier = np.zeros(shape, dtype=bool)
+        self.changed = np.zeros(shape, dtype=bool)
+        self.active = np.zeros(shape, dtype=bool)
+        if init_pos is not None:
+            self.update(np.array([init_pos[0] * dim[1] + init_pos[1]]))
+    
+    def bounds(self, ty, tx):
+        """
+        Returns the bounds (y0, y1, x0, x1) of the cells of the tile (ty, tx)
+        """
+        return (ty * self.size, min((ty + 1) * self.size, self.dim[0]),
+                tx * self.size, min((tx + 1) * self.size, self.dim[1]))
+    
+    def runs(self, tiles):
+        """
+        Returns the bounds of the groups of consecutive tiles of a same row of tiles in `tiles`, so that each group
+        is calculated at once
+        
+        :param tiles: (numpy.ndarray of bool) a mask of the tiles
+        :return: (list of tuple) the list of (ty, tx0, tx1) for the groups made of the tiles (ty, tx) with tx0 <= tx < tx1
+        
+        Exemple:
+        
+        >>> tiles = ActiveTiles((40, 40), 10)
+        >>> tiles.runs(np.array([[True, True, False, True], [False] * 4, [False, True, True, True], [False] * 4]))
+        [(0, 0, 2), (0, 3, 4), (2, 1, 4)]
+        """
+        edges = np.diff(np.pad(tiles, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+        starts, ends = np.argwhere(edges == 1), np.argwhere(edges == -1)
+        return [(int(ty), int(tx0), int(tx1)) for (ty, tx0), (_, tx1) in zip(starts, ends)]
+    
+    def diffusion(self, plate):
+        """
+        Applies the diffusion phase to the active tiles of the plate (see `hex_diffusion`). All the tiles are calculated
+        from the steam before the phase, and `changed` is updated.
+        
+        :param plate: (Plate) the support of the crystal
+        :return: None
+        """
+        updates = []
+        self.changed[...] = False
+        for ty, tx0, tx1 in self.runs(self.active):
+            y0, y1, x0, _ = self.bounds(ty, tx0)
+            x1 = self.bounds(ty, tx1 - 1)[3]
+            steam = hex_diffusion(plate.d, plate.crystal, y0, y1, x0, x1)
+            change = np.abs(steam - plate.d[y0:y1, x0:x1]).max(axis=0)
+            self.changed[ty, tx0:tx1] = np.maximum.reduceat(change, np.arange(0, x1 - x0, self.size)) > self.tolerance
+            updates.append((y0, y1, x0, x1, steam))
+        for y0, y1, x0, x1, steam in updates:
+            plate.d[y0:y1, x0:x1] = steam
+    
+    def border_cells(self, plate):
+        """
+        Returns the numbers (y * columns + x) of the cells at the border of the crystal, which are all in the frontier tiles.
+        The tiles which no longer contain any cell at the border leave the frontier.
+        
+        :param plate: (Plate) the support of the crystal
+        :return: (numpy.ndarray of int64) the numbers of the cells
+        """
+        cells = []
+        crystal = plate.crystal.view(np.uint8)
+        for ty, tx0, tx1 in self.runs(self.frontier):
+            y0, y1, x0, _ = self.bounds(ty, tx0)
+            x1 = self.bounds(ty, tx1 - 1)[3]
+            border = ~plate.crystal[y0:y1, x0:x1] & (hex_neighbour_sum(crystal, y0, y1, x0, x1) > 0)
+            self.frontier[ty, tx0:tx1] = np.logical_or.reduceat(border.any(axis=0), np.arange(0, x1 - x0, self.size))
+            y, x = np.nonzero(border)
+            cells.append((y + y0) * self.dim[1] + x + x0)
+        if not cells:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(cells)
+    
+    def update(self, attached):
+        """
+        Adds the tiles of the new cells at the border to the frontier and updates the active tiles
+        
+        :param attached: (numpy.ndarray of int) the numbers of the cells which joined the crystal
+        :return: None
+        """
+        neighbours = plate_neighbours(attached, self.dim, self.cache_directory)
+        neighbours = neighbours[neighbours >= 0]
+        y, x = np.divmod(neighbours, self.dim[1])
+        self.frontier[y // self.size, x // self.size] = True
+        # The tiles next to a tile where something happens are active as well
+        busy = np.pad(self.frontier | self.changed, 1)
+        rows, columns = self.frontier.shape
+        self.active[...] = False
+        for dy in (0, 1, 2):
+            for dx in (0, 1, 2):
+                self.active |= busy[dy:dy + rows, dx:dx + columns]
+
+def seeded(config):
+    """
+    Returns the parameters of a simulation with a seed for its interference: the same parameters if they have a seed
+    or no interference, and a seed drawn from the entropy of the system otherwise, which is kept so the simulation can be run again
+    
+    :param config: (SimulationConfig) the parameters of the simulation
+    :return: (SimulationConfig) the parameters with a seed
+    
+    Exemple:
+    
+    >>> seeded(SimulationConfig(sigma=0.01, seed=5)).seed, seeded(SimulationConfig()).seed
+    (5, None)
+    >>> seeded(SimulationConfig(sigma=0.01)).seed is None
+    False
+    """
+    if config.sigma and config.seed is None:
+        return replace(config, seed=np.random.SeedSequence().entropy)
+    return config
+
+def interference_noise(seed, iteration, y0, y1, x0, x1, size=NOISE_TILE):
+    """
+    Returns the random numbers of the interference of the cells y0 <= y < y1 and x0 <= x < x1 of the plate at an iteration.
+    Each tile of size * size cells of the plate draws its numbers from its own stream, made from the seed, the iteration
+    and the position of the tile, so the number of a cell does not depend on the part of the plate which is calculated
+    nor on the process which calculates it.
+    
+    :param seed: (int) the seed of the simulation
+    :param iteration: (int) the iteration
+    :param y0, y1, x0, x1: (int) the bounds of the window of the plate
+    :param size: (int) [DEFAULT: NOISE_TILE] the size of the tiles
+    :return: (numpy.ndarray) array of shape (y1 - y0, x1 - x0) of numbers uniformly distributed in [0, 1)
+    
+    Exemple:
+    
+    >>> noise = interference_noise(7, 3, 0, 300, 0, 300)
+    >>> bool((interference_noise(7, 3, 100, 200, 250, 300) == noise[100:200, 250:300]).all())
+    True
+    >>> bool((interference_noise(7, 4, 0, 10, 0, 10) == noise[:10, :10]).any())
+    False
+    """
+    noise = np.empty((max(0, y1 - y0), max(0, x1 - x0)))
+    if not noise.size:
+        return noise
+    for ty in range(y0 // size, (y1 - 1) // size + 1):
+        for tx in range(x0 // size, (x1 - 1) // size + 1):
+            generator = np.random.Generator(np.random.PCG64(np.random.SeedSequence(seed, spawn_key=(iteration, ty, tx))))
+            tile = generator.random((size, size))
+            ty0, ty1 = max(y0, ty * size), min(y1, (ty + 1) * size)
+            tx0, tx1 = max(x0, tx * size), min(x1, (tx + 1) * size)
+            noise[ty0 - y0:ty1 - y0, tx0 - x0:tx1 - x0] = tile[ty0 - ty * size:ty1 - ty * size, tx0 - tx * size:tx1 - tx * size]
+    return noise
+
+def interference(plate, sigma=SIGMA, seed=None, iteration=0, window=None, origin=(0, 0)):
+    """
+    Introduces randomness into the simulation by altering by a little the quantity of steam into each cell of the plate. Has a board effect on plate
+    
+    :param plate: (Plate) the support of the crystal
+    :param sigma: (float) [DEFAULT:SIGMA] the coefficient which determines the amplitude of the randomness
+    :param seed: (int) [DEFAULT: None] the seed of the simulation (see `interference_noise`), None for a new one
+    :param iteration: (int) [DEFAULT: 0] the iteration, from which the random numbers are drawn with the seed
+    :param window: (tuple) [DEFAULT: None] the bounds (y0, y1, x0, x1) of the cells altered, None for the whole plate
+    :param origin: (tuple) [DEFAULT: (0, 0)] the coordinates of the first cell of `plate` if it is only a part of the whole plate
+    :return: None
+    
+    UC: 0 <= sigma << 1
+    
+    Exemple:
+    
+    >>> plate, other = create_plate(dim=(5, 5)), create_plate(dim=(5, 5))
+    >>> interference(plate, 0.1, seed=1)
+    >>> float(plate.d[2, 2]), bool((np.abs(plate.d[plate.d > 0] - 1.1) <= 0.055).all()), int((plate.d != 1.1).sum())
+    (0.0, True, 25)
+    >>> interference(other, 0.1, seed=1, window=(0, 2, 0, 5))
+    >>> bool((other.d[:2] == plate.d[:2]).all()), bool((other.d[3:] == 1.1).all())
+    (True, True)
+    """
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    y0, y1, x0, x1 = (0, plate.shape[-2], 0, plate.shape[-1]) if window is None else window
+    if y0 >= y1 or x0 >= x1:
+        return None
+    oy, ox = origin
+    # The window is altered by bands of rows of tiles, so the random numbers of the whole window are never kept in memory
+    for by0 in range(y0, y1, NOISE_TILE):
+        by1 = min(by0 + NOISE_TILE - (by0 + oy) % NOISE_TILE, y1)
+        factor = 1 + (interference_noise(seed, iteration, by0 + oy, by1 + oy, x0 + ox, x1 + ox) - 0.5) * sigma
+        steam = plate.d[..., by0:by1, x0:x1]
+        np.multiply(steam, factor, out=steam, where=~plate.crystal[..., by0:by1, x0:x1])
+    return None
+
+def is_border_correct(plate, cells_at_border):
+    """
+    Checks if border is correct
+    
+    :param plate: (Plate) the support of the simulation
+    :param cells_at_border: (set) the coordinates of the cells at the border
+    :return: (bool) True if it is correct, False otherwise
+    
+    Exemple: 
+    
+    >>> little_plate = create_plate(dim=(5,5))
+    >>> is_border_correct(little_plate, {(0,0)})
+    False
+    >>> is_border_correct(little_plate, {(2, 1), (1, 1), (1, 2), (2, 3), (3, 2), (3, 1)})
+    True
+    """
+    table = neighbour_table(plate.shape)
+    for (y,x) in np.ndindex(*plate.shape):
+        cell_di = plate[y][x]
+        neighbours = {} # A dictionnary of all neighbours key: coordinates value: dictionnary
+        for n in table[y * plate.shape[1] + x]:
+            if n >= 0:
+                y2, x2 = divmod(int(n), plate.shape[1])
+                neighbours[(y2,x2)] = plate[y2][x2]
+            
+        if (y, x) in cells_at_border:
+            has_neighbour = False
+            for neigh_coord, neigh_di in neighbours.items():
+                if neigh_di["is_in_crystal"] == True:
+                    has_neighbour = True
+                    break
+            if not has_neighbour:
+                return False
+        
+        elif cell_di["is_in_crystal"] == True:
+            if (y,x) in cells_at_border:
+                return False
+        
+        else:
+            has_neighbour = False
+            for neigh_coord, neigh_di in neighbours.items():
+                if neigh_di["is_in_crystal"] == True:
+                    has_neighbour = True
+                    break
+            if has_neighbour:
+                return False
+    return True
+  
+def cell_colours(plate, number=NUMBER, rho=RHO):
+    """
+    Returns the colour of each cell of the plate in the pictures: the cells of the crystal are green with more blue
+    for the cells which joined it later, the other cells are blue with less blue for more steam.
+    
+    :param plate: (Plate) the plate which contains the cristal
+    :param number: (int) [DEFAULT:NUMBER] the total number of iterations
+    :param rho: (float) [DEFAULT:RHO] the density of steam at the beginning of the simulation
+    :return: (numpy.ndarray of uint8) array of shape (rows, columns, 3) of the RGB colours
+    
+    Exemple:
+    
+    >>> cell_colours(create_plate(dim=(1, 3)), number=10)[0].tolist()
+    [[0, 0, 0], [0, 255, 0], [0, 0, 0]]
+    """
+    colours = np.zeros(plate.shape + (3,), dtype=np.uint8)
+    crystal = plate.crystal
+    steam = np.clip(255 - np.trunc(plate.d / rho * 255), 0, 255)
+    age = np.clip(np.trunc(plate.i / number * 255), 0, 255)
+    colours[..., 1] = np.where(crystal, 255, 0)
+    colours[..., 2] = np.where(crystal, age, steam)
+    return colours
+
+def build_hexagon_map(dim):
+    """
+    Builds the map of `hexagon_map`, without its caches. The hexagons are drawn with the number of their cell as colour,
+    so the map is exactly the picture the hexagons would make, with the same pixels covered by two hexagons.
+    They are drawn by bands of HEXAGON_BLOCK rows of cells, so only the picture of a band is held as numbers of cells.
+    
+    :param dim: (tuple) couple of positives integers (row, column), the dimension of the plate
+    :return: (numpy.ndarray of uint8) array of shape (height, width), see `hexagon_map`
+    
+    Exemple:
+    
+    >>> build_hexagon_map((2, 2))[::5, ::6].tolist()
+    [[255, 0, 255, 0, 255], [0, 0, 0, 0, 1], [2, 2, 0, 2, 0], [255, 0, 0, 0, 0], [255, 2, 2, 2, 2]]
+    """
+    height, width = dim[0]*11+3, 12*dim[1]+6
+    codes = np.empty((height, width), dtype=np.uint8)
+    for y0 in range(0, dim[0], HEXAGON_BLOCK):
+        y1 = min(y0 + HEXAGON_BLOCK, dim[0])
+        # The band of pixels of the rows y0 to y1, up to the bottom of the picture for the last one
+        top, bottom = 10*y0, height if y1 == dim[0] else 10*y1
+        picture = Image.new("I", (width, bottom - top), color=0)
+        draw = ImageDraw.Draw(picture)
+        # The hexagons of the row before the band cover its first pixels
+        for y in range(max(0, y0 - 1), y1):
+            # Add the horizontal offset on every other row
+            x_ = 0 if (y % 2 == 0) else 6
+            for x in range(dim[1]):
+                shape = [
+                    (12*x +6  +x_, y*10 -top    ),
+                    (12*x +12 +x_, y*10 -top +3 ),
+                    (12*x +12 +x_, y*10 -top +11),
+                    (12*x +6  +x_, y*10 -top +14),
+                    (12*x     +x_, y*10 -top +11),
+                    (12*x     +x_, y*10 -top +3 )
+                ]
+                number = y * dim[1] + x + 1
+                draw.polygon(xy=shape, fill=number, outline=number)
+        
+        numbers = np.asarray(picture, dtype=np.int32) - 1
+        y, x = np.divmod(numbers, dim[1])
+        dy = y - np.arange(top, bottom, dtype=np.int32)[:, None] // 10
+        dx = x - (np.arange(width, dtype=np.int32)[None, :] - 6 * (y & 1)) // 12
+        codes[top:bottom] = np.where(numbers < 0, 255, 2 * -dy + -dx)
+    return codes
+
+HEXAGON_MAPS = {} # The maps of `hexagon_map` kept in memory, the last used at the end
+
+def hexagon_map(dim, cache_directory=None):
+    """
+    Returns the map of the pixels of the picture of a plate made of hexagons to the cells of the plate.
+    The pixel (py, px) shows the cell of the row y = py // 10 + dy and of the column x = (px - 6 * (y % 2)) // 12 + dx,
+    where dy and dx are -1 or 0: the map holds the code 2 * -dy + -dx of each pixel, 255 for the background,
+    so one byte per pixel. The maps of the last NEIGHBOUR_TABLE_KEEP dimensions are kept in memory, and a map which
+    is not in memory is read from `cache_directory` or built and saved there (see `load_or_build`), so the processes
+    which save the pictures share one map instead of each building their own.
+    
+    :param dim: (tuple) couple of positives integers (row, column), the dimension of the plate
+    :param cache_directory: (str) [DEFAULT: None] the folder where the map is saved (usually CACHE_DIRECTORY),
+        None to not save it
+    :return: (numpy.ndarray of uint8) read only array of shape (height, width) of the codes of the pixels
+    
+    Exemple:
+    
+    >>> codes = hexagon_map((2, 2))
+    >>> codes.shape, codes.dtype, int(codes[5, 6]), int(codes[15, 20]), int(codes[0, 0])
+    ((25, 30), dtype('uint8'), 0, 0, 255)
+    >>> hexagon_map((2, 2)) is codes
+    True
+    """
+    dim = (int(dim[0]), int(dim[1]))
+    key = (dim, cache_directory)
+    codes = HEXAGON_MAPS.pop(key, None)
+    if codes is None:
+        path = None if cache_directory is None else os.path.join(cache_directory, "hexagons-{}x{}.npy".format(*dim))
+        codes = load_or_build(path, (dim[0]*11+3, 12*dim[1]+6), np.uint8, lambda: build_hexagon_map(dim))
+    
+    HEXAGON_MAPS[key] = codes # The last used is put at the end
+    while len(HEXAGON_MAPS) > NEIGHBOUR_TABLE_KEEP:
+        del HEXAGON_MAPS[next(iter(HEXAGON_MAPS))]
+    return codes
+
+def hexagon_colours(colours, cache_directory=None):
+    """
+    Returns the pixels of the picture of a plate made of hexagons (see `hexagon_map`).
+    The numbers of the cells of the pixels are decoded by bands of HEXAGON_BLOCK rows of cells.
+    
+    :param colours: (numpy.ndarray of uint8) array of shape (rows, columns, 3) of the colours of the cells (see `cell_colours`)
+    :param cache_directory: (str) [DEFAULT: None] the folder of the map of the pixels, see `hexagon_map`
+    :return: (numpy.ndarray of uint8) array of shape (height, width, 3) of the colours of the pixels
+    
+    Exemple:
+    
+    >>> colours = np.arange(12, dtype=np.uint8).reshape(2, 2, 3)
+    >>> pixels = hexagon_colours(colours)
+    >>> pixels.shape, pixels[5, 6].tolist(), pixels[15, 20].tolist(), pixels[0, 0].tolist()
+    ((25, 30, 3), [0, 1, 2], [9, 10, 11], [0, 0, 0])
+    """
+    dim = colours.shape[:2]
+    codes = hexagon_map(dim, cache_directory)
+    # The last colour of the table is the one of the background
+    table = np.concatenate((colours.reshape(-1, 3), np.zeros((1, 3), dtype=np.uint8)))
+    pixels = np.empty(codes.shape + (3,), dtype=np.uint8)
+    px = np.arange(codes.shape[1])
+    # The columns of the cells of the rows without and with the horizontal offset at each column of pixels
+    columns = np.stack((px // 12, (px - 6) // 12)).astype(np.int32)
+    for top in range(0, codes.shape[0], 10 * HEXAGON_BLOCK):
+        band = codes[top:top + 10 * HEXAGON_BLOCK]
+        rows = np.arange(top, top + band.shape[0]) // 10
+        # The cells of the pixels in the row py // 10 (dy = 0) and in the row before it (dy = -1)
+        same = columns[rows % 2] + (rows * dim[1]).astype(np.int32)[:, None]
+        before = columns[1 - rows % 2] + ((rows - 1) * dim[1]).astype(np.int32)[:, None]
+        cells = np.where(band >= 2, before, same)
+        cells -= band & 1
+        cells[band == 255] = -1 # The last colour of the table
+        table.take(cells, axis=0, out=pixels[top:top + band.shape[0]])
+    return pixels
+
+def savestates(plate, filename, n, newpath, number=NUMBER, rho=RHO):
+    """
+    Create a JPEG and a PNG of the snowflake.
+    
+    :param plate: (Plate) The plate which contain the cristal.
+    :param filename: (str) Name of the file.
+    :param n: (int) The n-th iteration of the snowflake.
+        0 by default, if the param doesn't change you will only get the last image.
+    :param newpath: (str) the path of the folder where the pictures are saved
+    :param number: (int) [DEFAULT:NUMBER] the total number of iterations
+    :param rho: (float) [DEFAULT:RHO] the density of steam at the beginning of the simulation
+    """
+    save_colours(cell_colours(plate, number=number, rho=rho), filename, n, newpath, number=number)
+
+def save_colours(colours, filename, n, newpath, number=NUMBER, cache_directory=None):
+    """
+    Saves the pictures of `savestates` from the colours of the cells, which are all they need
+    
+    :param colours: (numpy.ndarray of uint8) array of shape (rows, columns, 3) of the colours of the cells (see `cell_colours`)
+    :param filename: (str) Name of the file.
+    :param n: (int) The n-th iteration of the snowflake.
+    :param newpath: (str) the path of the folder where the pictures are saved
+    :param number: (int) [DEFAULT:NUMBER] the total number of iterations
+    :param cache_directory: (str) [DEFAULT: None] the folder of the map of the pixels of the hexagons, see `hexagon_map`
+    """
+    index_number = str(n).zfill(len(str(number))) # Adds leading zeros in front of the index (instead of 50 we would get 050)
+    
+    # Creating the pixel image
+    Image.fromarray(colours, "RGB").save(newpath + "Pixels/" + filename + index_number + ".png", format="PNG")
+    
+    # Creating the Hexagon Image
+    snowflake = Image.fromarray(hexagon_colours(colours, cache_directory), "RGB")
+    snowflake.save(newpath + "Hexagons/" + filename + index_number + ".jpeg", format="JPEG")
+    return
+  
+def create_gif(path):
+    """
+    Creates a gif of all the images from the simulation. It will be saved in the same folder as the pictures
+    
+    :param path: (str) the path of the folder in which the pictures are saved
+    :return: None
     """
     newpath = path + "Pixels/"
     list_pictures = [f for f in os.listdir(newpath) if (os.path.isfile(os.path.join(newpath, f)) and ("jpeg" in f or "png" in f))]
     list_pictures.sort()
     
-    with imageio.get_writer(path + "legif.gif", mode='I', fps=25) as writer:
-        for filename in list_pictures:
-            image = imageio.imread(newpath + filename)
-            writer.append_data(image)
-  
-  
+    with AnimationWriter(path + "legif.gif") as writer:
+        for filename in list_pictures:
+            with Image.open(newpath + filename) as image:
+                writer.append(np.asarray(image.convert("RGB")))
+
+def snowflake_palette():
+    """
+    Returns the palette of 256 colours of the animations of the snowflake (see `cell_colours`): 128 levels of blue
+    for the cells outside of the crystal, then the same levels with green for the cells of the crystal.
+    
+    :return: (numpy.ndarray of uint8) array of shape (256, 3) of the RGB colours
+    """
+    levels = np.arange(128) * 255 // 127
+    return np.stack([np.zeros(256, dtype=np.int64), np.repeat([0, 255], 128), np.tile(levels, 2)], axis=1).astype(np.uint8)
+
+class AnimationWriter(object):
+    """
+    Writes an animation frame by frame, as a GIF or an animated PNG depending on the extension of the file.
+    Each frame is encoded and written as soon as it is given, so the animation does not have to be made from the pictures
+    at the end of the simulation. Only the part of a frame which differs from the previous one is written.
+    
+    The GIF frames use the colours of the snowflake (see `snowflake_palette`) if `palette` is True,
+    or a palette of their own made from their colours. The animated PNG frames keep their exact colours.
+    
+    :Attributes:
+        - path: (str) the path of the file
+        - fps: (int) the number of frames per second
+        - frames: (int) the number of frames written so far
+    
+    Exemple:
+    
+    >>> import tempfile
+    >>> frame = cell_colours(create_plate(dim=(5, 7)), number=10)
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     for name in ("snowflake.gif", "snowflake.png"):
+    ...         with AnimationWriter(os.path.join(directory, name)) as writer:
+    ...             writer.append(frame)
+    ...             frame[1, 2] = (0, 255, 128)
+    ...             writer.append(frame)
+    ...         with Image.open(os.path.join(directory, name)) as image:
+    ...             image.seek(1)
+    ...             print(image.n_frames, image.convert("RGB").getpixel((2, 1)))
+    2 (0, 255, 128)
+    2 (0, 255, 128)
+    """
+    
+    def __init__(self, path, fps=ANIMATION_FPS, palette=True, crop=True):
+        """
+        :param path: (str) the path of the file, ending by ".gif" for a GIF and by ".png" for an animated PNG
+        :param fps: (int) [DEFAULT: ANIMATION_FPS] the number of frames per second
+        :param palette: (bool) [DEFAULT: True] True to use the colours of the snowflake in the GIF frames, False to make a palette for each frame
+        :param crop: (bool) [DEFAULT: True] True to only write the part of the frames which changed
+        """
+        self.path = path
+        self.fps = fps
+        self.palette = palette
+        self.crop = crop
+        self.gif = path.lower().endswith(".gif")
+        self.frames = 0
+        self.previous = None
+        self.sequence = 0 # The number of the next chunk of an animated PNG
+        self.file = open(path, "wb")
+        if self.palette:
+            # The index of each level of blue in the palette
+            self.levels = (np.arange(256) * 127 + 127) // 255
+    
+    def append(self, frame):
+        """
+        Adds a frame at the end of the animation
+        
+        :param frame: (numpy.ndarray of uint8) array of shape (rows, columns, 3) of the RGB colours of the pixels
+        :return: None
+        """
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        if self.previous is not None and frame.shape != self.previous.shape:
+            raise ValueError("All the frames of an animation must have the same size")
+        if self.previous is None:
+            self.write_header(frame.shape[1], frame.shape[0])
+            y0, y1, x0, x1 = 0, frame.shape[0], 0, frame.shape[1]
+        elif self.crop:
+            changed = (frame != self.previous).any(axis=2)
+            rows, columns = np.nonzero(changed.any(axis=1))[0], np.nonzero(changed.any(axis=0))[0]
+            if len(rows):
+                y0, y1, x0, x1 = rows[0], rows[-1] + 1, columns[0], columns[-1] + 1
+            else:
+                y0, y1, x0, x1 = 0, 1, 0, 1 # Nothing changed, one pixel is written again
+        else:
+            y0, y1, x0, x1 = 0, frame.shape[0], 0, frame.shape[1]
+        
+        if self.gif:
+            self.write_gif_frame(frame[y0:y1, x0:x1], (int(x0), int(y0)))
+        else:
+            self.write_png_frame(frame[y0:y1, x0:x1], (int(x0), int(y0)))
+        self.previous = frame.copy()
+        self.frames += 1
+    
+    def write_header(self, width, height):
+        """
+        Writes the beginning of the file, before the first frame
+        """
+        if self.gif:
+            flags = 0xf7 if self.palette else 0 # Global palette of 256 colours
+            self.file.write(b"GIF89a" + struct.pack("<HHBBB", width, height, flags, 0, 0))
+            if self.palette:
+                self.file.write(snowflake_palette().tobytes())
+            # The animation loops forever
+            self.file.write(b"!\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00")
+        else:
+            self.file.write(b"\x89PNG\r\n\x1a\n")
+            self.write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            # The number of frames is written again when the file is closed
+            self.animation_control = self.file.tell()
+            self.write_chunk(b"acTL", struct.pack(">II", 0, 0))
+    
+    def write_gif_frame(self, frame, offset):
+        """
+        Writes a frame of a GIF, `offset` being the position of its top left corner
+        """
+        if self.palette:
+            indices = np.where(frame[..., 1] >= 128, 128, 0) + self.levels[frame[..., 2]]
+            image = Image.fromarray(indices.astype(np.uint8), "P")
+            image.putpalette(snowflake_palette().tobytes())
+        else:
+            image = Image.fromarray(frame, "RGB").quantize(256)
+        for data in GifImagePlugin.getdata(image, offset, duration=1000 // self.fps, disposal=1,
+                                           include_color_table=not self.palette):
+            self.file.write(data)
+    
+    def write_png_frame(self, frame, offset):
+        """
+        Writes a frame of an animated PNG, `offset` being the position of its top left corner
+        """
+        height, width = frame.shape[:2]
+        self.write_chunk(b"fcTL", struct.pack(">IIIIIHHBB", self.sequence, width, height, offset[0], offset[1], 1, self.fps, 0, 0))
+        self.sequence += 1
+        # Each row starts with the number of its filter, 0 for none
+        rows = np.concatenate([np.zeros((height, 1), dtype=np.uint8), frame.reshape(height, width * 3)], axis=1)
+        data = zlib.compress(rows.tobytes())
+        if self.frames == 0:
+            self.write_chunk(b"IDAT", data)
+        else:
+            self.write_chunk(b"fdAT", struct.pack(">I", self.sequence) + data)
+            self.sequence += 1
+    
+    def write_chunk(self, kind, data):
+        """
+        Writes a chunk of a PNG file
+        """
+        self.file.write(struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data)))
+    
+    def close(self):
+        """
+        Writes the end of the file and closes it
+        """
+        if self.file is None:
+            return
+        if self.gif:
+            self.file.write(b";")
+        elif self.previous is not None:
+            self.write_chunk(b"IEND", b"")
+            self.file.seek(self.animation_control)
+            self.write_chunk(b"acTL", struct.pack(">II", self.frames, 0))
+        self.file.close()
+        self.file = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+class FrameWriter(object):
+    """
+    Saves the pictures of the plate (see `savestates`) in other processes, so the simulation goes on while they are drawn.
+    The colours of the cells are calculated in the main process and only they are sent to the processes, which is
+    3 bytes per cell instead of the whole plate. The map of the pixels of the hexagons is built once by the main process
+    in `cache_directory`, and the processes map the same file in memory (see `hexagon_map`). At most `queue_size` pictures wait to be saved: beyond that,
+    `save` waits for the oldest one. `flush` and `close` wait for all the pictures, so none of them is lost.
+    The errors of the processes are raised in the main process.
+    
+    :Attributes:
+        - workers: (int) the number of processes, 0 to save the pictures in the main process
+        - queue_size: (int) the largest number of pictures waiting to be saved
+        - cache_directory: (str) the folder of the maps of the pixels of the hexagons, None to let each process build them
+    
+    Exemple:
+    
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     os.makedirs(directory + "/Pixels"); os.makedirs(directory + "/Hexagons")
+    ...     with FrameWriter(workers=2, queue_size=2, cache_directory=directory) as writer:
+    ...         for n in range(4):
+    ...             writer.save(create_plate(dim=(5, 5)), "snowflake", n, directory + "/", number=10)
+    ...     sorted(os.listdir(directory + "/Pixels")), sorted(os.listdir(directory))
+    (['snowflake00.png', 'snowflake01.png', 'snowflake02.png', 'snowflake03.png'], ['Hexagons', 'Pixels', 'hexagons-5x5.npy'])
+    """
+    
+    def __init__(self, workers=FRAME_WORKERS, queue_size=FRAME_QUEUE, cache_directory=CACHE_DIRECTORY):
+        """
+        :param workers: (int) [DEFAULT: FRAME_WORKERS] the number of processes, 0 to save the pictures in the main process
+        :param queue_size: (int) [DEFAULT: FRAME_QUEUE] the largest number of pictures waiting to be saved
+        :param cache_directory: (str) [DEFAULT: CACHE_DIRECTORY] the folder of the maps of the pixels of the hexagons
+        """
+        self.workers = workers
+        self.queue_size = max(1, queue_size)
+        self.cache_directory = cache_directory
+        self.pending = deque()
+        self.pool = multiprocessing.get_context().Pool(workers) if workers > 0 else None
+    
+    def save(self, plate, filename, n, newpath, number=NUMBER, rho=RHO):
+        """
+        Saves the pictures of the plate, with the parameters of `savestates`
+        """
+        if self.pool is None:
+            colours = cell_colours(plate, number=number, rho=rho)
+            return save_colours(colours, filename, n, newpath, number=number, cache_directory=self.cache_directory)
+        while len(self.pending) >= self.queue_size:
+            self.pending.popleft().get()
+        # The colours are a new array, so the plate can change while they wait to be sent
+        colours = cell_colours(plate, number=number, rho=rho)
+        # The map is saved before the processes need it, so they read it instead of building it
+        hexagon_map(colours.shape[:2], self.cache_directory)
+        self.pending.append(self.pool.apply_async(save_colours, (colours, filename, n, newpath, number, self.cache_directory)))
+    
+    def flush(self):
+        """
+        Waits until all the pictures are saved
+        """
+        while self.pending:
+            self.pending.popleft().get()
+    
+    def close(self):
+        """
+        Saves the remaining pictures and stops the processes
+        """
+        if self.pool is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is not None and self.pool is not None:
+            # The simulation failed, the pictures are not waited for
+            self.pending.clear()
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        self.close()
+
+class HistoryWriter(object):
+    """
+    Records the history of a simulation in a folder, from which the state of the crystal at any iteration can be rebuilt (see `History`).
+    Each cell which joins the crystal is appended to `events.bin` as two int32: its number (y * columns + x) and the iteration.
+    Every `keyframe_frequency` iterations, the steam of the plate is appended to `steam.bin`, quantized on 16 bits,
+    stored as differences between neighbouring cells of a row and compressed with zlib.
+    `index.json` holds the parameters of the simulation and the position of each keyframe.
+    
+    :Attributes:
+        - path: (str) the folder of the history
+        - config: (SimulationConfig) the parameters of the simulation
+        - iteration: (int) the number of iterations recorded
+    """
+    
+    def __init__(self, path, config, iteration=0):
+        """
+        :param path: (str) the folder of the history
+        :param config: (SimulationConfig) the parameters of the simulation
+        :param iteration: (int) [DEFAULT: 0] the iteration of the simulation. When it is resumed, the events and keyframes
+            recorded after this iteration are removed
+        """
+        self.path = path
+        self.config = config
+        self.iteration = iteration
+        os.makedirs(path, exist_ok=True)
+        self.keyframes = []
+        events, steam = os.path.join(path, "events.bin"), os.path.join(path, "steam.bin")
+        if iteration > 0 and os.path.exists(os.path.join(path, "index.json")):
+            with open(os.path.join(path, "index.json")) as file:
+                self.keyframes = [keyframe for keyframe in json.load(file)["keyframes"] if keyframe[0] <= iteration]
+            kept = int(np.searchsorted(np.fromfile(events, dtype=np.int32)[1::2], iteration))
+            with open(events, "r+b") as file:
+                file.truncate(kept * 8)
+            with open(steam, "r+b") as file:
+                file.truncate(sum(keyframe[2] for keyframe in self.keyframes))
+            self.events = open(events, "ab")
+            self.steam = open(steam, "ab")
+        else:
+            self.events = open(events, "wb")
+            self.steam = open(steam, "wb")
+    
+    def record(self, simulation, attached):
+        """
+        Records an iteration of the simulation
+        
+        :param simulation: (Simulation) the simulation, after the iteration
+        :param attached: (numpy.ndarray) array of shape (n, 2) of the coordinates of the cells which joined the crystal (see `Simulation.step`)
+        :return: None
+        """
+        attached = np.asarray(attached).reshape(-1, 2)
+        events = np.empty((len(attached), 2), dtype=np.int32)
+        events[:, 0] = attached[:, 0] * self.config.dimension[1] + attached[:, 1]
+        events[:, 1] = simulation.iteration - 1
+        self.events.write(events.tobytes())
+        self.iteration = simulation.iteration
+        if self.config.keyframe_frequency and self.iteration % self.config.keyframe_frequency == 0:
+            self.keyframe(simulation.plate)
+    
+    def keyframe(self, plate):
+        """
+        Records the steam of the plate at the current iteration
+        
+        :param plate: (Plate) the support of the crystal
+        :return: None
+        """
+        if self.keyframes and self.keyframes[-1][0] == self.iteration:
+            return
+        scale = float(plate.d.max()) / 65535 or 1.0
+        quantized = np.rint(plate.d / scale).astype(np.uint16)
+        data = zlib.compress(np.diff(quantized, axis=1, prepend=np.uint16(0)).tobytes())
+        offset = sum(keyframe[2] for keyframe in self.keyframes)
+        self.steam.write(data)
+        self.keyframes.append([self.iteration, offset, len(data), scale])
+        self.write_index()
+    
+    def write_index(self):
+        """
+        Writes the index of the history, once the files it points to are written
+        """
+        self.events.flush()
+        self.steam.flush()
+        index = {"config": asdict(self.config), "iteration": self.iteration, "keyframes": self.keyframes}
+        temporary = os.path.join(self.path, "index.json.{}.tmp".format(os.getpid()))
+        with open(temporary, "w") as file:
+            json.dump(index, file)
+        os.replace(temporary, os.path.join(self.path, "index.json"))
+    
+    def close(self, plate=None):
+        """
+        Writes the index and closes the files
+        
+        :param plate: (Plate) [DEFAULT: None] the plate at the last iteration, whose steam is recorded if it is given
+        :return: None
+        """
+        if self.events is None:
+            return
+        if plate is not None and self.config.keyframe_frequency:
+            self.keyframe(plate)
+        self.write_index()
+        self.events.close()
+        self.steam.close()
+        self.events = self.steam = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+class History(object):
+    """
+    The history of a simulation recorded by `HistoryWriter`, from which the state of the crystal at any iteration is rebuilt.
+    The crystal and the iterations at which the cells joined it are exact. The steam is the one of the last keyframe
+    before the iteration (rho everywhere if there is none), up to its quantization.
+    
+    :Attributes:
+        - config: (SimulationConfig) the parameters of the simulation
+        - iteration: (int) the number of iterations recorded
+        - events: (numpy.ndarray of int32) array of shape (n, 2) of the number of the cell and the iteration of each event
+        - keyframes: (list) the [iteration, offset, length, scale] of each keyframe
+    
+    Exemple:
+    
+    >>> import tempfile
+    >>> simulation = Simulation(dimension=(31, 31), number=20, beta=0.4, keyframe_frequency=5)
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     with HistoryWriter(directory, simulation.config) as writer:
+    ...         for n in range(20):
+    ...             writer.record(simulation, simulation.step())
+    ...             if n == 9:
+    ...                 middle = simulation.plate.copy()
+    ...     history = History(directory)
+    ...     plate = history.plate(10)
+    ...     history.iteration, bool((plate.i == middle.i).all()), float(np.abs(plate.d - middle.d).max()) < 1e-4
+    (20, True, True)
+    """
+    
+    def __init__(self, path):
+        """
+        :param path: (str) the folder of the history
+        """
+        self.path = path
+        with open(os.path.join(path, "index.json")) as file:
+            index = json.load(file)
+        self.config = SimulationConfig(**index["config"])
+        self.iteration = index["iteration"]
+        self.keyframes = index["keyframes"]
+        events = os.path.join(path, "events.bin")
+        # The events of the iterations after the index are not complete
+        self.events = np.fromfile(events, dtype=np.int32).reshape(-1, 2)
+        self.events = self.events[:np.searchsorted(self.events[:, 1], self.iteration)]
+    
+    def plate(self, iteration):
+        """
+        Returns the plate at an iteration. The quasi-liquid water and the ice are not recorded, they are set to 0.
+        
+        :param iteration: (int) the number of iterations done, between 0 and `iteration`
+        :return: (Plate) the plate
+        """
+        if not 0 <= iteration <= self.iteration:
+            raise ValueError("The history goes from the iteration 0 to {}".format(self.iteration))
+        config = self.config
+        plate = create_plate(dim=config.dimension, initial_position=config.initial_position, rho=config.rho, dtype=config.precision)
+        plate.c[...] = 0
+        events = self.events[:np.searchsorted(self.events[:, 1], iteration)]
+        plate.crystal.ravel()[events[:, 0]] = True
+        plate.i.ravel()[events[:, 0]] = events[:, 1]
+        
+        keyframes = [keyframe for keyframe in self.keyframes if keyframe[0] <= iteration]
+        if keyframes:
+            _, offset, length, scale = keyframes[-1]
+            with open(os.path.join(self.path, "steam.bin"), "rb") as file:
+                file.seek(offset)
+                data = zlib.decompress(file.read(length))
+            differences = np.frombuffer(data, dtype=np.uint16).reshape(config.dimension)
+            plate.d[...] = np.cumsum(differences, axis=1, dtype=np.uint16) * scale
+        plate.d[plate.crystal] = 0
+        return plate
+    
+    def picture(self, iteration, hexagons=False, scale=1):
+        """
+        Returns the picture of the plate at an iteration, like the ones saved by `savestates`
+        
+        :param iteration: (int) the number of iterations done
+        :param hexagons: (bool) [DEFAULT: False] True for the picture made of hexagons, False for the one with one pixel per cell
+        :param scale: (int) [DEFAULT: 1] the number of times the picture is enlarged
+        :return: (PIL.Image.Image) the picture
+        """
+        colours = cell_colours(self.plate(iteration), number=self.config.number, rho=self.config.rho)
+        if hexagons:
+            colours = hexagon_colours(colours, self.config.cache_directory)
+        picture = Image.fromarray(colours, "RGB")
+        if scale != 1:
+            picture = picture.resize((picture.width * scale, picture.height * scale), Image.NEAREST)
+        return picture
+
+class PhaseTimer(object):
+    """
+    Adds up the time taken by each phase of the iterations of a simulation
+    
+    :Attributes:
+        - totals: (dict) the time taken by each phase since the last `reset`, in seconds
+    
+    Exemple:
+    
+    >>> simulation = Simulation(dimension=(31, 31), number=5, sigma=0.01)
+    >>> simulation.timer = PhaseTimer()
+    >>> simulation.run()
+    >>> sorted(simulation.timer.reset())
+    ['boundary', 'diffusion', 'interference']
+    """
+    
+    def __init__(self):
+        self.totals = {}
+        self.last = None
+    
+    def start(self):
+        """
+        Starts measuring the first phase
+        """
+        self.last = time.perf_counter()
+    
+    def lap(self, phase):
+        """
+        Ends the measure of a phase and starts measuring the next one
+        
+        :param phase: (str) the name of the phase which ended
+        """
+        now = time.perf_counter()
+        self.totals[phase] = self.totals.get(phase, 0.0) + now - self.last
+        self.last = now
+    
+    def reset(self):
+        """
+        Returns the times measured and starts adding them up again from 0
+        
+        :return: (dict) the time taken by each phase, in seconds
+        """
+        totals, self.totals = self.totals, {}
+        return totals
+
+# The measures written by a `MetricsWriter`
+METRICS_FIELDS = ("iteration", "max_point", "crystal", "attached", "border", "window",
+                  "diffusion", "boundary", "interference", "wall", "memory")
+
+def peak_memory():
+    """
+    Returns the largest amount of memory used by the process so far, in megabytes, None if it can not be known
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux gives kilobytes, macOS gives bytes
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+class MetricsWriter(object):
+    """
+    Measures a simulation as it runs and writes the measures every `interval` iterations to a CSV file if the path ends
+    with ".csv", to a JSON lines file otherwise. A line holds (see `METRICS_FIELDS`): the iteration, `max_point`, the number
+    of cells in the crystal, the number of cells which joined it and the time taken by each phase since the last line,
+    the number of cells at the border of the crystal, the number of cells on which the diffusion is calculated,
+    the time since the last line (the pictures and the other outputs included) and the largest amount of memory
+    used by the process, in megabytes.
+    The phases are only measured when the simulation is given a timer, so a simulation without metrics is not slowed down.
+    
+    Exemple:
+    
+    >>> import tempfile
+    >>> simulation = Simulation(dimension=(31, 31), number=10, beta=0.4)
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     with MetricsWriter(os.path.join(directory, "metrics.csv"), simulation, interval=5) as metrics:
+    ...         for _ in range(10):
+    ...             metrics.record(simulation, simulation.step())
+    ...     with open(os.path.join(directory, "metrics.csv")) as file:
+    ...         rows = list(csv.DictReader(file))
+    >>> [(row["iteration"], row["max_point"], row["attached"]) for row in rows]
+    [('5', '5', '90'), ('10', '10', '240')]
+    """
+    
+    def __init__(self, path, simulation, interval=METRICS_INTERVAL):
+        """
+        :param path: (str) the path of the file
+        :param simulation: (Simulation) the simulation measured, which is given a `PhaseTimer`
+        :param interval: (int) [DEFAULT: METRICS_INTERVAL] the frequency at which the measures are written
+        """
+        self.path = path
+        self.interval = max(1, interval)
+        self.file = open(path, "w", newline="")
+        self.csv = csv.DictWriter(self.file, METRICS_FIELDS) if path.lower().endswith(".csv") else None
+        if self.csv is not None:
+            self.csv.writeheader()
+        self.timer = simulation.timer = PhaseTimer()
+        self.attached = 0
+        self.last = time.perf_counter()
+    
+    def record(self, simulation, attached):
+        """
+        Counts an iteration of the simulation, and writes the measures if it is time to
+        
+        :param simulation: (Simulation) the simulation, after the iteration
+        :param attached: (numpy.ndarray) array of shape (n, 2) of the coordinates of the cells which joined the crystal (see `Simulation.step`)
+        :return: None
+        """
+        self.attached += len(attached)
+        if simulation.iteration % self.interval == 0:
+            self.write(simulation)
+    
+    def write(self, simulation):
+        """
+        Writes the measures of the simulation
+        """
+        now = time.perf_counter()
+        plate = simulation.plate
+        y0, y1, x0, x1 = boundary_window(simulation.init_pos, simulation.max_point, plate.shape)
+        border = ~plate.crystal[y0:y1, x0:x1] & (hex_neighbour_sum(plate.crystal.view(np.uint8), y0, y1, x0, x1) > 0)
+        if simulation.tiles is not None:
+            window = sum((y1 - y0) * (x1 - x0) for y0, y1, x0, x1 in
+                         (simulation.tiles.bounds(ty, tx) for ty, tx in np.argwhere(simulation.tiles.active)))
+        else:
+            y0, y1, x0, x1 = diffusion_window(simulation.init_pos, simulation.max_point, simulation.config.approximation, plate.shape)
+            window = (y1 - y0) * (x1 - x0)
+        measures = dict(self.timer.reset(), iteration=simulation.iteration, max_point=simulation.max_point,
+                        crystal=int(plate.crystal.sum()), attached=self.attached, border=int(border.sum()), window=int(window),
+                        wall=now - self.last, memory=peak_memory())
+        line = {field: measures.get(field) for field in METRICS_FIELDS}
+        if self.csv is not None:
+            self.csv.writerow(line)
+        else:
+            self.file.write(json.dumps(line) + "\n")
+        self.file.flush()
+        self.attached = 0
+        self.last = now
+    
+    def close(self):
+        """
+        Closes the file
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+# The measures of the shape of the crystal recorded by `MorphologyTracker`
+MORPHOLOGY_FIELDS = ("iteration", "area", "radius", "perimeter", "border", "tips", "symmetry", "dimension")
+
+class MorphologyTracker(object):
+    """
+    Measures the shape of the crystal from the cells which join it at each iteration, without reading the plate again:
+    each measure is updated from the new cells and their neighbours only, so it takes the same time whatever the size
+    of the plate. The measures are recorded every `interval` iterations in a compact time series (see `MORPHOLOGY_FIELDS`):
+        - area: the number of cells in the crystal
+        - radius: the distance between the furthest cell of the crystal and the first cell, like `max_point`
+        - perimeter: the number of sides of the cells of the crystal which are not shared with another cell of the crystal
+        - border: the number of cells at the border of the crystal
+        - tips: the number of cells of the crystal with at most `TIP_NEIGHBOURS` neighbours in it (the corners and the ends of the branches)
+        - symmetry: the proportion of the cells of the crystal whose image by the rotation of 60 degrees around the first
+          cell is not in the crystal, 0 for a crystal with the six-fold symmetry
+        - dimension: the fractal dimension estimated by counting the boxes of 1, 2, 4... cells of side which contain
+          a part of the crystal, for the boxes smaller than half the radius (nan while there is only one of them)
+    
+    :Attributes:
+        - dim: (tuple) the dimension of the plate
+        - init_pos: (tuple) the coordinates of the first crystal cell
+        - interval: (int) the frequency at which the measures are recorded, 0 to only record them when `record` is called
+        - area, radius, perimeter, border, tips: (int) the measures
+        - matches: (int) the number of cells of the crystal whose image by the rotation is in the crystal
+        - rows: (list of tuple) the recorded measures
+    
+    Exemple:
+    
+    >>> simulation = Simulation(dimension=(41, 41), number=20, beta=0.4)
+    >>> tracker = MorphologyTracker(simulation.config.dimension, simulation.init_pos, crystal=simulation.plate.crystal, interval=10)
+    >>> for _ in range(20):
+    ...     tracker.update(simulation.step(), simulation.iteration)
+    >>> measures = tracker.measures()
+    >>> measures["area"] == int(simulation.plate.crystal.sum()), measures["radius"] == simulation.max_point
+    (True, True)
+    >>> measures["tips"], measures["symmetry"], round(measures["dimension"], 2)
+    (6, 0.0, 1.82)
+    >>> tracker.series()[["iteration", "area"]].tolist()
+    [(10, 331), (20, 1261)]
+    """
+    
+    def __init__(self, dim, init_pos, crystal=None, interval=0, cache_directory=None):
+        """
+        :param dim: (tuple) the dimension of the plate
+        :param init_pos: (tuple) the coordinates of the first crystal cell
+        :param crystal: (numpy.ndarray of bool) [DEFAULT: only the first cell] the crystal mask the measures start from,
+            the only time the whole plate is read
+        :param interval: (int) [DEFAULT: 0] the frequency at which the measures are recorded by `update`
+        :param cache_directory: (str) [DEFAULT: None] the folder of the table of the neighbours, see `neighbour_table`
+        """
+        self.dim = (int(dim[0]), int(dim[1]))
+        self.init_pos = (int(init_pos[0]), int(init_pos[1]))
+        self.interval = interval
+        self.cache_directory = cache_directory
+        self.crystal = np.zeros(self.dim, dtype=bool)
+        self.neighbours = np.zeros(self.dim, dtype=np.uint8) # The number of neighbours in the crystal of each cell
+        # The boxes of 2, 4, 8... cells of side which contain a part of the crystal, and their number
+        self.scales = [2 ** k for k in range(1, max(self.dim).bit_length())]
+        self.boxes = [np.zeros((-(-self.dim[0] // scale), -(-self.dim[1] // scale)), dtype=bool) for scale in self.scales]
+        self.box_counts = [0] * len(self.scales)
+        self.area = self.radius = self.perimeter = self.border = self.tips = self.matches = 0
+        self.rows = []
+        self.add(np.argwhere(crystal) if crystal is not None else [self.init_pos])
+    
+    def rotate(self, cells, turns):
+        """
+        Returns the numbers (y * columns + x) of the images of cells by the rotation of 60 degrees around the first cell
+        
+        :param cells: (numpy.ndarray of int) array of shape (n, 2) of the coordinates of the cells
+        :param turns: (int) 1 for the rotation, -1 for the opposite rotation
+        :return: (numpy.ndarray of int64) the numbers of the images, -1 for the ones outside of the plate
+        
+        Exemple:
+        
+        >>> tracker = MorphologyTracker((7, 7), (3, 3))
+        >>> images = [[3, 4]]
+        >>> for _ in range(6):
+        ...     images.append(divmod(int(tracker.rotate(np.array(images[-1:]), 1)[0]), 7))
+        >>> images
+        [[3, 4], (4, 4), (4, 3), (3, 2), (2, 3), (2, 4), (3, 4)]
+        >>> tracker.rotate(np.array([[4, 4], [0, 0]]), -1).tolist()
+        [25, -1]
+        """
+        q, r = offset_to_axial(cells[:, 0], cells[:, 1])
+        q0, r0 = offset_to_axial(*self.init_pos)
+        dq, dr = q - q0, r - r0
+        dq, dr = (-dr, dq + dr) if turns == 1 else (dq + dr, -dq)
+        y, x = axial_to_offset(dq + q0, dr + r0)
+        inside = (y >= 0) & (y < self.dim[0]) & (x >= 0) & (x < self.dim[1])
+        return np.where(inside, y * self.dim[1] + x, -1)
+    
+    def add(self, cells):
+        """
+        Updates the measures with cells which joined the crystal
+        
+        :param cells: (numpy.ndarray of int) array of shape (n, 2) of the coordinates of the cells
+        :return: None
+        """
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+        if not len(cells):
+            return
+        numbers = cells[:, 0] * self.dim[1] + cells[:, 1]
+        neighbours = plate_neighbours(numbers, self.dim, self.cache_directory)
+        neighbours = neighbours[neighbours >= 0]
+        crystal, counts = self.crystal.reshape(-1), self.neighbours.reshape(-1)
+        
+        # Only the new cells and their neighbours change, the measures are updated by their state before and after
+        changed = np.unique(np.concatenate([numbers, neighbours]))
+        before, was = counts[changed].astype(np.int64), crystal[changed]
+        previous = self.rotate(cells, -1)
+        self.matches += int(crystal[previous[previous >= 0]].sum()) # The pairs of an old cell and its new image
+        crystal[numbers] = True
+        np.add.at(counts, neighbours, 1)
+        after, now = counts[changed].astype(np.int64), crystal[changed]
+        following = self.rotate(cells, 1)
+        self.matches += int(crystal[following[following >= 0]].sum()) # The pairs of a new cell and its image
+        
+        self.area += len(numbers)
+        self.radius = max(self.radius, int(np.abs(cells - self.init_pos).max()))
+        self.perimeter += int(((6 - after) * now).sum() - ((6 - before) * was).sum())
+        self.border += int(((after > 0) & ~now).sum() - ((before > 0) & ~was).sum())
+        self.tips += int(((after <= TIP_NEIGHBOURS) & now).sum() - ((before <= TIP_NEIGHBOURS) & was).sum())
+        for k, scale in enumerate(self.scales):
+            boxes = self.boxes[k].reshape(-1)
+            numbers = np.unique(cells[:, 0] // scale * self.boxes[k].shape[1] + cells[:, 1] // scale)
+            self.box_counts[k] += int((~boxes[numbers]).sum())
+            boxes[numbers] = True
+    
+    def dimension(self):
+        """
+        Returns the fractal dimension of the crystal, the slope of the logarithm of the number of boxes
+        against the logarithm of their size, nan if there is only one size of box smaller than half the radius
+        
+        :return: (float) the dimension
+        """
+        counts = [self.area] + [count for scale, count in zip(self.scales, self.box_counts) if 2 * scale <= self.radius]
+        if len(counts) < 2:
+            return float("nan")
+        return float(-np.polyfit(np.log2(2 ** np.arange(len(counts))), np.log2(counts), 1)[0])
+    
+    def measures(self):
+        """
+        Returns the current measures
+        
+        :return: (dict) the measures of `MORPHOLOGY_FIELDS`, without the iteration
+        """
+        return {"area": self.area, "radius": self.radius, "perimeter": self.perimeter, "border": self.border, "tips": self.tips,
+                "symmetry": 1 - self.matches / self.area, "dimension": self.dimension()}
+    
+    def update(self, attached, iteration):
+        """
+        Updates the measures with the cells which joined the crystal at an iteration, and records them if it is time to
+        
+        :param attached: (numpy.ndarray) array of shape (n, 2) of the coordinates of the cells (see `Simulation.step`)
+        :param iteration: (int) the number of iterations done
+        :return: None
+        """
+        self.add(attached)
+        if self.interval and iteration % self.interval == 0:
+            self.record(iteration)
+    
+    def record(self, iteration):
+        """
+        Records the current measures in the time series
+        
+        :param iteration: (int) the number of iterations done
+        :return: None
+        """
+        measures = self.measures()
+        self.rows.append(tuple([iteration] + [measures[field] for field in MORPHOLOGY_FIELDS[1:]]))
+    
+    def final(self, iteration):
+        """
+        Records the measures of the last iteration if they are not recorded yet, and returns the time series
+        
+        :param iteration: (int) the number of iterations done
+        :return: (numpy.ndarray) the recorded measures (see `series`)
+        """
+        if not self.rows or self.rows[-1][0] != iteration:
+            self.record(iteration)
+        return self.series()
+    
+    def series(self):
+        """
+        Returns the recorded measures
+        
+        :return: (numpy.ndarray) structured array of one line per record, whose fields are `MORPHOLOGY_FIELDS`
+        """
+        return np.array(self.rows, dtype=[(field, np.float64 if field in ("symmetry", "dimension") else np.int64)
+                                          for field in MORPHOLOGY_FIELDS])
+    
+    def resume(self, path, iteration):
+        """
+        Reads the measures written in a CSV file by `save` up to an iteration, before the measures recorded from now,
+        when a simulation is resumed from this iteration. The measures of the later iterations are left out.
+        
+        :param path: (str) the path of the file, which may not exist
+        :param iteration: (int) the iteration from which the simulation is resumed
+        :return: None
+        
+        Exemple:
+        
+        >>> import tempfile
+        >>> tracker = MorphologyTracker((11, 11), (5, 5))
+        >>> for n in (5, 10, 15):
+        ...     tracker.record(n)
+        >>> resumed = MorphologyTracker((11, 11), (5, 5))
+        >>> with tempfile.TemporaryDirectory() as directory:
+        ...     tracker.save(os.path.join(directory, "morphology.csv"))
+        ...     resumed.resume(os.path.join(directory, "morphology.csv"), 10)
+        >>> resumed.final(20)["iteration"].tolist(), resumed.series().dtype == tracker.series().dtype
+        ([5, 10, 20], True)
+        """
+        if not os.path.exists(path):
+            return
+        with open(path, newline="") as file:
+            rows = [tuple(float(value) if field in ("symmetry", "dimension") else int(value) for field, value in zip(MORPHOLOGY_FIELDS, row))
+                    for row in list(csv.reader(file))[1:]]
+        self.rows = [row for row in rows if row[0] <= iteration] + self.rows
+    
+    def save(self, path):
+        """
+        Writes the recorded measures in a CSV file
+        
+        :param path: (str) the path of the file
+        :return: None
+        """
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(MORPHOLOGY_FIELDS)
+            writer.writerows(self.rows)
+
+class Simulation(object):
+    """
+    The state of a simulation of the growth of a snowflake, which can be advanced one iteration at a time.
+    
+    :Attributes:
+        - config: (SimulationConfig) the parameters of the simulation
+        - plate: (Plate) the support of the crystal
+        - init_pos: (tuple) the coordinates of the first crystal cell
+        - max_point: (int) the distance between the furthest point from the initial_position and the first cell
+        - iteration: (int) the number of iterations done so far
+        - storage: (str) the folder of the files of the plate if `config.storage` is given, None otherwise
+    
+    Exemple:
+    
+    >>> simulation = Simulation(dimension=(31, 31), number=10, beta=0.3)
+    >>> simulation.run()
+    >>> simulation.iteration, simulation.max_point, int(simulation.plate.crystal.sum())
+    (10, 10, 331)
+    >>> with Simulation(dimension=(31, 31), number=10, beta=0.3, storage=tempfile.gettempdir()) as stored:
+    ...     stored.run()
+    ...     bool((stored.plate.d == simulation.plate.d).all())
+    True
+    """
+    
+    # The `PhaseTimer` which measures the phases of `step`, None to not measure them
+    timer = None
+    # The `MorphologyTracker` given the cells which joined the crystal by `run`, None to not measure the shape of the crystal
+    morphology = None
+    storage = None
+    
+    def __init__(self, config=None, **parameters):
+        """
+        :param config: (SimulationConfig) [DEFAULT: the default configuration] the parameters of the simulation
+        :param parameters: parameters of `SimulationConfig` which replace the ones of `config`
+        """
+        if config is None:
+            config = SimulationConfig(**parameters)
+        elif parameters:
+            config = replace(config, **parameters)
+        self.config = config = seeded(config)
+        self.init_pos = config.initial_position
+        if config.storage is not None:
+            self.storage = tempfile.mkdtemp(prefix="plate-", dir=config.storage)
+        self.plate = create_plate(dim=config.dimension, initial_position=self.init_pos, rho=config.rho,
+                                  dtype=config.precision, directory=self.storage)
+        self.max_point = 0
+        self.iteration = 0
+        self.tiles = None
+        if config.tile_size:
+            self.tiles = ActiveTiles(config.dimension, config.tile_size, config.tile_tolerance, self.init_pos, config.cache_directory)
+    
+    def step(self):
+        """
+        Runs one iteration of the simulation: diffusion, freezing, attachment, melting and interference.
+        
+        :return: (numpy.ndarray) array of shape (n, 2) of the coordinates of the n cells which joined the crystal
+        """
+        config = self.config
+        timer = self.timer
+        if timer is not None:
+            timer.start()
+        coefficients = dict(kappa=config.kappa, alpha=config.alpha, beta=config.beta,
+                            theta=config.theta, mu=config.mu, gamma=config.gamma, synchronous=config.synchronous)
+        if self.tiles is None:
+            #DIFFUSION
+            diffusion(self.plate, self.init_pos, self.max_point, approximation=config.approximation)
+            if timer is not None:
+                timer.lap("diffusion")
+            
+            # FREEZING, ATTACHMENT and MELTING of the cells at the border
+            if self.storage is None:
+                self.max_point, attached = boundary_phase(self.plate, self.init_pos, self.max_point, self.iteration, **coefficients)
+            else:
+                self.max_point, attached = streaming_boundary_phase(self.plate, self.init_pos, self.max_point, self.iteration,
+                                                                    cache_directory=config.cache_directory, **coefficients)
+        else:
+            # Only the active tiles are calculated
+            self.tiles.diffusion(self.plate)
+            if timer is not None:
+                timer.lap("diffusion")
+            attached = sparse_boundary_phase(self.plate, self.tiles.border_cells(self.plate), self.iteration,
+                                             cache_directory=config.cache_directory, **coefficients)
+            self.tiles.update(attached)
+            attached = np.stack(np.divmod(np.sort(attached), config.dimension[1]), axis=1)
+            if len(attached):
+                self.max_point = max(self.max_point, int(np.abs(attached - self.init_pos).max()))
+        if timer is not None:
+            timer.lap("boundary")
+        
+        # INTERFERENCE on the cells where the diffusion is calculated
+        if config.sigma:
+            window = diffusion_window(self.init_pos, self.max_point, config.approximation, config.dimension)
+            interference(self.plate, config.sigma, config.seed, self.iteration, window)
+            if timer is not None:
+                timer.lap("interference")
+        self.iteration += 1
+        return attached
+    
+    def run(self, number=None, callback=None):
+        """
+        Runs the simulation until `number` iterations have been done
+        
+        :param number: (int) [DEFAULT: config.number] the total number of iterations
+        :param callback: (function) [DEFAULT: None] function called with the simulation after each iteration
+        :return: None
+        """
+        if number is None:
+            number = self.config.number
+        idle = self.idle()
+        while self.iteration < number:
+            attached = self.step()
+            idle = 0 if len(attached) else idle + 1
+            if self.morphology is not None:
+                self.morphology.update(attached, self.iteration)
+            if callback is not None:
+                callback(self)
+            if self.finished(idle):
+                break
+    
+    def idle(self):
+        """
+        Returns the number of iterations since a cell last joined the crystal, found from the iteration of the last cell
+        which joined it, so a simulation restored from a checkpoint stops when the simulation which was saved would have
+        
+        :return: (int) the number of iterations
+        """
+        i = self.checkpoint_state()[0]["i"]
+        last = int(i.max())
+        if last == 0 and int((i == 0).sum()) == 1:
+            last = -1 # Only the first cell, which was not calculated by an iteration
+        return max(0, self.iteration - 1 - last)
+    
+    def finished(self, idle):
+        """
+        Returns True if the crystal reached `config.target_radius`, or did not grow during `config.stall` iterations
+        
+        :param idle: (int) the number of iterations since a cell last joined the crystal
+        :return: (bool) True if the simulation must stop
+        """
+        config = self.config
+        return bool((config.target_radius and self.max_point >= config.target_radius) or (config.stall and idle >= config.stall))
+    
+    def checkpoint_state(self):
+        """
+        Returns the state of the simulation saved by `save_checkpoint`
+        
+        :return: (tuple) a dictionnary of the arrays and a dictionnary of the other values of the state
+        """
+        arrays = {name: getattr(self.plate, name) for name in ("b", "c", "d", "crystal", "i")}
+        if self.tiles is not None:
+            arrays.update(frontier=self.tiles.frontier, changed=self.tiles.changed, active=self.tiles.active)
+        return arrays, {"iteration": self.iteration, "max_point": self.max_point}
+    
+    def restore(self, arrays, values):
+        """
+        Replaces the state of the simulation by a state returned by `checkpoint_state`. The arrays are used as they are, not copied,
+        unless the plate is kept in files: they are then copied in the files by blocks of rows.
+        
+        :param arrays: (dict) the arrays of the state
+        :param values: (dict) the other values of the state
+        :return: None
+        """
+        if self.storage is None:
+            self.plate = Plate(*(arrays[name] for name in ("b", "c", "d", "crystal", "i")))
+        else:
+            for name in ("b", "c", "d", "crystal", "i"):
+                target = getattr(self.plate, name)
+                for y in range(0, target.shape[0], DIFFUSION_BLOCK):
+                    target[y:y + DIFFUSION_BLOCK] = arrays[name][y:y + DIFFUSION_BLOCK]
+        if self.tiles is not None:
+            self.tiles.frontier, self.tiles.changed, self.tiles.active = arrays["frontier"], arrays["changed"], arrays["active"]
+        self.iteration, self.max_point = values["iteration"], values["max_point"]
+    
+    def close(self):
+        """
+        Releases the resources held by the simulation: removes the files of the plate if it is kept in files.
+        The plate can still be read, the system frees its files when the plate is no longer used.
+        """
+        if self.storage is not None:
+            shutil.rmtree(self.storage, ignore_errors=True)
+            self.storage = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def offset_to_axial(y, x):
+    """
+    Returns the axial coordinates (q, r) of the cells at the coordinates (y, x) of the plate
+    (the odd lines being shifted by half a cell to the right). In axial coordinates, the six neighbours
+    of a cell are at (q ± 1, r), (q, r ± 1), (q + 1, r - 1) and (q - 1, r + 1).
+    
+    :param y, x: (int or numpy.ndarray of int) the coordinates of the cells
+    :return: (tuple) (q, r)
+    
+    Exemple:
+    
+    >>> [offset_to_axial(y, x) for (y, x) in get_neighbours((3, 3), (7, 7))]
+    [(1, 3), (2, 2), (3, 2), (3, 3), (2, 4), (1, 4)]
+    """
+    return (x - (y - (y & 1)) // 2, y)
+
+def axial_to_offset(q, r):
+    """
+    Returns the coordinates (y, x) of the cells at the axial coordinates (q, r), see `offset_to_axial`
+    
+    :param q, r: (int or numpy.ndarray of int) the axial coordinates of the cells
+    :return: (tuple) (y, x)
+    
+    Exemple:
+    
+    >>> axial_to_offset(*offset_to_axial(5, 2))
+    (5, 2)
+    """
+    return (r, q + (r - (r & 1)) // 2)
+
+def hex_distance(y, x, init_pos):
+    """
+    Returns the number of steps from neighbour to neighbour between the cells (y, x) and `init_pos`
+    
+    :param y, x: (int or numpy.ndarray of int) the coordinates of the cells
+    :param init_pos: (tuple) the coordinates of the other cell
+    :return: (int or numpy.ndarray of int) the distances
+    
+    Exemple:
+    
+    >>> [hex_distance(y, x, (3, 3)) for (y, x) in [(3, 3), (2, 3), (0, 3), (3, 0), (0, 0)]]
+    [0, 1, 3, 3, 5]
+    """
+    q, r = offset_to_axial(y, x)
+    q0, r0 = offset_to_axial(init_pos[0], init_pos[1])
+    dq, dr = q - q0, r - r0
+    return (abs(dq) + abs(dr) + abs(dq + dr)) // 2
+
+# The geometry of the twelfth of a plate simulated by a `SymmetricSimulation`
+# - cells: (numpy.ndarray of int64) the numbers (y * columns + x) in the plate of the representative cells, sorted by distance
+# - distance: (numpy.ndarray of int64) the distance from each representative cell to the first crystal cell
+# - neighbours: (numpy.ndarray of int32) array of shape (n, 6), the index of the representative of each neighbour
+#   of each representative cell, in the order of `NEIGHBOUR_OFFSETS`, n for the neighbours outside of the hexagon
+# - members: (numpy.ndarray of int64) array of shape (n, 12), the numbers in the plate of the cells which are
+#   images of each representative cell by the symmetries of the hexagon, -1 to complete the rows
+# - max_point: (numpy.ndarray of int64) the greatest distance `max_point` between the cells of each orbit and the first crystal cell
+# - radius: (int) the radius of the hexagon which is simulated
+WedgeGeometry = namedtuple("WedgeGeometry", ["cells", "distance", "neighbours", "members", "max_point", "radius"])
+
+@lru_cache(maxsize=4)
+def wedge_geometry(dim, init_pos, cache_directory=None):
+    """
+    Returns the geometry (see `WedgeGeometry`) of the simulation of the largest hexagon centred on `init_pos` whose cells
+    and their neighbours are all inside of the plate. The twelve symmetries of the hexagon (six rotations and six reflections)
+    group its cells in orbits, and the representative of each orbit is the cell of the orbit with the smallest number.
+    
+    :param dim: (tuple) couple of positives integers (row, column), the dimension of the plate
+    :param init_pos: (tuple) the coordinates of the first crystal cell, the centre of the symmetries
+    :param cache_directory: (str) [DEFAULT: None] the folder of the table of the neighbours, see `neighbour_table`
+    :return: (WedgeGeometry) the geometry
+    
+    Exemple:
+    
+    >>> geometry = wedge_geometry((21, 21), (10, 10))
+    >>> geometry.radius, len(geometry.cells), int((geometry.members >= 0).sum())
+    (9, 30, 271)
+    >>> geometry.neighbours[0].tolist()
+    [1, 1, 1, 1, 1, 1]
+    """
+    # The cells just outside of the plate give the radius of the hexagon
+    rows, columns = np.arange(-1, dim[0] + 1), np.arange(-1, dim[1] + 1)
+    outside = np.concatenate([hex_distance(np.full(columns.shape, -1), columns, init_pos),
+                              hex_distance(np.full(columns.shape, dim[0]), columns, init_pos),
+                              hex_distance(rows, np.full(rows.shape, -1), init_pos),
+                              hex_distance(rows, np.full(rows.shape, dim[1]), init_pos)])
+    radius = int(outside.min()) - 2
+    if radius < 1:
+        raise ValueError("The first crystal cell is too close to the edge of the plate")
+    
+    y, x = np.divmod(np.arange(dim[0] * dim[1], dtype=np.int64), dim[1])
+    inside = hex_distance(y, x, init_pos) <= radius
+    y, x = y[inside], x[inside]
+    
+    # The images of every cell of the hexagon by the twelve symmetries, in cube coordinates around init_pos
+    q0, r0 = offset_to_axial(init_pos[0], init_pos[1])
+    q, r = offset_to_axial(y, x)
+    q, r = q - q0, r - r0
+    cube = (q, r, -q - r)
+    images = []
+    for reflection in (False, True):
+        a, b, c = (cube[0], cube[2], cube[1]) if reflection else cube
+        for rotation in range(6):
+            image_y, image_x = axial_to_offset(a + q0, b + r0)
+            images.append(image_y * dim[1] + image_x)
+            a, b, c = -b, -c, -a # Rotation of 60 degrees
+    images = np.stack(images, axis=1)
+    
+    representative = images.min(axis=1)
+    cells, orbit = np.unique(representative, return_inverse=True)
+    distance = hex_distance(cells // dim[1], cells % dim[1], init_pos)
+    order = np.lexsort((cells, distance))
+    cells, distance = cells[order], distance[order]
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    orbit = rank[orbit.ravel()]
+    
+    members = np.full((len(cells), 12), -1, dtype=np.int64)
+    flat = y * dim[1] + x
+    sort = np.argsort(orbit, kind="stable")
+    starts = np.searchsorted(orbit[sort], np.arange(len(cells)))
+    members[orbit[sort], np.arange(len(sort)) - starts[orbit[sort]]] = flat[sort]
+    
+    index = np.full(dim[0] * dim[1] + 1, len(cells), dtype=np.int32) # The last one is for the cells outside of the plate
+    index[flat] = orbit
+    neighbours = index[plate_neighbours(cells, dim, cache_directory)]
+    
+    chebyshev = np.maximum(np.abs(members // dim[1] - init_pos[0]), np.abs(members % dim[1] - init_pos[1]))
+    max_point = np.where(members >= 0, chebyshev, 0).max(axis=1)
+    return WedgeGeometry(cells, distance, neighbours, members, max_point, radius)
+
+
+class SymmetricSimulation(Simulation):
+    """
+    A simulation which only stores and updates one cell of each orbit of the twelve symmetries of the hexagon
+    around `init_pos` (see `wedge_geometry`), which is about a twelfth of the plate. Without interference the
+    dynamics are symmetric, so the other cells are copies of their representative, and the neighbours of a
+    representative which are in another part of the hexagon are read from their own representative.
+    Only the largest hexagon around `init_pos` which fits in the plate is simulated, the steam of the cells
+    outside of it stays at rho and the simulation stops when the crystal reaches its edge (see `finished`).
+    The snowflake is the one of `Simulation` as long as the steam of the cells near the edge of the hexagon did not change,
+    it differs afterwards as the steam of the rest of the plate is not calculated.
+    The approximation is not used: its square window has not the symmetries of the hexagon, so it must be 0.
+    The phases must be synchronous as well (see `boundary_rules`), the cells updated one after the other row by row are not symmetric.
+    
+    The full plate is only rebuilt when the `plate` attribute is read, for instance to save the pictures.
+    
+    :Attributes:
+        - geometry: (WedgeGeometry) the geometry of the simulated cells
+        - b, c, d, crystal, i: (numpy.ndarray) the properties of the representative cells, with one more cell at the end
+          which stands for the cells outside of the hexagon
+        - radius: (int) the greatest distance from a crystal cell to the first one
+    
+    Exemple:
+    
+    >>> config = SimulationConfig(dimension=(41, 41), number=15, beta=0.9, approximation=0, synchronous=True)
+    >>> symmetric, full = SymmetricSimulation(config), Simulation(config)
+    >>> symmetric.run(); full.run()
+    >>> bool((symmetric.plate.crystal == full.plate.crystal).all()), symmetric.max_point == full.max_point
+    (True, True)
+    >>> float(np.abs(symmetric.plate.d - full.plate.d).max()) < 1e-12
+    True
+    >>> SymmetricSimulation(config, approximation=10)
+    Traceback (most recent call last):
+    ...
+    ValueError: The symmetric simulation needs an approximation of 0, the square window of the approximation is not symmetric
+    >>> SymmetricSimulation(config, synchronous=False)
+    Traceback (most recent call last):
+    ...
+    ValueError: The symmetric simulation needs the synchronous phases, the cells updated one after the other are not symmetric
+    """
+    
+    def __init__(self, config=None, **parameters):
+        if config is None:
+            config = SimulationConfig(**parameters)
+        elif parameters:
+            config = replace(config, **parameters)
+        if config.sigma:
+            raise ValueError("The symmetric simulation needs a sigma of 0, the interference is not symmetric")
+        if config.approximation:
+            raise ValueError("The symmetric simulation needs an approximation of 0, the square window of the approximation is not symmetric")
+        if not config.synchronous:
+            raise ValueError("The symmetric simulation needs the synchronous phases, the cells updated one after the other are not symmetric")
+        if config.tile_size:
+            raise ValueError("The symmetric simulation does not use the tiles")
+        if config.storage is not None:
+            raise ValueError("The symmetric simulation does not keep its plate in files, it only stores a twelfth of it")
+        self.config = config
+        self.init_pos = config.initial_position
+        self.geometry = wedge_geometry(config.dimension, self.init_pos, config.cache_directory)
+        size = len(self.geometry.cells) + 1
+        self.b = np.zeros(size, dtype=config.precision)
+        self.c = np.zeros(size, dtype=config.precision)
+        self.d = np.full(size, config.rho, dtype=config.precision)
+        self.crystal = np.zeros(size, dtype=bool)
+        self.i = np.full(size, -1, dtype=np.int32)
+        # The first representative cell is init_pos
+        self.c[0], self.d[0], self.crystal[0], self.i[0] = 1, 0, True, 0
+        self.max_point = 0
+        self.radius = 0
+        self.iteration = 0
+        self.tiles = None
+    
+    @property
+    def plate(self):
+        """
+        (Plate) the whole plate rebuilt from the representative cells
+        """
+        plate = create_plate(dim=self.config.dimension, initial_position=self.init_pos, rho=self.config.rho, dtype=self.config.precision)
+        members = self.geometry.members
+        valid = members >= 0
+        cells = members[valid]
+        representative = np.nonzero(valid)[0]
+        for name in ("b", "c", "d", "crystal", "i"):
+            getattr(plate, name).ravel()[cells] = getattr(self, name)[representative]
+        return plate
+    
+    def step(self):
+        """
+        Runs one iteration of the simulation: diffusion, freezing, attachment and melting.
+        
+        :return: (numpy.ndarray) array of shape (n, 2) of the coordinates of the n cells of the plate which joined the crystal
+        """
+        config = self.config
+        geometry = self.geometry
+        timer = self.timer
+        if timer is not None:
+            timer.start()
+        
+        #DIFFUSION
+        size = len(geometry.cells)
+        neighbours = geometry.neighbours[:size]
+        centre = self.d[:size]
+        steam = self.d[neighbours]
+        in_crystal = self.crystal[neighbours]
+        total = centre.copy()
+        for k in range(6):
+            # If the neighbour is in the crystal, its steam is replaced by the cell's steam
+            total += np.where(in_crystal[:, k], centre, steam[:, k])
+        self.d[:size] = np.where(self.crystal[:size], centre, total / 7.0)
+        if timer is not None:
+            timer.lap("diffusion")
+        
+        # FREEZING, ATTACHMENT and MELTING of the cells at the border
+        size = int(np.searchsorted(geometry.distance, self.radius + 1, side="right"))
+        neighbours = geometry.neighbours[:size]
+        
+        def neighbour_steam(start, stop, total=None):
+            if total is None:
+                total = np.zeros(size, dtype=self.d.dtype)
+            for k in range(start, stop):
+                total += self.d[neighbours[:, k]]
+            return total
+        
+        attached = boundary_rules(self.b[:size], self.c[:size], self.d[:size], self.crystal[:size], self.i[:size],
+                                  self.crystal[neighbours].sum(axis=1), neighbour_steam, self.iteration,
+                                  kappa=config.kappa, alpha=config.alpha, beta=config.beta,
+                                  theta=config.theta, mu=config.mu, gamma=config.gamma, synchronous=True)
+        attached = np.nonzero(attached)[0]
+        if len(attached):
+            self.max_point = max(self.max_point, int(geometry.max_point[attached].max()))
+            self.radius = max(self.radius, int(geometry.distance[attached].max()))
+        if timer is not None:
+            timer.lap("boundary")
+        self.iteration += 1
+        cells = geometry.members[attached]
+        cells = cells[cells >= 0]
+        return np.stack(np.divmod(cells, config.dimension[1]), axis=1)
+    
+    def finished(self, idle):
+        """
+        Returns True if the simulation must stop (see `Simulation.finished`), or if the crystal reached the edge of the hexagon
+        """
+        return self.radius >= self.geometry.radius or Simulation.finished(self, idle)
+    
+    def checkpoint_state(self):
+        arrays = {name: getattr(self, name) for name in ("b", "c", "d", "crystal", "i")}
+        return arrays, {"iteration": self.iteration, "max_point": self.max_point, "radius": self.radius}
+    
+    def restore(self, arrays, values):
+        self.b, self.c, self.d, self.crystal, self.i = (arrays[name] for name in ("b", "c", "d", "crystal", "i"))
+        self.iteration, self.max_point, self.radius = values["iteration"], values["max_point"], values["radius"]
+
+
+class GrowingSimulation(Simulation):
+    """
+    A simulation which only stores a region of the plate around `init_pos`, made larger as the crystal grows.
+    The region always contains the cells on which the phases are calculated and their neighbours. The cells outside
+    of it would keep their steam rho and have no crystal, so they are added with these values when it grows.
+    The snowflake is then exactly the one of a `Simulation` of the whole plate, interference included,
+    while the first iterations are calculated on a small region. The region has an even number of rows above it, so its rows
+    have the same parity as the rows of the plate, and it never grows beyond the plate.
+    
+    :Attributes:
+        - region: (Plate) the cells of the region
+        - origin: (tuple) the coordinates in the plate of the first cell of the region
+        - plate: (Plate) the whole plate, rebuilt from the region when it is read
+    
+    Exemple:
+    
+    >>> config = SimulationConfig(dimension=(101, 101), number=40, beta=0.4, approximation=5)
+    >>> growing, full = GrowingSimulation(config), Simulation(config)
+    >>> growing.region.shape
+    (48, 47)
+    >>> growing.run(); full.run()
+    >>> growing.region.shape, all((getattr(growing.plate, name) == getattr(full.plate, name)).all() for name in ("b", "c", "d", "crystal", "i"))
+    ((101, 101), True)
+    >>> GrowingSimulation(config, approximation=0)
+    Traceback (most recent call last):
+    ...
+    ValueError: The growing simulation needs an approximation, the steam of the whole plate changes without it
+    >>> GrowingSimulation(config, storage=tempfile.gettempdir())
+    Traceback (most recent call last):
+    ...
+    ValueError: The growing simulation does not keep its plate in files
+    """
+    
+    def __init__(self, config=None, **parameters):
+        if config is None:
+            config = SimulationConfig(**parameters)
+        elif parameters:
+            config = replace(config, **parameters)
+        if config.tile_size:
+            raise ValueError("The growing simulation does not use the tiles")
+        if config.storage is not None:
+            raise ValueError("The growing simulation does not keep its plate in files")
+        if not config.approximation:
+            raise ValueError("The growing simulation needs an approximation, the steam of the whole plate changes without it")
+        self.config = config = seeded(config)
+        self.init_pos = config.initial_position
+        self.max_point = 0
+        self.iteration = 0
+        self.tiles = None
+        self.origin = self.init_pos
+        self.region = create_plate(dim=(1, 1), initial_position=(0, 0), rho=config.rho, dtype=config.precision)
+        self.grow()
+    
+    def needed_bounds(self):
+        """
+        Returns the bounds (y0, y1, x0, x1) of the cells of the plate which the region must contain for the next iteration:
+        the windows of the diffusion and of the boundary phase, and one more cell around them
+        """
+        dim, (iy, ix) = self.config.dimension, self.init_pos
+        distance = max(self.config.approximation, 2) + self.max_point + 2
+        return (max(0, iy - distance), min(dim[0], iy + distance + 1), max(0, ix - distance), min(dim[1], ix + distance + 1))
+    
+    def grow(self):
+        """
+        Makes the region larger if it does not contain the cells needed by the next iteration (see `needed_bounds`)
+        
+        :return: (bool) True if the region grew
+        """
+        dim = self.config.dimension
+        y0, y1, x0, x1 = self.needed_bounds()
+        oy, ox = self.origin
+        rows, columns = self.region.shape
+        if oy <= y0 and y1 <= oy + rows and ox <= x0 and x1 <= ox + columns:
+            return False
+        # The number of rows above the region stays even
+        ny0, ny1 = max(0, y0 - GROWTH_MARGIN) // 2 * 2, min(dim[0], y1 + GROWTH_MARGIN)
+        nx0, nx1 = max(0, x0 - GROWTH_MARGIN), min(dim[1], x1 + GROWTH_MARGIN)
+        ny0, ny1, nx0, nx1 = min(ny0, oy // 2 * 2), max(ny1, oy + rows), min(nx0, ox), max(nx1, ox + columns)
+        region = create_plate(dim=(ny1 - ny0, nx1 - nx0), initial_position=(self.init_pos[0] - ny0, self.init_pos[1] - nx0),
+                              rho=self.config.rho, dtype=self.config.precision)
+        for name in ("b", "c", "d", "crystal", "i"):
+            getattr(region, name)[oy - ny0:oy - ny0 + rows, ox - nx0:ox - nx0 + columns] = getattr(self.region, name)
+        self.region, self.origin = region, (ny0, nx0)
+        return True
+    
+    @property
+    def plate(self):
+        """
+        (Plate) the whole plate rebuilt from the region
+        """
+        plate = create_plate(dim=self.config.dimension, initial_position=self.init_pos, rho=self.config.rho, dtype=self.config.precision)
+        (oy, ox), (rows, columns) = self.origin, self.region.shape
+        for name in ("b", "c", "d", "crystal", "i"):
+            getattr(plate, name)[oy:oy + rows, ox:ox + columns] = getattr(self.region, name)
+        return plate
+    
+    def step(self):
+        """
+        Runs one iteration of the simulation: diffusion, freezing, attachment, melting and interference.
+        The region grows before the iteration if it has to.
+        
+        :return: (numpy.ndarray) array of shape (n, 2) of the coordinates in the plate of the n cells which joined the crystal
+        """
+        config = self.config
+        timer = self.timer
+        if timer is not None:
+            timer.start()
+        self.grow()
+        origin = np.array(self.origin)
+        init_pos = tuple(int(k) for k in np.array(self.init_pos) - origin)
+        
+        #DIFFUSION
+        diffusion(self.region, init_pos, self.max_point, approximation=config.approximation)
+        if timer is not None:
+            timer.lap("diffusion")
+        
+        # FREEZING, ATTACHMENT and MELTING of the cells at the border
+        self.max_point, attached = boundary_phase(self.region, init_pos, self.max_point, self.iteration,
+                                                  kappa=config.kappa, alpha=config.alpha, beta=config.beta,
+                                                  theta=config.theta, mu=config.mu, gamma=config.gamma,
+                                                  synchronous=config.synchronous)
+        if timer is not None:
+            timer.lap("boundary")
+        
+        # INTERFERENCE, the window is always in the region
+        if config.sigma:
+            y0, y1, x0, x1 = diffusion_window(self.init_pos, self.max_point, config.approximation, config.dimension)
+            (oy, ox) = self.origin
+            interference(self.region, config.sigma, config.seed, self.iteration, (y0 - oy, y1 - oy, x0 - ox, x1 - ox), self.origin)
+            if timer is not None:
+                timer.lap("interference")
+        self.iteration += 1
+        return attached + origin
+    
+    def checkpoint_state(self):
+        arrays = {name: getattr(self.region, name) for name in ("b", "c", "d", "crystal", "i")}
+        return arrays, {"iteration": self.iteration, "max_point": self.max_point, "origin": list(self.origin)}
+    
+    def restore(self, arrays, values):
+        self.region = Plate(*(arrays[name] for name in ("b", "c", "d", "crystal", "i")))
+        self.iteration, self.max_point, self.origin = values["iteration"], values["max_point"], tuple(values["origin"])
+
+
+class FarFieldSimulation(Simulation):
+    """
+    A simulation whose steam is calculated cell by cell near the crystal and on a coarse grid far from it.
+    Near the crystal, in the window of the approximation and a band of `config.far_band` cells around it (the fine region),
+    the diffusion is the one of `Simulation`. The rest of the plate is cut in blocks of `config.far_field` cells on each side,
+    which only keep their mean steam, and whose diffusion is the one of the mean of the hexagonal cells: a steam diffusing
+    by 3 / 14 per iteration along the rows and 2 / 7 across them. So the steam of the whole plate is calculated at the cost
+    of the window and of a plate `far_field` ** 2 times smaller, instead of staying at rho beyond the window.
+    
+    The fine region is made of whole blocks and grows with the crystal, its new cells take the mean steam of their block.
+    At the edge of the fine region, the cells outside of it take the steam of their block for the diffusion of the cells
+    inside of it, and the steam which enters the fine region is taken from these blocks, so the steam of the plate is kept
+    (`steam_change` is the change of the total steam made by the last diffusion, which is only the rounding of the
+    numbers while the fine region does not touch the edges of the plate, where the mean of the hexagons does not keep the steam).
+    
+    :Attributes:
+        - fine: (Plate) the plate, whose steam is only up to date in the fine region
+        - bounds: (tuple) the bounds (y0, y1, x0, x1) of the fine region
+        - coarse: (numpy.ndarray) the mean steam of each block, only up to date outside of the fine region
+        - steam_change: (float) the change of the total steam of the plate made by the diffusion of the last iteration
+        - plate: (Plate) the plate with the steam of the blocks outside of the fine region, made when it is read
+    
+    Exemple:
+    
+    >>> config = SimulationConfig(dimension=(121, 121), number=100, approximation=6)
+    >>> far, full = FarFieldSimulation(config, far_field=4, far_band=4), Simulation(config, approximation=0)
+    >>> far.run(); full.run()
+    >>> far.bounds, abs(far.steam_change) < 1e-9, bool(far.coarse.min() < config.rho)
+    ((36, 84, 36, 84), True, True)
+    >>> bool((far.plate.crystal == full.plate.crystal).all()), float(np.abs(far.plate.d - full.plate.d).max()) < 0.01
+    (True, True)
+    """
+    
+    # The diffusion of the mean of a cell and its six neighbours, along the rows and across them, in cells per iteration
+    DIFFUSION_X, DIFFUSION_Y = 3 / 14, 2 / 7
+    
+    def __init__(self, config=None, **parameters):
+        if config is None:
+            config = SimulationConfig(**parameters)
+        elif parameters:
+            config = replace(config, **parameters)
+        if config.tile_size:
+            raise ValueError("The far field simulation does not use the tiles")
+        if config.storage is not None:
+            raise ValueError("The far field simulation does not keep its plate in files")
+        if config.far_field < 2:
+            raise ValueError("The blocks of the far field must have at least 2 cells on each side")
+        self.config = config = seeded(config)
+        self.init_pos = config.initial_position
+        self.max_point = 0
+        self.iteration = 0
+        self.tiles = None
+        self.fine = create_plate(dim=config.dimension, initial_position=self.init_pos, rho=config.rho, dtype=config.precision)
+        size, (rows, columns) = config.far_field, config.dimension
+        self.heights = np.minimum(size, rows - np.arange(0, rows, size)).astype(config.precision)
+        self.widths = np.minimum(size, columns - np.arange(0, columns, size)).astype(config.precision)
+        self.coarse = np.full((len(self.heights), len(self.widths)), config.rho, dtype=config.precision)
+        self.bounds = (0, 0, 0, 0)
+        self.interface = None
+        self.steam_change = 0.0
+        self.grow()
+    
+    def grow(self):
+        """
+        Makes the fine region larger if it does not contain the window of the approximation and the band around it
+        
+        :return: (bool) True if the fine region grew
+        """
+        config, size = self.config, self.config.far_field
+        rows, columns = config.dimension
+        y0, y1, x0, x1 = diffusion_window(self.init_pos, self.max_point, config.approximation + config.far_band, config.dimension)
+        y0, y1 = y0 // size * size, min(rows, -(-y1 // size) * size)
+        x0, x1 = x0 // size * size, min(columns, -(-x1 // size) * size)
+        oy0, oy1, ox0, ox1 = self.bounds
+        y0, y1, x0, x1 = (y0, y1, x0, x1) if oy0 == oy1 else (min(y0, oy0), max(y1, oy1), min(x0, ox0), max(x1, ox1))
+        if (y0, y1, x0, x1) == self.bounds:
+            return False
+        # The new cells take the steam of their block, the cells which were in the fine region keep theirs
+        kept = self.fine.d[oy0:oy1, ox0:ox1].copy()
+        self.fine.d[y0:y1, x0:x1] = self.block_steam(y0, y1, x0, x1)
+        self.fine.d[oy0:oy1, ox0:ox1] = kept
+        self.fine.d[self.fine.crystal] = 0
+        self.bounds = (y0, y1, x0, x1)
+        self.interface = self.interface_cells()
+        return True
+    
+    def block_steam(self, y0, y1, x0, x1):
+        """
+        Returns the steam of the cells of the window y0 <= y < y1, x0 <= x < x1 taken from the mean steam of their blocks
+        """
+        size = self.config.far_field
+        blocks = self.coarse[y0 // size:-(-y1 // size), x0 // size:-(-x1 // size)]
+        steam = np.repeat(np.repeat(blocks, size, axis=0), size, axis=1)
+        return steam[y0 % size:y0 % size + y1 - y0, x0 % size:x0 % size + x1 - x0]
+    
+    def interface_cells(self):
+        """
+        Returns the couples of neighbours made of a cell at the edge of the fine region and a cell outside of it
+        
+        :return: (tuple) the numbers (y * columns + x) of the cells inside, the numbers of the cells outside
+            and the numbers (row * blocks per row + column) of the blocks of the cells outside
+        """
+        (rows, columns), size = self.config.dimension, self.config.far_field
+        y0, y1, x0, x1 = self.bounds
+        edge = np.zeros((rows, columns), dtype=bool)
+        edge[y0:y1, x0:x1] = True
+        edge[y0 + 1:y1 - 1, x0 + 1:x1 - 1] = False
+        y, x = np.nonzero(edge)
+        inside, outside = [], []
+        for parity in (0, 1):
+            on_rows = y % 2 == parity
+            for dy, dx in NEIGHBOUR_OFFSETS[parity]:
+                ny, nx = y[on_rows] + dy, x[on_rows] + dx
+                kept = (0 <= ny) & (ny < rows) & (0 <= nx) & (nx < columns) & ~((y0 <= ny) & (ny < y1) & (x0 <= nx) & (nx < x1))
+                inside.append(y[on_rows][kept] * columns + x[on_rows][kept])
+                outside.append(ny[kept] * columns + nx[kept])
+        inside, outside = np.concatenate(inside), np.concatenate(outside)
+        blocks = (outside // columns // size) * self.coarse.shape[1] + outside % columns // size
+        return inside, outside, blocks
+    
+    def total_steam(self):
+        """
+        Returns the total steam of the plate: the steam of the cells of the fine region and of the blocks outside of it
+        """
+        y0, y1, x0, x1 = self.bounds
+        size = self.config.far_field
+        area = self.heights[:, None] * self.widths[None, :]
+        outside = np.ones(self.coarse.shape, dtype=bool)
+        outside[y0 // size:-(-y1 // size), x0 // size:-(-x1 // size)] = False
+        return float(self.fine.d[y0:y1, x0:x1].sum(dtype=np.float64) + (self.coarse * area)[outside].sum(dtype=np.float64))
+    
+    def far_diffusion(self):
+        """
+        Runs the diffusion phase on the whole plate: on the cells of the fine region and on the blocks outside of it,
+        which give to the cells of the fine region the steam these cells take from them
+        
+        :return: None
+        """
+        plate, coarse, size = self.fine, self.coarse, self.config.far_field
+        y0, y1, x0, x1 = self.bounds
+        inside, outside, blocks = self.interface
+        
+        # The cells around the fine region take the steam of their block
+        plate.d.flat[outside] = coarse.flat[blocks]
+        counts = (1 + (cell_neighbours(inside, self.config.dimension) >= 0).sum(axis=1)).astype(plate.d.dtype)
+        entering = np.where(plate.crystal.flat[inside], 0, (plate.d.flat[outside] - plate.d.flat[inside]) / counts)
+        
+        # The steam exchanged between the blocks outside of the fine region, both calculated from the old steam
+        active = np.ones(coarse.shape, dtype=bool)
+        active[y0 // size:-(-y1 // size), x0 // size:-(-x1 // size)] = False
+        exchange = np.zeros_like(coarse)
+        heights, widths = self.heights, self.widths
+        flow = self.DIFFUSION_X * (coarse[:, 1:] - coarse[:, :-1]) * heights[:, None] / ((widths[:-1] + widths[1:]) / 2)
+        flow[~(active[:, 1:] & active[:, :-1])] = 0
+        exchange[:, :-1] += flow
+        exchange[:, 1:] -= flow
+        flow = self.DIFFUSION_Y * (coarse[1:] - coarse[:-1]) * widths[None, :] / ((heights[:-1] + heights[1:]) / 2)[:, None]
+        flow[~(active[1:] & active[:-1])] = 0
+        exchange[:-1] += flow
+        exchange[1:] -= flow
+        np.subtract.at(exchange.reshape(-1), blocks, entering)
+        
+        plate.d[y0:y1, x0:x1] = hex_diffusion(plate.d, plate.crystal, y0, y1, x0, x1)
+        coarse[active] += exchange[active] / (heights[:, None] * widths[None, :])[active]
+    
+    @property
+    def plate(self):
+        """
+        (Plate) the plate with the steam of the blocks outside of the fine region. Its other arrays are the ones of `fine`
+        """
+        (rows, columns), (y0, y1, x0, x1) = self.config.dimension, self.bounds
+        d = self.block_steam(0, rows, 0, columns).copy()
+        d[y0:y1, x0:x1] = self.fine.d[y0:y1, x0:x1]
+        return Plate(self.fine.b, self.fine.c, d, self.fine.crystal, self.fine.i)
+    
+    def step(self):
+        """
+        Runs one iteration of the simulation: diffusion, freezing, attachment, melting and interference.
+        The fine region grows before the iteration if it has to.
+        
+        :return: (numpy.ndarray) array of shape (n, 2) of the coordinates of the n cells which joined the crystal
+        """
+        config = self.config
+        timer = self.timer
+        if timer is not None:
+            timer.start()
+        self.grow()
+        
+        #DIFFUSION
+        before = self.total_steam()
+        self.far_diffusion()
+        self.steam_change = self.total_steam() - before
+        if timer is not None:
+            timer.lap("diffusion")
+        
+        # FREEZING, ATTACHMENT and MELTING of the cells at the border
+        self.max_point, attached = boundary_phase(self.fine, self.init_pos, self.max_point, self.iteration,
+                                                  kappa=config.kappa, alpha=config.alpha, beta=config.beta,
+                                                  theta=config.theta, mu=config.mu, gamma=config.gamma,
+                                                  synchronous=config.synchronous)
+        if timer is not None:
+            timer.lap("boundary")
+        
+        # INTERFERENCE on the window of the approximation, which is in the fine region
+        if config.sigma:
+            window = diffusion_window(self.init_pos, self.max_point, config.approximation, config.dimension)
+            interference(self.fine, config.sigma, config.seed, self.iteration, window)
+            if timer is not None:
+                timer.lap("interference")
+        self.iteration += 1
+        return attached
+    
+    def checkpoint_state(self):
+        arrays = {name: getattr(self.fine, name) for name in ("b", "c", "d", "crystal", "i")}
+        arrays["coarse"] = self.coarse
+        return arrays, {"iteration": self.iteration, "max_point": self.max_point, "bounds": list(self.bounds)}
+    
+    def restore(self, arrays, values):
+        self.fine = Plate(*(arrays[name] for name in ("b", "c", "d", "crystal", "i")))
+        self.coarse = arrays["coarse"]
+        self.iteration, self.max_point, self.bounds = values["iteration"], values["max_point"], tuple(values["bounds"])
+        self.interface = self.interface_cells()
+
+
+def shared_fields(config):
+    """
+    Returns the arrays of a plate shared between the processes of a `ParallelSimulation`
+    
+    :param config: (SimulationConfig) the parameters of the simulation
+    :return: (tuple) the (name, dtype) of each array
+    """
+    return (("b", config.precision), ("c", config.precision), ("d", config.precision), ("crystal", np.bool_), ("i", np.int32))
+
+def parallel_worker(names, dim, rows, config, control, worker, start, done, barrier):
+    """
+    The loop of a process of a `ParallelSimulation`. The process updates the rows `rows` of the shared plate, and reads
+    the rows of the other processes next to its strip (the halo) from the shared memory. The barriers make all the
+    processes read the state before the phase before any of them writes the state after the phase.
+    
+    :param names: (dict) the names of the shared memory blocks of the fields of the plate
+    :param dim: (tuple) the dimension of the plate
+    :param rows: (tuple) (r0, r1) the rows r0 <= y < r1 of the strip of the process
+    :param config: (SimulationConfig) the parameters of the simulation
+    :param control: (str) the name of the shared memory block of the control array (see `ParallelSimulation`)
+    :param worker: (int) the number of the process
+    :param start, done: (multiprocessing.Barrier) the barriers shared with the main process before and after a command
+    :param barrier: (multiprocessing.Barrier) the barrier shared by the processes which calculate the plate
+    :return: None
+    """
+    # The processes of the simulation share the resource tracker of the main process, which frees the blocks
+    blocks = {name: shared_memory.SharedMemory(name=block) for name, block in names.items()}
+    plate = Plate(**{name: np.ndarray(dim, dtype=dtype, buffer=blocks[name].buf) for name, dtype in shared_fields(config)})
+    control_block = shared_memory.SharedMemory(name=control)
+    state = np.ndarray((3 + barrier.parties,), dtype=np.int64, buffer=control_block.buf)
+    coefficients = dict(kappa=config.kappa, alpha=config.alpha, beta=config.beta,
+                        theta=config.theta, mu=config.mu, gamma=config.gamma, synchronous=config.synchronous)
+    init_pos = config.initial_position
+    r0, r1 = rows
+    try:
+        while True:
+            start.wait()
+            number = int(state[0])
+            if number < 0:
+                return
+            for _ in range(number):
+                iteration, max_point = int(state[1]), int(state[2])
+                
+                #DIFFUSION
+                y0, y1, x0, x1 = diffusion_window(init_pos, max_point, config.approximation, dim)
+                y0, y1 = max(y0, r0), min(y1, r1)
+                steam = hex_diffusion(plate.d, plate.crystal, y0, y1, x0, x1) if y0 < y1 else None
+                barrier.wait()
+                if steam is not None:
+                    plate.d[y0:y1, x0:x1] = steam
+                barrier.wait()
+                
+                # FREEZING, ATTACHMENT and MELTING of the cells at the border
+                y0, y1, x0, x1 = boundary_window(init_pos, max_point, dim)
+                y0, y1 = max(y0, r0), min(y1, r1)
+                
+                def neighbour_steam(start, stop, total=None):
+                    barrier.wait() # The steam of all the cells at the border is written
+                    if y0 < y1:
+                        total = hex_neighbour_sum(plate.d, y0, y1, x0, x1, start, stop, total)
+                    barrier.wait() # All the sums are made before the steam changes again
+                    return total
+                
+                if y0 < y1:
+                    window = (slice(y0, y1), slice(x0, x1))
+                    crystal_neighbours = hex_neighbour_sum(plate.crystal.view(np.uint8), y0, y1, x0, x1)
+                    attached = boundary_rules(plate.b[window], plate.c[window], plate.d[window], plate.crystal[window],
+                                              plate.i[window], crystal_neighbours, neighbour_steam, iteration, **coefficients)
+                    attached = np.argwhere(attached) + (y0, x0)
+                    local = int(np.abs(attached - init_pos).max()) if len(attached) else 0
+                else:
+                    # The other processes wait for the sums of this one
+                    for _ in range(1 if config.synchronous else 2):
+                        neighbour_steam(0, 6)
+                    local = 0
+                state[3 + worker] = local
+                barrier.wait()
+                new_max_point = max(max_point, int(state[3:].max()))
+                barrier.wait() # Everyone has read the distances before the next iteration
+                if worker == 0:
+                    state[1], state[2] = iteration + 1, new_max_point
+                
+                # INTERFERENCE on the rows of the process, whose random numbers do not depend on the strip
+                if config.sigma:
+                    y0, y1, x0, x1 = diffusion_window(init_pos, new_max_point, config.approximation, dim)
+                    interference(plate, config.sigma, config.seed, iteration, (max(y0, r0), min(y1, r1), x0, x1))
+                barrier.wait()
+            done.wait()
+    except BaseException:
+        # The other processes and the main process must not wait for this one forever
+        for shared_barrier in (start, done, barrier):
+            shared_barrier.abort()
+        raise
+    finally:
+        for block in list(blocks.values()) + [control_block]:
+            block.close()
+
+
+class ParallelSimulation(Simulation):
+    """
+    A simulation whose plate lives in shared memory and is split in horizontal strips, one per process.
+    Each process calculates the phases on its strip and reads the rows next to it from the strips of the other processes.
+    The cells are calculated with the same operations as in `Simulation`, so the results are the same bit for bit.
+    The simulation must be closed (`close` or a `with` block) to stop the processes and free the shared memory.
+    
+    :Attributes:
+        - workers: (int) the number of processes
+        - plate: (Plate) the plate, whose arrays are in the shared memory
+    
+    Exemple:
+    
+    >>> config = SimulationConfig(dimension=(61, 61), number=30, alpha=0.4, beta=0.5, theta=0.05, approximation=10, sigma=0.01)
+    >>> with ParallelSimulation(config, workers=3) as parallel:
+    ...     parallel.run()
+    ...     serial = Simulation(parallel.config) # With the seed drawn by the parallel simulation
+    ...     serial.run()
+    ...     all((getattr(parallel.plate, name) == getattr(serial.plate, name)).all() for name in ("b", "c", "d", "crystal", "i"))
+    True
+    """
+    
+    def __init__(self, config=None, **parameters):
+        if config is None:
+            config = SimulationConfig(**parameters)
+        elif parameters:
+            config = replace(config, **parameters)
+        if config.tile_size:
+            raise ValueError("The parallel simulation does not use the tiles")
+        if config.storage is not None:
+            raise ValueError("The parallel simulation does not keep its plate in files, it shares it in memory between the processes")
+        self.config = config = seeded(config)
+        self.init_pos = config.initial_position
+        self.tiles = None
+        self.workers = max(1, min(config.workers, config.dimension[0]))
+        dim = config.dimension
+        
+        initial = create_plate(dim=dim, initial_position=self.init_pos, rho=config.rho, dtype=config.precision)
+        self.blocks = {}
+        fields = {}
+        for name, dtype in shared_fields(config):
+            self.blocks[name] = shared_memory.SharedMemory(create=True, size=max(1, dim[0] * dim[1] * np.dtype(dtype).itemsize))
+            fields[name] = np.ndarray(dim, dtype=dtype, buffer=self.blocks[name].buf)
+            fields[name][...] = getattr(initial, name)
+        self.plate = Plate(**fields)
+        # The control array: [command, iteration, max_point, distance found by each process...]
+        self.control = shared_memory.SharedMemory(create=True, size=8 * (3 + self.workers))
+        self.state = np.ndarray((3 + self.workers,), dtype=np.int64, buffer=self.control.buf)
+        self.state[...] = 0
+        
+        context = multiprocessing.get_context()
+        self.start = context.Barrier(self.workers + 1)
+        self.done = context.Barrier(self.workers + 1)
+        # Kept here, as the processes do not keep their arguments alive once started
+        self.barrier = context.Barrier(self.workers)
+        names = {name: block.name for name, block in self.blocks.items()}
+        bounds = np.linspace(0, dim[0], self.workers + 1).astype(int)
+        self.processes = [context.Process(target=parallel_worker, daemon=True,
+                                          args=(names, dim, (bounds[k], bounds[k + 1]), config, self.control.name,
+                                                k, self.start, self.done, self.barrier))
+                          for k in range(self.workers)]
+        for process in self.processes:
+            process.start()
+    
+    @property
+    def iteration(self):
+        return int(self.state[1])
+    
+    @property
+    def max_point(self):
+        return int(self.state[2])
+    
+    def advance(self, number):
+        """
+        Makes the processes run `number` iterations
+        
+        :param number: (int) the number of iterations
+        :return: None
+        """
+        if self.processes is None:
+            raise ValueError("The simulation is closed")
+        self.state[0] = number
+        try:
+            self.start.wait()
+            self.done.wait()
+        except threading.BrokenBarrierError:
+            raise RuntimeError("A process of the parallel simulation failed")
+    
+    def step(self):
+        """
+        Runs one iteration of the simulation: diffusion, freezing, attachment, melting and interference.
+        
+        :return: (numpy.ndarray) array of shape (n, 2) of the coordinates of the n cells which joined the crystal
+        """
+        iteration = self.iteration
+        self.advance(1)
+        y0, y1, x0, x1 = boundary_window(self.init_pos, self.max_point, self.config.dimension)
+        attached = np.argwhere(self.plate.i[y0:y1, x0:x1] == iteration) + (y0, x0)
+        if iteration == 0:
+            # The first crystal cell is in the crystal from the iteration 0 as well
+            attached = attached[(attached != self.init_pos).any(axis=1)]
+        return attached
+    
+    def run(self, number=None, callback=None):
+        """
+        Runs the simulation until `number` iterations have been done
+        
+        :param number: (int) [DEFAULT: config.number] the total number of iterations
+        :param callback: (function) [DEFAULT: None] function called with the simulation after each iteration
+        :return: None
+        """
+        if number is None:
+            number = self.config.number
+        if callback is not None or self.config.target_radius or self.config.stall:
+            return Simulation.run(self, number, callback)
+        if number > self.iteration:
+            self.advance(number - self.iteration)
+    
+    def restore(self, arrays, values):
+        # The arrays are copied in the shared memory
+        for name, _ in shared_fields(self.config):
+            getattr(self.plate, name)[...] = arrays[name]
+        self.state[1], self.state[2] = values["iteration"], values["max_point"]
+    
+    def close(self):
+        """
+        Stops the processes and frees the shared memory
+        """
+        if self.processes is None:
+            return
+        self.state[0] = -1
+        try:
+            self.start.wait()
+        except threading.BrokenBarrierError:
+            pass
+        for process in self.processes:
+            process.join()
+        self.processes = None
+        # The arrays are copied out of the shared memory, so the plate can still be read
+        self.plate = self.plate.copy()
+        self.state = self.state.copy()
+        for block in list(self.blocks.values()) + [self.control]:
+            block.close()
+            block.unlink()
+
+# The parameters which can differ between the simulations of a batch
+BATCH_PARAMETERS = ("alpha", "beta", "theta", "gamma", "mu", "kappa", "rho")
+
+# The final state of one simulation of a sweep. `i` is the window of `plate.i` which can contain the crystal,
+# whose first cell is at `origin` on the plate. `morphology` is the time series of the shape of the crystal
+# (see `MorphologyTracker.series`) if `config.morphology` is given, None otherwise
+SweepResult = namedtuple("SweepResult", ["config", "iteration", "max_point", "size", "origin", "i", "morphology"], defaults=(None,))
+
+class BatchSimulation(Simulation):
+    """
+    Simulations which only differ by the parameters of `BATCH_PARAMETERS`, advanced together.
+    The plates are stacked along a first axis, so the phases are calculated on all of them by the same operations,
+    which give the same results as `Simulation` for each one.
+    
+    :Attributes:
+        - configs: (list of SimulationConfig) the parameters of each simulation
+        - config: (SimulationConfig) the parameters of the first simulation
+        - plate: (Plate) the plates, whose arrays have the shape (len(configs), rows, columns)
+        - max_point: (numpy.ndarray of int) the `max_point` of each simulation
+    
+    Exemple:
+    
+    >>> configs = [SimulationConfig(dimension=(41, 41), number=20, beta=beta, approximation=10) for beta in (0.3, 0.9)]
+    >>> batch = BatchSimulation(configs)
+    >>> batch.run()
+    >>> [result.max_point for result in batch.results()], [result.size for result in batch.results()]
+    ([20, 0], [1261, 1])
+    >>> serial = Simulation(configs[0])
+    >>> serial.run()
+    >>> bool((batch.plate.d[0] == serial.plate.d).all())
+    True
+    """
+    
+    def __init__(self, configs):
+        """
+        :param configs: (list of SimulationConfig) the parameters of the simulations, which can only differ by `BATCH_PARAMETERS`
+        """
+        self.configs = list(configs)
+        self.config = self.configs[0]
+        if batch_key(self.config) is None or any(batch_key(config) != batch_key(self.config) for config in self.configs):
+            raise ValueError("The simulations of a batch can only differ by {}, and need the same seed if they have a sigma".format(", ".join(BATCH_PARAMETERS)))
+        self.init_pos = self.config.initial_position
+        plates = [create_plate(dim=self.config.dimension, initial_position=self.init_pos, rho=config.rho, dtype=config.precision)
+                  for config in self.configs]
+        self.plate = Plate(*(np.stack([getattr(plate, name) for plate in plates]) for name in ("b", "c", "d", "crystal", "i")))
+        self.max_point = np.zeros(len(self.configs), dtype=np.int64)
+        self.iteration = 0
+        self.tiles = None
+        # The coefficients, with one value per plate
+        self.coefficients = {name: np.array([getattr(config, name) for config in self.configs], dtype=self.config.precision).reshape(-1, 1, 1)
+                             for name in ("kappa", "alpha", "beta", "theta", "mu", "gamma")}
+    
+    def step(self):
+        """
+        Runs one iteration of all the simulations: diffusion, freezing, attachment, melting and interference.
+        
+        :return: (numpy.ndarray of bool) mask of shape (len(configs), rows, columns) of the cells which joined the crystal
+        """
+        plate, dim = self.plate, self.config.dimension
+        
+        # DIFFUSION on the window of the largest crystal, but each plate only keeps the cells of its own window
+        windows = [diffusion_window(self.init_pos, int(max_point), self.config.approximation, dim) for max_point in self.max_point]
+        y0, y1, x0, x1 = diffusion_window(self.init_pos, int(self.max_point.max()), self.config.approximation, dim)
+        steam = hex_diffusion(plate.d, plate.crystal, y0, y1, x0, x1)
+        for k, (wy0, wy1, wx0, wx1) in enumerate(windows):
+            plate.d[k, wy0:wy1, wx0:wx1] = steam[k, wy0 - y0:wy1 - y0, wx0 - x0:wx1 - x0]
+        
+        # FREEZING, ATTACHMENT and MELTING of the cells at the border
+        y0, y1, x0, x1 = boundary_window(self.init_pos, int(self.max_point.max()), dim)
+        attached = boundary_kernel(plate.b, plate.c, plate.d, plate.crystal, plate.i, y0, y1, x0, x1, self.iteration,
+                                   synchronous=self.config.synchronous, **self.coefficients)
+        distance = np.maximum(np.abs(np.arange(y0, y1) - self.init_pos[0])[:, None],
+                              np.abs(np.arange(x0, x1) - self.init_pos[1])[None, :])
+        self.max_point = np.maximum(self.max_point, np.where(attached, distance, 0).max(axis=(1, 2)))
+        
+        # INTERFERENCE, the random numbers are the same for all the plates, each one keeps the cells of its own window
+        config = self.config
+        if config.sigma:
+            ny0, ny1, nx0, nx1 = diffusion_window(self.init_pos, int(self.max_point.max()), config.approximation, dim)
+            factor = 1 + (interference_noise(config.seed, self.iteration, ny0, ny1, nx0, nx1) - 0.5) * config.sigma
+            for k, max_point in enumerate(self.max_point):
+                wy0, wy1, wx0, wx1 = diffusion_window(self.init_pos, int(max_point), config.approximation, dim)
+                steam = plate.d[k, wy0:wy1, wx0:wx1]
+                np.multiply(steam, factor[wy0 - ny0:wy1 - ny0, wx0 - nx0:wx1 - nx0], out=steam, where=~plate.crystal[k, wy0:wy1, wx0:wx1])
+        self.iteration += 1
+        
+        mask = np.zeros(plate.shape, dtype=bool)
+        mask[:, y0:y1, x0:x1] = attached
+        return mask
+    
+    def finished(self, idle):
+        # The simulations of a batch all run `config.number` iterations
+        return False
+    
+    def checkpoint_state(self):
+        arrays, values = Simulation.checkpoint_state(self)
+        arrays["max_point"] = self.max_point
+        del values["max_point"]
+        return arrays, values
+    
+    def restore(self, arrays, values):
+        Simulation.restore(self, arrays, dict(values, max_point=arrays["max_point"]))
+    
+    def results(self):
+        """
+        Returns the final state of each simulation
+        
+        :return: (list of SweepResult) one result per simulation, in the order of `configs`
+        """
+        return [sweep_result(config, self.iteration, int(self.max_point[k]), self.plate.crystal[k], self.plate.i[k])
+                for k, config in enumerate(self.configs)]
+
+def sweep_result(config, iteration, max_point, crystal, i):
+    """
+    Returns the final state of a simulation, keeping only the part of the plate which can contain the crystal
+    
+    :param config: (SimulationConfig) the parameters of the simulation
+    :param iteration: (int) the number of iterations done
+    :param max_point: (int) the distance between the furthest point from the initial_position and the first cell
+    :param crystal: (numpy.ndarray of bool) the crystal mask of the plate
+    :param i: (numpy.ndarray of int) the iteration at which each cell joined the crystal
+    :return: (SweepResult) the result
+    """
+    y0, y1, x0, x1 = boundary_window(config.initial_position, max_point - 1, config.dimension)
+    return SweepResult(config, iteration, max_point, int(crystal.sum()), (y0, x0), i[y0:y1, x0:x1].copy())
+
+def batch_key(config):
+    """
+    Returns the parameters of a simulation which must be the same for all the simulations of a batch
+    
+    :param config: (SimulationConfig) the parameters of a simulation
+    :return: (tuple) the parameters, None if the simulation can not be part of a batch: an interference without a seed,
+        or an option which `BatchSimulation` does not have (another kind of simulation, the tiles, the files or the stop conditions)
+    
+    Exemple:
+    
+    >>> batch_key(SimulationConfig(beta=0.4)) == batch_key(SimulationConfig(beta=0.6))
+    True
+    >>> [batch_key(SimulationConfig(**option)) for option in ({"tile_size": 32}, {"growing": True}, {"stall": 10})]
+    [None, None, None]
+    """
+    if (config.sigma and config.seed is None) or config.far_field or config.tile_size or config.growing or config.symmetric:
+        return None
+    if config.storage is not None or config.target_radius or config.stall:
+        return None
+    return (config.number, config.dimension, config.initial_position, config.approximation, config.precision,
+            config.synchronous, config.sigma, config.seed if config.sigma else None)
+
+def parameter_grid(**values):
+    """
+    Returns all the combinations of the values of the parameters
+    
+    :param values: the lists of values of parameters of `SimulationConfig`
+    :return: (list of dict) the combinations, the last parameter changing first
+    
+    Exemple:
+    
+    >>> parameter_grid(alpha=[0.3, 0.4], beta=[0.5])
+    [{'alpha': 0.3, 'beta': 0.5}, {'alpha': 0.4, 'beta': 0.5}]
+    """
+    names = list(values)
+    return [dict(zip(names, combination)) for combination in product(*(values[name] for name in names))]
+
+def run_batch(configs):
+    """
+    Runs simulations together (see `BatchSimulation`) and returns their final states
+    
+    :param configs: (list of SimulationConfig) the parameters of the simulations
+    :return: (list of SweepResult) the final state of each simulation
+    """
+    if len(configs) == 1 and batch_key(configs[0]) is None:
+        simulation = make_simulation(configs[0])
+        if configs[0].morphology:
+            simulation.morphology = MorphologyTracker(configs[0].dimension, simulation.init_pos, interval=configs[0].morphology,
+                                                      cache_directory=configs[0].cache_directory)
+        simulation.run()
+        plate = simulation.plate
+        result = sweep_result(configs[0], simulation.iteration, simulation.max_point, plate.crystal, plate.i)
+        if simulation.morphology is not None:
+            result = result._replace(morphology=simulation.morphology.final(simulation.iteration))
+        simulation.close()
+        return [result]
+    batch = BatchSimulation(configs)
+    trackers = [MorphologyTracker(config.dimension, batch.init_pos, interval=config.morphology, cache_directory=config.cache_directory)
+                if config.morphology else None for config in configs]
+    while batch.iteration < batch.config.number:
+        # The cells which join the crystals are in the window of the border of the largest one
+        y0, y1, x0, x1 = boundary_window(batch.init_pos, int(batch.max_point.max()), batch.config.dimension)
+        attached = batch.step()
+        for k, tracker in enumerate(trackers):
+            if tracker is not None:
+                tracker.update(np.argwhere(attached[k, y0:y1, x0:x1]) + (y0, x0), batch.iteration)
+    return [result if tracker is None else result._replace(morphology=tracker.final(batch.iteration))
+            for result, tracker in zip(batch.results(), trackers)]
+
+def sweep(grid, config=None, batch_size=BATCH_SIZE, workers=1):
+    """
+    Runs one simulation for each combination of parameters of `grid`.
+    The simulations which only differ by `BATCH_PARAMETERS` are advanced together by batches of `batch_size`,
+    and the batches are shared between `workers` processes.
+    
+    :param grid: (list of dict) the parameters of `SimulationConfig` which change from a simulation to the other (see `parameter_grid`)
+    :param config: (SimulationConfig) [DEFAULT: the default configuration] the other parameters. Without a seed,
+        one is drawn for all the simulations, so they have the same interference
+    :param batch_size: (int) [DEFAULT: BATCH_SIZE] the largest number of simulations advanced together
+    :param workers: (int) [DEFAULT: 1] the number of processes
+    :return: (list of SweepResult) the final state of each simulation, in the order of `grid`
+    
+    Exemple:
+    
+    >>> grid = parameter_grid(beta=[0.3, 0.9], approximation=[5, 10])
+    >>> results = sweep(grid, SimulationConfig(dimension=(31, 31), number=10), batch_size=4, workers=2)
+    >>> [(result.config.beta, result.config.approximation, result.max_point) for result in results]
+    [(0.3, 5, 10), (0.3, 10, 10), (0.9, 5, 0), (0.9, 10, 0)]
+    >>> results = sweep(parameter_grid(beta=[0.3, 0.9]), SimulationConfig(dimension=(31, 31), number=10, morphology=5))
+    >>> [result.morphology[["iteration", "area", "tips"]].tolist() for result in results]
+    [[(5, 91, 6), (10, 331, 6)], [(5, 1, 1), (10, 1, 1)]]
+    """
+    if config is None:
+        config = SimulationConfig()
+    if config.seed is None:
+        config = replace(config, seed=np.random.SeedSequence().entropy)
+    configs = [replace(config, **parameters) for parameters in grid]
+    
+    # The simulations are grouped by batch, the ones which can not be part of a batch (see `batch_key`) are run alone
+    groups = {}
+    for n, simulation_config in enumerate(configs):
+        key = batch_key(simulation_config)
+        groups.setdefault(("alone", n) if key is None else key, []).append(n)
+    batches = [indices[k:k + batch_size] for indices in groups.values() for k in range(0, len(indices), batch_size)]
+    
+    if workers > 1 and len(batches) > 1:
+        with multiprocessing.get_context().Pool(min(workers, len(batches))) as pool:
+            outputs = pool.map(run_batch, [[configs[n] for n in batch] for batch in batches], chunksize=1)
+    else:
+        outputs = [run_batch([configs[n] for n in batch]) for batch in batches]
+    
+    results = [None] * len(configs)
+    for batch, output in zip(batches, outputs):
+        for n, result in zip(batch, output):
+            results[n] = result
+    return results
+
+def compare_precisions(config):
+    """
+    Runs a simulation in float64 and in float32 with the same parameters, and returns their differences
+    
+    :param config: (SimulationConfig) the parameters of the simulation, whose precision is not used
+    :return: (dict) the number of cells in the crystal for each precision ("crystal64", "crystal32"), the number of cells
+        in only one of the crystals ("crystal_differences"), the number of cells which joined the crystal at another iteration
+        ("i_differences"), the largest difference of steam ("steam_difference"), the `max_point` ("max_point64", "max_point32")
+        and the time taken by each simulation in seconds ("seconds64", "seconds32")
+    
+    Exemple:
+    
+    >>> report = compare_precisions(SimulationConfig(dimension=(41, 41), number=20, beta=0.4, approximation=10))
+    >>> report["crystal_differences"], report["i_differences"], report["steam_difference"] < 1e-5
+    (0, 0, True)
+    """
+    config = seeded(config) # The same interference in both precisions
+    report = {}
+    plates = {}
+    for precision in ("float64", "float32"):
+        simulation = make_simulation(replace(config, precision=precision))
+        start = time.perf_counter()
+        simulation.run()
+        report["seconds" + precision[-2:]] = time.perf_counter() - start
+        simulation.close()
+        plates[precision] = simulation.plate
+        report["max_point" + precision[-2:]] = int(simulation.max_point)
+        report["crystal" + precision[-2:]] = int(simulation.plate.crystal.sum())
+    double, single = plates["float64"], plates["float32"]
+    report["crystal_differences"] = int((double.crystal != single.crystal).sum())
+    report["i_differences"] = int((double.i != single.i).sum())
+    report["steam_difference"] = float(np.abs(double.d - single.d.astype(np.float64)).max())
+    return report
+
+def check_options(config):
+    """
+    Checks that the options of a simulation can be used together. The symmetric simulation, the workers, the far field
+    and the growing plate are different kinds of simulation (see `make_simulation`), so only one of them can be chosen,
+    and the tiles and the files of the plate are only used by `Simulation`.
+    
+    :param config: (SimulationConfig) the parameters of the simulation
+    :return: None
+    :raises ValueError: if some options can not be used together, the error gives their names
+    
+    Exemple:
+    
+    >>> check_options(SimulationConfig(workers=4, tile_size=32))
+    Traceback (most recent call last):
+    ...
+    ValueError: The options -w (workers) and -tile (tile_size) can not be used together
+    >>> check_options(SimulationConfig(symmetric=True, workers=2, growing=True))
+    Traceback (most recent call last):
+    ...
+    ValueError: The options -sym (symmetric), -w (workers) and -grow (growing) can not be used together
+    """
+    kinds = [name for name, used in (("-sym (symmetric)", config.symmetric), ("-w (workers)", config.workers > 1),
+                                     ("-far (far_field)", config.far_field), ("-grow (growing)", config.growing)) if used]
+    options = [name for name, used in (("-tile (tile_size)", config.tile_size), ("-storage (storage)", config.storage is not None)) if used]
+    if len(kinds) > 1 or (kinds and options):
+        names = kinds + options
+        raise ValueError("The options {} and {} can not be used together".format(", ".join(names[:-1]), names[-1]))
+
+def make_simulation(config):
+    """
+    Returns a new simulation of the kind chosen by the configuration
+    
+    :param config: (SimulationConfig) the parameters of the simulation
+    :return: (Simulation) a `SymmetricSimulation` if `config.symmetric` is True, a `ParallelSimulation`
+        if `config.workers` is more than 1, a `FarFieldSimulation` if `config.far_field` is not 0,
+        a `GrowingSimulation` if `config.growing` is True, a `Simulation` otherwise
+    :raises ValueError: if the options choose several kinds of simulation (see `check_options`)
+    """
+    check_options(config)
+    if config.symmetric:
+        return SymmetricSimulation(config)
+    if config.workers > 1:
+        return ParallelSimulation(config)
+    if config.far_field:
+        return FarFieldSimulation(config)
+    if config.growing:
+        return GrowingSimulation(config)
+    return Simulation(config)
+
+def save_checkpoint(simulation, directory, keep=CHECKPOINT_KEEP):
+    """
+    Saves the state of a simulation in a new folder of `directory` named after the iteration, which can be loaded by `load_checkpoint`.
+    Each array is written at once in a `.npy` file, with the parameters (the seed of the interference included) and the other values in `state.json`.
+    The files are written in a temporary folder which is renamed when they are all on the disk, so a checkpoint is never
+    half written. Only the last `keep` checkpoints are kept.
+    
+    :param simulation: (Simulation) the simulation
+    :param directory: (str) the folder of the checkpoints of the simulation
+    :param keep: (int) [DEFAULT: CHECKPOINT_KEEP] the number of checkpoints kept
+    :return: (str) the path of the checkpoint
+    """
+    arrays, values = simulation.checkpoint_state()
+    name = "checkpoint-{:08d}".format(values["iteration"])
+    path = os.path.join(directory, name)
+    temporary = os.path.join(directory, ".{}.{}.tmp".format(name, os.getpid()))
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    
+    state = {"configs": [asdict(config) for config in getattr(simulation, "configs", [simulation.config])],
+             "batch": isinstance(simulation, BatchSimulation), "values": values,
+             "arrays": sorted(arrays)}
+    for array_name, array in arrays.items():
+        with open(os.path.join(temporary, array_name + ".npy"), "wb") as file:
+            np.save(file, array)
+            file.flush()
+            os.fsync(file.fileno())
+    with open(os.path.join(temporary, "state.json"), "w") as file:
+        json.dump(state, file)
+        file.flush()
+        os.fsync(file.fileno())
+    
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(temporary, path)
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+    except OSError:
+        pass # The folders can not be synchronised on every system
+    
+    for old in list_checkpoints(directory)[:-keep]:
+        shutil.rmtree(old, ignore_errors=True)
+    return path
+
+def list_checkpoints(directory):
+    """
+    Returns the checkpoints saved in a folder by `save_checkpoint`, from the oldest to the latest
+    
+    :param directory: (str) the folder of the checkpoints
+    :return: (list of str) the paths of the checkpoints
+    """
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.startswith("checkpoint-") and os.path.isfile(os.path.join(directory, name, "state.json"))]
+
+def load_checkpoint(path, **parameters):
+    """
+    Returns the simulation saved in a checkpoint by `save_checkpoint`.
+    The arrays are mapped from the files in copy on write mode: they are not read before being used,
+    and the checkpoint is never modified by the simulation.
+    
+    :param path: (str) the path of the checkpoint
+    :param parameters: parameters of `SimulationConfig` which replace the saved ones, like the number of iterations
+    :return: (Simulation) the simulation
+    
+    Exemple:
+    
+    >>> import tempfile
+    >>> config = SimulationConfig(dimension=(41, 41), number=20, beta=0.4, sigma=0.01)
+    >>> simulation = Simulation(config)
+    >>> simulation.run(10)
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     path = save_checkpoint(simulation, directory)
+    ...     simulation.run()
+    ...     resumed = load_checkpoint(path) # The random numbers only depend on the seed and the iteration
+    ...     resumed.run()
+    ...     resumed.iteration, bool((resumed.plate.d == simulation.plate.d).all())
+    (20, True)
+    """
+    with open(os.path.join(path, "state.json")) as file:
+        state = json.load(file)
+    configs = [replace(SimulationConfig(**config), **parameters) for config in state["configs"]]
+    arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="c") for name in state["arrays"]}
+    simulation = BatchSimulation(configs) if state["batch"] else make_simulation(configs[0])
+    simulation.restore(arrays, state["values"])
+    return simulation
+
+# The parameters of `SimulationConfig` which do not change the states of a simulation, left out of the key of the result cache
+RUN_FIELDS = ("number", "frequency", "workers", "checkpoint_frequency", "resume", "frame_workers", "history",
+              "keyframe_frequency", "metrics", "metrics_interval", "cache", "cache_size", "morphology", "pictures", "storage",
+              "target_radius", "stall", "cache_directory")
+
+def cache_key(config):
+    """
+    Returns the key of the results of a simulation in a `ResultCache`: the hash of `ENGINE_VERSION` and of the parameters
+    which change the states of the simulation, written in a canonical way. The simulations which only differ by the
+    parameters of `RUN_FIELDS` have the same key, as their states are the same at each iteration.
+    
+    :param config: (SimulationConfig) the parameters of the simulation
+    :return: (str) the key, None if the results can not be found again (an interference without a seed)
+    
+    Exemple:
+    
+    >>> cache_key(SimulationConfig(number=10)) == cache_key(SimulationConfig(number=500, workers=4, init_pos=(150, 150)))
+    True
+    >>> cache_key(SimulationConfig(number=10)) == cache_key(SimulationConfig(number=10, target_radius=5, stall=20))
+    True
+    >>> cache_key(SimulationConfig(number=10)) == cache_key(SimulationConfig(number=10, dimension=(301, 301)))
+    False
+    >>> cache_key(SimulationConfig(sigma=0.01)) is None
+    True
+    """
+    if config.sigma and config.seed is None:
+        return None
+    parameters = {name: value for name, value in asdict(config).items() if name not in RUN_FIELDS}
+    parameters["init_pos"] = config.initial_position
+    if not config.sigma:
+        parameters["seed"] = None
+    if not config.tile_size:
+        parameters["tile_tolerance"] = None
+    if not config.far_field:
+        parameters["far_band"] = None
+    text = json.dumps({"engine": ENGINE_VERSION, "parameters": parameters}, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def check_resume(config, saved):
+    """
+    Raises an error if the parameters asked to resume a simulation change its states. Only the parameters of `RUN_FIELDS`
+    can change when resuming it, the other ones are the ones of the checkpoint. A simulation without a seed takes the one
+    of the checkpoint.
+    
+    :param config: (SimulationConfig) the parameters asked
+    :param saved: (SimulationConfig) the parameters of the checkpoint
+    :return: None
+    
+    Exemple:
+    
+    >>> saved = SimulationConfig(number=100, seed=5, sigma=0.01)
+    >>> check_resume(SimulationConfig(number=200, sigma=0.01, workers=2, metrics="run.csv"), saved)
+    >>> check_resume(SimulationConfig(number=200, sigma=0.01, precision="float32", beta=0.5), saved)
+    Traceback (most recent call last):
+        ...
+    ValueError: The parameters beta, precision can not change when resuming a simulation
+    """
+    changed = [name for name in asdict(config) if name not in RUN_FIELDS and getattr(config, name) != getattr(saved, name)
+               and not (name == "seed" and config.seed is None) and not (name == "init_pos" and config.initial_position == saved.initial_position)]
+    if changed:
+        raise ValueError("The parameters {} can not change when resuming a simulation".format(", ".join(changed)))
+
+class ResultCache(object):
+    """
+    The states of simulations saved on the disk, found by the hash of their parameters (see `cache_key`).
+    Each simulation has a folder holding a checkpoint (see `save_checkpoint`) every `keyframe_frequency` iterations and at the
+    last iteration calculated. A simulation of the same parameters starts from the latest checkpoint which is not beyond its
+    number of iterations: a run which was already made is read from the disk, a longer one only calculates the iterations
+    which are missing. When the checkpoints take more than `size` megabytes, the folders used the longest time ago are removed.
+    The processes which use the same cache take a lock on it to read or write a checkpoint, so a folder is never removed
+    while another process writes or reads it (on Unix, where the files of a checkpoint which is read stay available once they are mapped).
+    The last state of a simulation stopped by its stop conditions is not saved, only its regular checkpoints.
+    
+    :Attributes:
+        - directory: (str) the folder of the cache
+        - size: (float) the largest size of the cache, in megabytes
+        - computed: (int) the number of iterations calculated by the last call to `run`
+    
+    Exemple:
+    
+    >>> import tempfile
+    >>> config = SimulationConfig(dimension=(41, 41), number=20, beta=0.4, keyframe_frequency=10)
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     cache = ResultCache(directory)
+    ...     runs = [cache.run(replace(config, number=number)) for number in (20, 20, 15, 30)]
+    ...     [(simulation.iteration, computed) for simulation, computed in runs]
+    [(20, 20), (20, 0), (15, 5), (30, 10)]
+    >>> simulation = Simulation(config, number=30)
+    >>> simulation.run()
+    >>> bool((runs[-1][0].plate.d == simulation.plate.d).all())
+    True
+    
+    A simulation which stops before its number of iterations starts from a checkpoint at which it was not finished:
+    
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     cache = ResultCache(directory)
+    ...     _ = cache.run(config)
+    ...     stopped, computed = cache.run(replace(config, target_radius=15))
+    >>> stopped.iteration, stopped.max_point, computed
+    (15, 15, 5)
+    """
+    
+    def __init__(self, directory=RESULT_DIRECTORY, size=RESULT_CACHE_SIZE):
+        """
+        :param directory: (str) [DEFAULT: RESULT_DIRECTORY] the folder of the cache
+        :param size: (float) [DEFAULT: RESULT_CACHE_SIZE] the largest size of the cache, in megabytes
+        """
+        self.directory = directory
+        self.size = size
+        self.computed = 0
+        os.makedirs(directory, exist_ok=True)
+    
+    def path(self, config):
+        """
+        Returns the folder of the checkpoints of a simulation, None if it can not be cached
+        """
+        key = cache_key(config)
+        return None if key is None else os.path.join(self.directory, key)
+    
+    @contextmanager
+    def locked(self, shared=False):
+        """
+        Holds the lock of the cache while the block of the `with` runs
+        
+        :param shared: (bool) [DEFAULT: False] True to only read the cache, several processes can then hold the lock
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, ".lock"), "a") as file:
+            fcntl.flock(file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+    
+    def load(self, config):
+        """
+        Returns the simulation restored from its latest checkpoint which is not beyond `config.number` iterations,
+        and at which the simulation was not already finished (see `Simulation.finished`), as the stop conditions are not in the key
+        
+        :param config: (SimulationConfig) the parameters of the simulation
+        :return: (Simulation) the simulation, None if it is not in the cache
+        """
+        path = self.path(config)
+        if path is None:
+            return None
+        with self.locked(shared=True):
+            checkpoints = [checkpoint for checkpoint in list_checkpoints(path)
+                           if int(os.path.basename(checkpoint).split("-")[1]) <= config.number]
+            for checkpoint in reversed(checkpoints):
+                simulation = load_checkpoint(checkpoint, **{name: getattr(config, name) for name in RUN_FIELDS})
+                if simulation.iteration == 0 or not simulation.finished(simulation.idle()):
+                    os.utime(path) # The folder was used
+                    return simulation
+                simulation.close()
+        return None
+    
+    def store(self, simulation):
+        """
+        Saves the current state of a simulation in the cache and removes the folders used the longest time ago if it is too large
+        
+        :param simulation: (Simulation) the simulation
+        :return: None
+        """
+        path = self.path(simulation.config)
+        if path is None:
+            return
+        with self.locked():
+            os.makedirs(path, exist_ok=True)
+            save_checkpoint(simulation, path, keep=sys.maxsize)
+            os.utime(path)
+            self.evict(keep=path)
+    
+    def evict(self, keep=None):
+        """
+        Removes the folders used the longest time ago until the cache is not larger than `size`. The lock of the cache must be held
+        
+        :param keep: (str) [DEFAULT: None] a folder which is never removed
+        :return: None
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isdir(path):
+                size = sum(os.path.getsize(os.path.join(folder, file)) for folder, _, files in os.walk(path) for file in files)
+                entries.append((os.path.getmtime(path), path, size))
+        total = sum(size for _, _, size in entries)
+        for _, path, size in sorted(entries):
+            if total <= self.size * 1024 * 1024:
+                break
+            if path != keep:
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+    
+    def run(self, config, callback=None):
+        """
+        Returns a simulation after `config.number` iterations, starting from the cache, and saves its new states in it
+        
+        :param config: (SimulationConfig) the parameters of the simulation
+        :param callback: (function) [DEFAULT: None] function called with the simulation after each iteration calculated
+        :return: (tuple) the simulation and the number of iterations calculated
+        """
+        simulation = self.load(config) or make_simulation(config)
+        start = simulation.iteration
+        idle = simulation.idle()
+        stopped = False
+        while simulation.iteration < config.number:
+            attached = simulation.step()
+            idle = 0 if len(attached) else idle + 1
+            if simulation.morphology is not None:
+                simulation.morphology.update(attached, simulation.iteration)
+            if callback is not None:
+                callback(simulation)
+            if config.keyframe_frequency and simulation.iteration % config.keyframe_frequency == 0:
+                self.store(simulation)
+            if simulation.finished(idle):
+                stopped = True
+                break
+        if simulation.iteration > start and not stopped:
+            self.store(simulation)
+        simulation.close()
+        self.computed = simulation.iteration - start
+        return simulation, self.computed
+
+def output_path(config):
+    """
+    Returns the path of the folder in which the pictures of a simulation are saved
+    
+    :param config: (SimulationConfig) the parameters of the simulation
+    :return: (str) the path
+    
+    Exemple:
+    
+    >>> output_path(SimulationConfig())
+    './a-0.6 b-0.6 t-0.6 m-0.5 g-0.5 k-0.6 r-1.1 approx-40/'
+    """
+    return "./a-{alpha} b-{beta} t-{theta} m-{mu} g-{gamma} k-{kappa} r-{rho} approx-{approx}/".format(
+        beta=config.beta, alpha=config.alpha, theta=config.theta, mu=config.mu, gamma=config.gamma,
+        kappa=config.kappa, rho=config.rho, approx=config.approximation)
+
 def model_snowflake(number=NUMBER, dim=DIMENSION, init_pos=-1,
                     alpha=ALPHA, beta=BETA, theta=THETA,
                     mu=MU, gamma=GAMMA, kappa=KAPPA,
-                    sigma=SIGMA, frequency=FREQUENCY):
+                    sigma=SIGMA, frequency=FREQUENCY,
+                    rho=RHO, approximation=APPROXIMATION, config=None):
     """
     Displays a snowflake.
     This is the main function of the program, it will actualise the snowflake as well as displaying it and will eventually save its state
@@ -486,118 +4360,149 @@ def model_snowflake(number=NUMBER, dim=DIMENSION, init_pos=-1,
     :param kappa: (float) [DEFAULT: KAPPA] The fraction used fo the evolution of the snowflake.
     :param sigma: (float) [DEFAULT: SIGMA] The coefficient used for the interferences
     :param frequency: (int) [DEFAULT: FREQUENCY] The frequency at which the program saves the state of the snowflake
-    :return: None
+    :param rho: (float) [DEFAULT: RHO] The density of steam in each cell at the begining of the simulation
+    :param approximation: (int) [DEFAULT: APPROXIMATION] the distance from the furthest point of the snowflake beyond which, the diffusion is not calculated
+    :param config: (SimulationConfig) [DEFAULT: None] the parameters of the simulation, which replace all the other ones
+    :return: (Simulation) the simulation at its last state
     """
-    print("Creating plate...")
-    plate = create_plate(initial_position = init_pos)
-    print("Plate successfully created !")
-    
-    newpath = "./a-{alpha} b-{beta} t-{theta} m-{mu} g-{gamma} k-{kappa} r-{rho} approx-{approx}/".format(beta=BETA, alpha=ALPHA, theta=THETA, mu=MU, gamma=GAMMA, kappa=KAPPA, rho=RHO, approx=APPROXIMATION)
-    print(newpath)
-    
-    # Creates directories if they do not exist    
-    if not os.path.exists(newpath):
-        os.makedirs(newpath)
-    if not os.path.exists(newpath + "/pixel"):      
-        os.makedirs(newpath + "/Pixels")
-    if not os.path.exists(newpath + "/hexa"):
-        os.makedirs(newpath + "/Hexagons")
-
-
-    if init_pos == -1: # Initialises the `cells_at_border` set
-        init_pos = (dim[0]//2, dim[1]//2)
-    cells_at_border = set(NEIGHBOURS[(init_pos[0], init_pos[1])]) # set of tuples of coordinates
-    max_point = 0
-    len_total = len(str(number))
-    
-    # Runs the simulation `number` times
-    print("Running simulation...")
-    print("\n    Frames    |   Distance")
-    print("- - - - - - - - - - - - - - -")
-    for i in range(number):
-        #DIFFUSION
-        plate = diffusion(plate, init_pos, max_point, approximation=APPROXIMATION)
-
-        changes_to_make = {}
-        for cell in cells_at_border: # `cell` is a tuple of coordinates
-            cell_di = plate[cell[0]][cell[1]] # `cell_di` is a dictionnary
-            
-            # FREEZING
-            cell_di = freezing(cell_di)
-            
-            # ATTACHMENT
-            neighbours = {} # A dictionnary of all neighbours key: coordinates value: dictionnary
-            for y, x in NEIGHBOURS[(cell[0], cell[1])]:
-                neighbours[(y,x)] = plate[y][x]
-            new_cell = attachment(cell_di, cell, neighbours, i)
-            if new_cell: # If not None in this case
-                changes_to_make[(cell[0], cell[1])] = new_cell
-            
-            # MELTING
-            cell_di = melting(cell_di)
-            
-        # INTERFERENCE
-        if sigma:
-            interference(plate)
-        
-        for coord, di in changes_to_make.items(): 
-            plate[coord[0]][coord[1]] = di # We apply the changes done at the attachment phase
-            max_point = max(abs(init_pos[0] - coord[0]), abs(init_pos[1] - coord[1]), max_point)
-            # We update the cells at the border
-            neighbours = {}
-            for y, x in NEIGHBOURS[(coord[0], coord[1])]: # All the neighbours of the cell we changed
-                neighbours[(y,x)] = plate[y][x] # We create a dictionnary of the neighbours
-            
-            for neigh_coord, di in neighbours.items():
-                if (di["is_in_crystal"] == False 
-                    and (not neigh_coord in changes_to_make)):
-                    cells_at_border.add(neigh_coord) # We add the new cells at the border
-            cells_at_border.remove(coord) # We remove the old cell at the border
-        
-        
-        # Saves the state of the plate
-        if i % frequency == 0:
-            savestates(plate, "snowflake", i, newpath)
-            print("{frames:{longueur}d} / {total} |   {distance}".format(longueur = len_total + 2, frames=i, total=number, distance=max_point))
-    savestates(plate, "snowflake", i, newpath)
-    print("Simulation done !")
-    print("Creating gif...")
-    create_gif(newpath) # Creates a gif from all the pictures saved from the plate
-    print("Gif successfully created !")
-    return
-
+    if config is None:
+        config = SimulationConfig(number=number, dimension=dim, init_pos=None if init_pos == -1 else init_pos,
+                                  alpha=alpha, beta=beta, theta=theta, mu=mu, gamma=gamma, kappa=kappa,
+                                  rho=rho, sigma=sigma, approximation=approximation, frequency=frequency)
+    newpath = output_path(config)
+    checkpoints = os.path.join(newpath, "Checkpoints")
+    
+    simulation = None
+    if config.resume:
+        checkpoint = (list_checkpoints(checkpoints) or [None])[-1]
+        if checkpoint is None:
+            print("No checkpoint found, the simulation starts over")
+        else:
+            print("Resuming from {}...".format(checkpoint))
+            # The parameters of the run are the ones asked, the other ones can not change
+            simulation = load_checkpoint(checkpoint, **{name: getattr(config, name) for name in RUN_FIELDS})
+            try:
+                check_resume(config, simulation.config)
+            except ValueError:
+                simulation.close()
+                raise
+            config = simulation.config
+    cache = ResultCache(config.cache, config.cache_size) if config.cache else None
+    if simulation is None and cache is not None:
+        simulation = cache.load(config)
+        if simulation is not None:
+            print("Starting from the iteration {} found in the cache".format(simulation.iteration))
+            config = simulation.config
+    if simulation is None:
+        print("Creating plate...")
+        simulation = make_simulation(config)
+        config = simulation.config
+        print("Plate successfully created !")
+    # The simulation is closed even if the run fails, so its processes and shared memory do not outlive it
+    with simulation:
+        print(newpath)
+        if config.sigma:
+            print("Seed of the interference: {}".format(config.seed))
+        
+        # Creates directories if they do not exist    
+        if not os.path.exists(newpath):
+            os.makedirs(newpath)
+        if config.pictures and not os.path.exists(newpath + "/Pixels"):
+            os.makedirs(newpath + "/Pixels")
+        if config.pictures and not os.path.exists(newpath + "/Hexagons"):
+            os.makedirs(newpath + "/Hexagons")
+        # The parameters of the run, with the seed, so that it can be run again
+        with open(os.path.join(newpath, "parameters.json"), "w") as file:
+            json.dump(asdict(config), file, indent=1)
+        
+        number = config.number
+        len_total = len(str(number))
+        
+        # Runs the simulation `number` times
+        print("Running simulation...")
+        print("\n    Frames    |   Distance")
+        print("- - - - - - - - - - - - - - -")
+        # The animation is written while the simulation runs, unless it is resumed: its first frames are then only in the pictures
+        resumed = simulation.iteration > 0
+        animation = None if resumed or not config.pictures else AnimationWriter(newpath + "legif.gif")
+        history = HistoryWriter(os.path.join(newpath, "History"), config, simulation.iteration) if config.history else None
+        metrics = MetricsWriter(config.metrics, simulation, config.metrics_interval) if config.metrics else None
+        morphology = None
+        if config.morphology:
+            # The measures start from the crystal of a resumed simulation
+            morphology = MorphologyTracker(config.dimension, simulation.init_pos, simulation.plate.crystal if resumed else None,
+                                           config.morphology, config.cache_directory)
+            if resumed:
+                morphology.resume(os.path.join(newpath, "morphology.csv"), simulation.iteration)
+        idle = simulation.idle() # The number of iterations since the crystal last grew
+        stopped = False # True if the simulation was stopped by its stop conditions
+        try:
+            with FrameWriter(config.frame_workers, cache_directory=config.cache_directory) as writer:
+                for i in range(simulation.iteration, number):
+                    attached = simulation.step()
+                    idle = 0 if len(attached) else idle + 1
+                    if history is not None:
+                        history.record(simulation, attached)
+                    if metrics is not None:
+                        metrics.record(simulation, attached)
+                    if morphology is not None:
+                        morphology.update(attached, simulation.iteration)
+                    
+                    # Saves the state of the plate
+                    if i % config.frequency == 0:
+                        if config.pictures:
+                            plate = simulation.plate
+                            writer.save(plate, "snowflake", i, newpath, number=number, rho=config.rho)
+                        if animation is not None:
+                            animation.append(cell_colours(plate, number=number, rho=config.rho))
+                        print("{frames:{longueur}d} / {total} |   {distance}".format(longueur = len_total + 2, frames=i, total=number, distance=simulation.max_point))
+                    
+                    # Saves the state of the simulation
+                    if config.checkpoint_frequency and simulation.iteration % config.checkpoint_frequency == 0:
+                        save_checkpoint(simulation, checkpoints)
+                        if morphology is not None:
+                            morphology.save(os.path.join(newpath, "morphology.csv"))
+                    if cache is not None and config.keyframe_frequency and simulation.iteration % config.keyframe_frequency == 0:
+                        cache.store(simulation)
+                    
+                    if simulation.finished(idle):
+                        print("The crystal stopped growing, reached its target radius or the edge of the simulated plate at the iteration {}".format(simulation.iteration))
+                        stopped = True
+                        break
+                if config.pictures:
+                    plate = simulation.plate
+                    writer.save(plate, "snowflake", simulation.iteration - 1, newpath, number=number, rho=config.rho)
+                if animation is not None and (simulation.iteration - 1) % config.frequency != 0:
+                    animation.append(cell_colours(plate, number=number, rho=config.rho))
+                if cache is not None and not stopped:
+                    cache.store(simulation) # A stopped simulation only keeps its regular checkpoints (see `ResultCache`)
+        finally:
+            if animation is not None:
+                animation.close()
+            if history is not None:
+                history.close(simulation.plate)
+            if metrics is not None:
+                metrics.close()
+            if morphology is not None:
+                morphology.final(simulation.iteration)
+                morphology.save(os.path.join(newpath, "morphology.csv"))
+        print("Simulation done !")
+        if resumed and config.pictures:
+            print("Creating gif...")
+            create_gif(newpath) # Creates a gif from all the pictures saved from the plate
+            print("Gif successfully created !")
+        return simulation
 
-# Create a dictionnary which maps a list of neighbours coordinates to the coordinates of a cell
-# To access the neughbours of a cell which coordinates are (a, b) you do NEIGHBOURS[(a, b)]
-NEIGHBOURS = {}
-for i in range(DIMENSION[0]):
-    for j in range(DIMENSION[1]):
-        NEIGHBOURS[(i,j)] = get_neighbours((i,j))
+def main(argv=None):
+    """
+    Runs the simulation with the parameters given on the command line
+    
+    :param argv: (list of str) [DEFAULT: sys.argv[1:]] the arguments
+    :return: None
+    """
+    config = parse_arguments(argv)
+    print(config)
+    model_snowflake(config=config)
 
 if __name__ == '__main__':
-    model_snowflake() # Runs the simulation
-    
-    # SETUP FOR THE DOCTEST
-    ALPHA = 0.7
-    BETA = 0.6
-    THETA = 0.7
-    # Coefficients of the melting phase
-    GAMMA = 0.5 # Proportion of ice that transforms into steam
-    MU = 0.5 # Proportion of water that transforms into steam
-    
-    KAPPA = 0.6 # Proportion of steam which transforms into ice for a border cell at the freezing phase
-    RHO = 1.1 # Density of steam in each cell at the begining of the simulation
-    
-    # 30 : No loss on 400*400
-    # 20 : Little loss on the branches on 400*400
-    APPROXIMATION = 40
-    SIGMA = 0.000 # Coefficient for the interference
-    DEFAULT_CELL = {"is_in_crystal":False, "b":0, "c":0, "d":RHO}
-    little_plate = create_plate(dim=(5,5))
-    NEIGHBOURS = {}
-    for i in range(5):
-        for j in range(5):
-            NEIGHBOURS[(i,j)] = get_neighbours((i,j), dim=(5,5))    
-
-    import doctest
-    doctest.testmod()
+    main() # Runs the simulation
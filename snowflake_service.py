@@ -0,0 +1,570 @@
+"""
+:mod: `snowflake_service` module
+:date: October 2026
+
+A local service which runs the simulations of `snowflake_growth` asked over HTTP, on a TCP port or a Unix socket.
+The jobs are run by a pool of processes started once, which already imported the module and built the tables of the
+usual plates, and their results are kept in a `ResultCache`. The same job asked twice while it runs is only run once.
+
+    POST /jobs                  starts a job whose JSON body holds parameters of `SimulationConfig`, returns the job
+    GET  /jobs                  returns all the jobs
+    GET  /jobs/<id>             returns the job, with its result when it is done
+    GET  /jobs/<id>/progress    streams the progress of the job, one JSON line per update, until it ends
+    GET  /jobs/<id>/picture     returns the PNG picture of the snowflake at the end of the job
+"""
+
+from snowflake_growth import (SimulationConfig, ResultCache, CACHE_DIRECTORY, RESULT_DIRECTORY, RESULT_CACHE_SIZE,
+                              seeded, cache_key, cell_colours, neighbour_table, hexagon_map, check_options)
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields, asdict
+import multiprocessing
+import threading
+import asyncio
+import hashlib
+import time
+import json
+import os
+import argparse
+import numpy as np
+from PIL import Image
+
+HOST = "127.0.0.1"
+PORT = 8765
+WORKERS = 2 # The number of processes which run the jobs
+MEMORY = 4096 # The memory the plates of the jobs running at the same time can use, in megabytes
+MEMORY_FACTOR = 4 # The memory used by a simulation compared with its plate, for the temporary arrays of the phases
+PROGRESS_INTERVAL = 10 # The frequency at which a job sends its progress
+WARM_DIMENSIONS = [(300, 300)] # The dimensions of the plates whose tables are built when a process starts
+JOB_TTL = 3600 # The time during which a job which ended is kept, in seconds
+MAX_DIMENSION = 4001 # The largest number of rows or columns of the plate of a job
+MAX_NUMBER = 100000 # The largest number of iterations of a job
+# The parameters of `SimulationConfig` which a client can not choose, as they write files on the server or use its processes
+LIMIT_FIELDS = ("metrics", "cache", "cache_size", "resume", "history", "checkpoint_frequency", "frame_workers", "workers", "storage",
+                "cache_directory")
+
+# The queue on which the processes of the pool send the progress of their jobs, given to each process when it starts
+progress_queue = None
+
+def warm_worker(queue, dimensions):
+    """
+    Prepares a process of the pool: keeps the queue of the progress and builds the tables of the usual plates
+    
+    :param queue: (multiprocessing.Queue) the queue of the progress
+    :param dimensions: (list of tuple) the dimensions of the plates
+    :return: None
+    """
+    global progress_queue
+    progress_queue = queue
+    for dim in dimensions:
+        dim = tuple(dim)
+        neighbour_table(dim, cache_directory=CACHE_DIRECTORY)
+        hexagon_map(dim, cache_directory=CACHE_DIRECTORY)
+
+def job_config(parameters):
+    """
+    Returns the parameters of a simulation asked by a client
+    
+    :param parameters: (dict) parameters of `SimulationConfig`, the dimension can be one number for a square plate
+    :return: (SimulationConfig) the parameters. The outputs of the script (metrics, history...) are not used,
+        and a simulation without a seed is given one
+    
+    Exemple:
+    
+    >>> config = job_config({"dimension": 101, "number": 50, "beta": 0.4})
+    >>> config.dimension, config.number, config.beta, config.workers
+    ((101, 101), 50, 0.4, 1)
+    >>> job_config({"storage": "/home", "cache": "/tmp"}).storage is None
+    True
+    >>> job_config({"colour": "blue"})
+    Traceback (most recent call last):
+    ...
+    ValueError: Unknown parameters: colour
+    >>> job_config({"far_field": 8, "growing": True})
+    Traceback (most recent call last):
+    ...
+    ValueError: The options -far (far_field) and -grow (growing) can not be used together
+    """
+    names = {field.name for field in fields(SimulationConfig)}
+    unknown = sorted(set(parameters) - names)
+    if unknown:
+        raise ValueError("Unknown parameters: {}".format(", ".join(unknown)))
+    parameters = {name: value for name, value in parameters.items() if name not in LIMIT_FIELDS}
+    if isinstance(parameters.get("dimension"), int):
+        parameters["dimension"] = (parameters["dimension"], parameters["dimension"])
+    config = seeded(SimulationConfig(**parameters))
+    check_options(config)
+    return config
+
+def job_id(config):
+    """
+    Returns the identifier of a job, which is the same for the jobs which give the same result
+    
+    :param config: (SimulationConfig) the parameters of the simulation
+    :return: (str) the identifier
+    
+    Exemple:
+    
+    >>> job_id(job_config({"number": 50})) == job_id(job_config({"number": 50, "frequency": 5}))
+    True
+    >>> job_id(job_config({"number": 50})) == job_id(job_config({"number": 60}))
+    False
+    """
+    return hashlib.sha256("{}-{}".format(cache_key(config), config.number).encode()).hexdigest()[:16]
+
+def plate_memory(config):
+    """
+    Returns the memory used by a simulation, in megabytes
+    
+    :param config: (SimulationConfig) the parameters of the simulation
+    :return: (float) the memory
+    
+    Exemple:
+    
+    >>> round(plate_memory(SimulationConfig(dimension=(1000, 1000))), 1)
+    110.6
+    """
+    cell = 3 * np.dtype(config.precision).itemsize + 1 + 4 # b, c, d, crystal and i
+    return config.dimension[0] * config.dimension[1] * cell * MEMORY_FACTOR / (1024 * 1024)
+
+def run_job(identifier, config, cache_directory, cache_size):
+    """
+    Runs a job in a process of the pool, from the cache, and saves the picture of the snowflake in the cache
+    
+    :param identifier: (str) the identifier of the job
+    :param config: (SimulationConfig) the parameters of the simulation
+    :param cache_directory: (str) the folder of the cache
+    :param cache_size: (float) the largest size of the cache, in megabytes
+    :return: (dict) the result: the number of iterations done and calculated, `max_point`, the number of cells
+        of the crystal and the path of the picture
+    """
+    def report(simulation):
+        if simulation.iteration % PROGRESS_INTERVAL == 0:
+            progress_queue.put((identifier, {"iteration": simulation.iteration, "max_point": int(simulation.max_point)}))
+    
+    cache = ResultCache(cache_directory, cache_size)
+    simulation, computed = cache.run(config, callback=report)
+    plate = simulation.plate
+    os.makedirs(cache.path(config), exist_ok=True)
+    picture = os.path.join(cache.path(config), "snowflake-{:08d}.png".format(simulation.iteration))
+    Image.fromarray(cell_colours(plate, number=config.number, rho=config.rho), "RGB").save(picture)
+    return {"iteration": simulation.iteration, "computed": computed, "max_point": int(simulation.max_point),
+            "size": int(plate.crystal.sum()), "picture": picture}
+
+class Job(object):
+    """
+    A job of the service
+    
+    :Attributes:
+        - id: (str) the identifier of the job
+        - config: (SimulationConfig) the parameters of the simulation
+        - memory: (float) the memory used by the simulation, in megabytes
+        - status: (str) "queued", "running", "done" or "failed"
+        - progress: (dict) the last progress sent by the job
+        - result: (dict) the result of the job once it is done, or the error if it failed
+        - listeners: (list of asyncio.Queue) the queues of the clients which follow the progress
+        - ended: (float) the time at which the job ended (see `time.monotonic`), None while it did not
+    """
+    
+    def __init__(self, identifier, config, memory):
+        self.id = identifier
+        self.config = config
+        self.memory = memory
+        self.ended = None
+        self.status = "queued"
+        self.progress = {"iteration": 0, "max_point": 0}
+        self.result = None
+        self.listeners = []
+    
+    def describe(self):
+        """
+        Returns the job as a dictionnary which can be written in JSON
+        """
+        return {"id": self.id, "status": self.status, "progress": self.progress, "result": self.result,
+                "config": asdict(self.config)}
+    
+    def publish(self, message):
+        """
+        Sends a message to the clients which follow the progress of the job
+        """
+        for listener in self.listeners:
+            listener.put_nowait(message)
+
+class SimulationService(object):
+    """
+    The jobs of the service and the pool of processes which run them.
+    A job only starts when the memory of the jobs running with it stays below `memory` megabytes, and the jobs which need more
+    than `memory` megabytes, or whose plate or number of iterations is larger than `max_dimension` or `max_number`, are refused.
+    The jobs which ended are forgotten `ttl` seconds later, their results stay in the cache.
+    
+    :Attributes:
+        - jobs: (dict) the jobs by identifier
+        - memory: (float) the memory the jobs running at the same time can use, in megabytes
+        - used: (float) the memory used by the jobs running, in megabytes
+        - ttl: (float) the time during which a job which ended is kept, in seconds
+        - max_dimension: (int) the largest number of rows or columns of the plate of a job
+        - max_number: (int) the largest number of iterations of a job
+    
+    Exemple:
+    
+    >>> import tempfile
+    >>> async def session(directory):
+    ...     socket = os.path.join(directory, "service.sock")
+    ...     service = SimulationService(workers=1, memory=1024, cache_directory=os.path.join(directory, "cache"), dimensions=[])
+    ...     await service.start()
+    ...     server = await asyncio.start_unix_server(service.handle, path=socket)
+    ...     try:
+    ...         parameters = {"dimension": 31, "number": 10, "beta": 0.4}
+    ...         (status, job), (again, same) = [await ask("POST", "/jobs", parameters, socket=socket) for _ in range(2)]
+    ...         print(status, again, job["id"] == same["id"], len(service.jobs))
+    ...         progress = await ask("GET", "/jobs/{}/progress".format(job["id"]), socket=socket)
+    ...         print(progress[0], json.loads(progress[1].splitlines()[-1]))
+    ...         status, job = await ask("GET", "/jobs/" + job["id"], socket=socket)
+    ...         print(status, job["status"], job["result"]["size"])
+    ...         status, picture = await ask("GET", "/jobs/{}/picture".format(job["id"]), socket=socket)
+    ...         print(status, picture[:4])
+    ...         os.remove(job["result"]["picture"]) # Removed from the cache
+    ...         print((await ask("GET", "/jobs/{}/picture".format(job["id"]), socket=socket))[0])
+    ...         print([(await ask(method, path, body, socket=socket))[0] for method, path, body in
+    ...                [("POST", "/jobs", {"colour": "blue"}), ("GET", "/jobs/unknown", None), ("DELETE", "/jobs", None)]])
+    ...         print([(await ask("POST", "/jobs", parameters, socket=socket)) for parameters in
+    ...                ({"dimension": 5001}, {"number": 10 ** 6}, {"dimension": 4001})])
+    ...         service.ttl = 0
+    ...         print((await ask("GET", "/jobs", socket=socket))[1])
+    ...     finally:
+    ...         server.close()
+    ...         service.close()
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     asyncio.run(session(directory))
+    202 202 True 1
+    200 {'iteration': 10, 'max_point': 10, 'status': 'done'}
+    200 done 331
+    200 b'\x89PNG'
+    404
+    [400, 404, 404]
+    [(400, {'error': 'The plate of a job can not be larger than 4001 cells'}), (400, {'error': 'A job can not run more than 100000 iterations'}), (400, {'error': 'The job needs 1771 megabytes, more than the 1024 megabytes of the service'})]
+    []
+    """
+    
+    def __init__(self, workers=WORKERS, memory=MEMORY, cache_directory=RESULT_DIRECTORY, cache_size=RESULT_CACHE_SIZE,
+                 dimensions=WARM_DIMENSIONS, ttl=JOB_TTL, max_dimension=MAX_DIMENSION, max_number=MAX_NUMBER):
+        """
+        :param workers: (int) [DEFAULT: WORKERS] the number of processes
+        :param memory: (float) [DEFAULT: MEMORY] the memory the jobs running at the same time can use, in megabytes
+        :param cache_directory: (str) [DEFAULT: RESULT_DIRECTORY] the folder of the cache of the results
+        :param cache_size: (float) [DEFAULT: RESULT_CACHE_SIZE] the largest size of the cache, in megabytes
+        :param dimensions: (list of tuple) [DEFAULT: WARM_DIMENSIONS] the dimensions of the plates whose tables are
+            built when the processes start
+        :param ttl: (float) [DEFAULT: JOB_TTL] the time during which a job which ended is kept, in seconds
+        :param max_dimension: (int) [DEFAULT: MAX_DIMENSION] the largest number of rows or columns of the plate of a job
+        :param max_number: (int) [DEFAULT: MAX_NUMBER] the largest number of iterations of a job
+        """
+        self.jobs = {}
+        self.ttl = ttl
+        self.max_dimension = max_dimension
+        self.max_number = max_number
+        self.memory = memory
+        self.used = 0.0
+        self.cache_directory = cache_directory
+        self.cache_size = cache_size
+        context = multiprocessing.get_context("spawn")
+        self.queue = context.Queue()
+        self.pool = ProcessPoolExecutor(workers, mp_context=context, initializer=warm_worker, initargs=(self.queue, dimensions))
+        # The processes are started and prepared now rather than at the first jobs
+        for future in [self.pool.submit(os.getpid) for _ in range(workers)]:
+            future.result()
+        self.loop = None
+        self.memory_free = None
+        self.reader = None
+    
+    async def start(self):
+        """
+        Starts reading the progress sent by the processes, in the event loop running
+        """
+        self.loop = asyncio.get_running_loop()
+        self.memory_free = asyncio.Condition()
+        self.reader = threading.Thread(target=self.read_progress, daemon=True)
+        self.reader.start()
+    
+    def read_progress(self):
+        """
+        Reads the progress sent by the processes and gives it to the jobs, in a thread
+        """
+        while True:
+            message = self.queue.get()
+            if message is None:
+                return
+            self.loop.call_soon_threadsafe(self.update, *message)
+    
+    def update(self, identifier, progress):
+        """
+        Records the progress of a job and sends it to the clients
+        """
+        job = self.jobs.get(identifier)
+        if job is not None:
+            job.progress = progress
+            job.publish(dict(progress, status=job.status))
+    
+    def submit(self, parameters):
+        """
+        Returns the job of the parameters, which is started if the same job is not already known
+    
+        :param parameters: (dict) parameters of `SimulationConfig`
+        :return: (Job) the job
+        :raises ValueError: if the job is larger than the limits of the service, before it is queued
+        """
+        config = job_config(parameters)
+        if max(config.dimension) > self.max_dimension:
+            raise ValueError("The plate of a job can not be larger than {} cells".format(self.max_dimension))
+        if config.number > self.max_number:
+            raise ValueError("A job can not run more than {} iterations".format(self.max_number))
+        memory = plate_memory(config)
+        if memory > self.memory:
+            raise ValueError("The job needs {:.0f} megabytes, more than the {:.0f} megabytes of the service".format(memory, self.memory))
+        self.expire()
+        identifier = job_id(config)
+        job = self.jobs.get(identifier)
+        if job is None or job.status == "failed":
+            job = self.jobs[identifier] = Job(identifier, config, memory)
+            asyncio.ensure_future(self.run(job))
+        return job
+    
+    def expire(self):
+        """
+        Forgets the jobs which ended more than `ttl` seconds ago
+        """
+        now = time.monotonic()
+        for identifier, job in list(self.jobs.items()):
+            if job.ended is not None and now - job.ended >= self.ttl:
+                del self.jobs[identifier]
+    
+    async def run(self, job):
+        """
+        Runs a job when there is enough memory for it
+        """
+        async with self.memory_free:
+            await self.memory_free.wait_for(lambda: self.used + job.memory <= self.memory)
+            self.used += job.memory
+        job.status = "running"
+        job.publish(dict(job.progress, status=job.status))
+        try:
+            job.result = await asyncio.wrap_future(self.pool.submit(run_job, job.id, job.config, self.cache_directory, self.cache_size))
+            job.status = "done"
+            job.progress = {"iteration": job.result["iteration"], "max_point": job.result["max_point"]}
+        except Exception as error:
+            job.result = {"error": "{}: {}".format(type(error).__name__, error)}
+            job.status = "failed"
+        finally:
+            async with self.memory_free:
+                self.used -= job.memory
+                self.memory_free.notify_all()
+        job.ended = time.monotonic()
+        job.publish(dict(job.progress, status=job.status))
+        job.publish(None)
+    
+    async def handle(self, reader, writer):
+        """
+        Answers a HTTP request of a client
+        """
+        try:
+            request = await reader.readline()
+            method, path, _ = request.decode("latin-1").split(" ", 2)
+            length = 0
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            body = await reader.readexactly(length) if length else b""
+            await self.answer(method, path.split("?")[0].strip("/").split("/"), body, writer)
+        except (ValueError, TypeError, json.JSONDecodeError) as error:
+            self.respond(writer, 400, {"error": str(error)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+            writer.close()
+    
+    async def answer(self, method, parts, body, writer):
+        """
+        Answers a request whose path is cut in `parts`
+        """
+        if parts == ["jobs"] and method == "POST":
+            job = self.submit(json.loads(body or b"{}"))
+            return self.respond(writer, 202 if job.status != "done" else 200, job.describe())
+        self.expire()
+        if parts == ["jobs"] and method == "GET":
+            return self.respond(writer, 200, [job.describe() for job in self.jobs.values()])
+        job = self.jobs.get(parts[1]) if len(parts) >= 2 and parts[0] == "jobs" else None
+        if job is None or method != "GET":
+            return self.respond(writer, 404, {"error": "Not found"})
+        if len(parts) == 2:
+            return self.respond(writer, 200, job.describe())
+        if parts[2] == "progress":
+            return await self.stream(job, writer)
+        if parts[2] == "picture" and job.status == "done":
+            try:
+                with open(job.result["picture"], "rb") as file:
+                    return self.respond(writer, 200, file.read(), "image/png")
+            except FileNotFoundError:
+                pass # The result was removed from the cache
+        return self.respond(writer, 404, {"error": "Not found"})
+    
+    async def stream(self, job, writer):
+        """
+        Sends the progress of a job to a client until the job ends, one JSON line per update
+        """
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nConnection: close\r\n\r\n")
+        writer.write((json.dumps(dict(job.progress, status=job.status)) + "\n").encode())
+        if job.status in ("done", "failed"):
+            return
+        listener = asyncio.Queue()
+        job.listeners.append(listener)
+        try:
+            while True:
+                message = await listener.get()
+                if message is None:
+                    return
+                writer.write((json.dumps(message) + "\n").encode())
+                await writer.drain()
+        finally:
+            job.listeners.remove(listener)
+    
+    def respond(self, writer, status, content, kind="application/json"):
+        """
+        Sends an answer to a client
+    
+        :param writer: (asyncio.StreamWriter) the connection
+        :param status: (int) the HTTP status
+        :param content: (bytes or object) the content, written in JSON if it is not bytes
+        :param kind: (str) [DEFAULT: "application/json"] the type of the content
+        """
+        if not isinstance(content, bytes):
+            content = json.dumps(content).encode()
+        reasons = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found"}
+        writer.write("HTTP/1.1 {} {}\r\nContent-Type: {}\r\nContent-Length: {}\r\nConnection: close\r\n\r\n".format(
+                     status, reasons[status], kind, len(content)).encode() + content)
+    
+    def close(self):
+        """
+        Stops the processes and the thread reading the progress
+        """
+        self.pool.shutdown(cancel_futures=True)
+        self.queue.put(None)
+
+async def ask(method, path, body=None, host=HOST, port=PORT, socket=None):
+    """
+    Sends a request to the service and returns its answer
+    
+    :param method: (str) the HTTP method
+    :param path: (str) the path, for instance "/jobs"
+    :param body: (object) [DEFAULT: None] the content of the request, written in JSON
+    :param host: (str) [DEFAULT: HOST] the address of the service
+    :param port: (int) [DEFAULT: PORT] the port of the service
+    :param socket: (str) [DEFAULT: None] the path of the Unix socket of the service, instead of the port
+    :return: (tuple) the HTTP status and the content of the answer, read from JSON if it is JSON
+    """
+    if socket is not None:
+        reader, writer = await asyncio.open_unix_connection(socket)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    content = b"" if body is None else json.dumps(body).encode()
+    writer.write("{} {} HTTP/1.1\r\nHost: {}\r\nContent-Length: {}\r\n\r\n".format(method, path, host, len(content)).encode() + content)
+    await writer.drain()
+    answer = await reader.read()
+    writer.close()
+    head, _, content = answer.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    if "Content-Type: application/json" in lines:
+        content = json.loads(content)
+    return status, content
+
+async def serve(service, host=HOST, port=PORT, socket=None):
+    """
+    Runs the service until it is stopped
+    
+    :param service: (SimulationService) the service
+    :param host: (str) [DEFAULT: HOST] the address on which the service listens
+    :param port: (int) [DEFAULT: PORT] the port on which the service listens
+    :param socket: (str) [DEFAULT: None] the path of a Unix socket on which the service listens instead of the port
+    :return: None
+    """
+    await service.start()
+    if socket is not None:
+        server = await asyncio.start_unix_server(service.handle, path=socket)
+        print("Listening on {}".format(socket))
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+        print("Listening on http://{}:{}".format(host, port))
+    async with server:
+        await server.serve_forever()
+
+def build_parser():
+    """
+    Returns the parser of the command line arguments of the service
+    
+    :return: (argparse.ArgumentParser) the parser
+    """
+    parser = argparse.ArgumentParser(description='Runs the simulations asked over HTTP by a pool of processes.',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    
+    parser.add_argument('-host', type=str,
+                        help='The address on which the service listens.', default=HOST)
+    
+    parser.add_argument('-port', type=int,
+                        help='The port on which the service listens.', default=PORT)
+    
+    parser.add_argument('-socket', type=str,
+                        help='The path of a Unix socket on which the service listens instead of the port.', default=None)
+    
+    parser.add_argument('-w', '-workers', type=int,
+                        help='The number of processes which run the simulations.', default=WORKERS)
+    
+    parser.add_argument('-memory', type=float,
+                        help='The memory the simulations running at the same time can use, in megabytes.', default=MEMORY)
+    
+    parser.add_argument('-cache', type=str,
+                        help='The folder where the results are kept.', default=RESULT_DIRECTORY)
+    
+    parser.add_argument('-cache-size', type=float,
+                        help='The largest size of the results kept, in megabytes.', default=RESULT_CACHE_SIZE)
+    
+    parser.add_argument('-ttl', type=float,
+                        help='The time during which a job which ended is kept, in seconds.', default=JOB_TTL)
+    
+    parser.add_argument('-max-dim', type=int,
+                        help='The largest number of rows or columns of the plate of a job.', default=MAX_DIMENSION)
+    
+    parser.add_argument('-max-n', type=int,
+                        help='The largest number of iterations of a job.', default=MAX_NUMBER)
+    
+    parser.add_argument('-warm', type=int, nargs='*',
+                        help='The sizes of the square plates whose tables are built when the processes start.',
+                        default=[dim[0] for dim in WARM_DIMENSIONS])
+    return parser
+
+def main(argv=None):
+    """
+    Runs the service with the parameters given on the command line
+    
+    :param argv: (list of str) [DEFAULT: sys.argv[1:]] the arguments
+    :return: None
+    """
+    parameter = vars(build_parser().parse_args(argv))
+    service = SimulationService(workers=parameter['w'], memory=parameter['memory'], cache_directory=parameter['cache'],
+                                cache_size=parameter['cache_size'], dimensions=[(size, size) for size in parameter['warm']],
+                                ttl=parameter['ttl'], max_dimension=parameter['max_dim'], max_number=parameter['max_n'])
+    try:
+        asyncio.run(serve(service, parameter['host'], parameter['port'], parameter['socket']))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+if __name__ == '__main__':
+    main()
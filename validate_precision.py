@@ -0,0 +1,79 @@
+"""
+:mod: `validate_precision` module
+:date: October 2026
+
+Checks that the simulations of `snowflake_growth` in float32 give the same snowflakes as in float64,
+for the parameters given on the command line
+"""
+
+from snowflake_growth import parse_arguments, parameter_grid, compare_precisions
+from dataclasses import replace
+import json
+import sys
+import argparse
+
+def parse_grid(values):
+    """
+    Returns the values of the parameters written as "name=value1,value2" on the command line
+    
+    :param values: (list of str) the parameters
+    :return: (dict) the list of values of each parameter
+    
+    Exemple:
+    
+    >>> parse_grid(["beta=0.4,0.5", "approximation=10"])
+    {'beta': [0.4, 0.5], 'approximation': [10]}
+    """
+    grid = {}
+    for value in values:
+        name, numbers = value.split("=")
+        grid[name] = [int(number) if number.lstrip("-").isdigit() else float(number) for number in numbers.split(",")]
+    return grid
+
+def build_parser():
+    """
+    Returns the parser of the command line arguments of the script, the other arguments are the ones of `snowflake_growth`
+    
+    :return: (argparse.ArgumentParser) the parser
+    """
+    parser = argparse.ArgumentParser(description='Runs the simulation in float64 and in float32 and compares the snowflakes. '
+                                                 'The other arguments are the parameters of snowflake_growth.py.',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    
+    parser.add_argument('-grid', nargs='+',
+                        help='Parameters of the simulation with several values, written as name=value1,value2 (for instance beta=0.4,0.5).', default=[])
+    
+    parser.add_argument('-o', '-output', type=str,
+                        help='A JSON file where the differences are saved.', default=None)
+    return parser
+
+def main(argv=None):
+    """
+    Compares the two precisions for each combination of parameters.
+    The script exits with the status 1 if the crystals differ for one of them.
+    
+    :param argv: (list of str) [DEFAULT: sys.argv[1:]] the arguments
+    :return: None
+    """
+    parameter, others = build_parser().parse_known_args(argv)
+    config = parse_arguments(others)
+    reports = []
+    print("Parameters                          Crystal  Differences  Iterations  Steam      float64 (s)  float32 (s)")
+    for combination in parameter_grid(**parse_grid(parameter.grid)):
+        report = compare_precisions(replace(config, **combination))
+        reports.append(dict(report, parameters=combination))
+        name = " ".join("{}={}".format(key, value) for key, value in combination.items()) or "-"
+        print("{:<35} {:>7} {:>12} {:>11} {:>10.2e} {:>12.3f} {:>12.3f}".format(
+              name, report["crystal64"], report["crystal_differences"], report["i_differences"],
+              report["steam_difference"], report["seconds64"], report["seconds32"]))
+    
+    if parameter.o is not None:
+        with open(parameter.o, "w") as file:
+            json.dump(reports, file, indent=1)
+    if any(report["crystal_differences"] for report in reports):
+        print("The crystals differ in float32")
+        sys.exit(1)
+    print("The crystals are the same in float32")
+
+if __name__ == '__main__':
+    main()